@@ -48,21 +48,43 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
+    'django.contrib.postgres',
     'core',
     'user',
     'recipe',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.HealthCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.LeanSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.LeanAuthenticationMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
+    'core.middleware.LeanMessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ProfilingMiddleware',
 ]
 
+# Liveness and readiness checks answered before the rest of the middleware.
+# Readiness results are reused for READINESS_CACHE_SECONDS.
+HEALTH_CHECK_PATHS = ['/healthz', '/readyz']
+READINESS_CACHE_SECONDS = float(
+    os.environ.get('READINESS_CACHE_SECONDS', 2))
+
+# Token-authenticated paths skipping the session, authentication and message
+# middleware. CsrfViewMiddleware stays: DRF views are already csrf_exempt.
+LEAN_MIDDLEWARE_PATHS = ['/api/']
+
+# Brotli/gzip compression of responses for these paths, see
+# core.middleware.CompressionMiddleware.
+COMPRESSION_PATHS = ['/api/']
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -94,9 +116,134 @@ DATABASES = {
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASS'),
         'HOST': os.getenv('DB_HOST'),
+        'PORT': os.getenv('DB_PORT', ''),
+        # Keep connections open between requests (seconds, 0 closes them
+        # after every request) and ping them before reuse.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))),
     }
 }
 
+# Pooled mode: connect through pgbouncer in transaction pooling mode.
+# Server-side cursors don't survive across pooled transactions, so
+# QuerySet.iterator() must use client-side cursors.
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', '')
+if DB_POOL_MODE == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Boot locks (core.boot.advisory_lock) are session locks, taken on a
+# connection to BOOT_LOCK_DB_HOST when set: behind pgbouncer's transaction
+# pooling, point it at PostgreSQL itself.
+BOOT_LOCK_DB_HOST = os.environ.get('BOOT_LOCK_DB_HOST', '')
+BOOT_LOCK_DB_PORT = os.environ.get('BOOT_LOCK_DB_PORT', '')
+
+# Read replicas: comma separated hosts sharing the primary's credentials.
+# Safe-method requests read from a replica unless the client wrote within
+# the last DB_REPLICA_PIN_SECONDS, as recorded for the user in the shared
+# cache (see CACHES) or told by a signed cookie set on writes. Replicas
+# not answering within DB_REPLICA_CONNECT_TIMEOUT seconds are skipped for
+# DB_REPLICA_RETRY_SECONDS and requests they failed are retried on the
+# primary.
+DB_REPLICA_CONNECT_TIMEOUT = int(
+    os.environ.get('DB_REPLICA_CONNECT_TIMEOUT', 2))
+DB_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': {
+            **DATABASES['default'].get('OPTIONS', {}),
+            'connect_timeout': DB_REPLICA_CONNECT_TIMEOUT,
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+DB_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+DB_REPLICA_RETRY_SECONDS = int(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30))
+
+# Caches: `default` is kept per process, `shared` by every process and
+# container in Redis at CACHE_REDIS_URL. Without it, results that must be
+# invalidated across processes (autocomplete) aren't cached and replica
+# pins are only kept in cookies.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+if CACHE_REDIS_URL:
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+    }
+
+
+# Async views for the hot recipe API reads and the change event stream,
+# enabled when serving with ASGI (SERVER_MODE=asgi in scripts/run.sh).
+# Under WSGI each would run in its own event loop and a stream would hold
+# a worker, so they are off by default.
+ASYNC_READ_VIEWS = bool(int(os.environ.get('ASYNC_READ_VIEWS', 0)))
+
+
+# Batch endpoint (core.views.BatchView): at most BATCH_MAX_REQUESTS paths
+# under BATCH_PATH_PREFIX per batch.
+BATCH_PATH = '/api/batch/'
+BATCH_PATH_PREFIX = '/api/'
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+
+# Delta sync (`?since=`) of the recipe API lists: changes within
+# SYNC_CURSOR_OVERLAP seconds of a cursor are sent again, and tombstones of
+# deleted rows are kept for SYNC_TOMBSTONE_DAYS (see prune_tombstones).
+SYNC_CURSOR_OVERLAP = float(os.environ.get('SYNC_CURSOR_OVERLAP', 5))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', 30))
+
+# Tag and ingredient autocomplete (recipe.autocomplete): at most
+# AUTOCOMPLETE_LIMIT names, with the results of prefixes of up to
+# AUTOCOMPLETE_CACHE_PREFIX_LENGTH characters cached per user for
+# AUTOCOMPLETE_CACHE_SECONDS in the `shared` cache, when configured.
+AUTOCOMPLETE_LIMIT = int(os.environ.get('AUTOCOMPLETE_LIMIT', 10))
+AUTOCOMPLETE_CACHE_PREFIX_LENGTH = int(
+    os.environ.get('AUTOCOMPLETE_CACHE_PREFIX_LENGTH', 3))
+AUTOCOMPLETE_CACHE_SECONDS = int(
+    os.environ.get('AUTOCOMPLETE_CACHE_SECONDS', 60))
+
+# Background work on changed recipes (recipe.tasks): pre-rendered JSON and
+# similarity scores are updated after each change by RECIPE_TASK_WORKERS
+# threads per process, or in the committing request with 0.
+RECIPE_TASK_WORKERS = int(os.environ.get('RECIPE_TASK_WORKERS', 2))
+
+# Similar recipes (recipe.similarity): scores weigh tags and ingredients by
+# SIMILAR_RECIPES_ATTR_WEIGHT and words by the rest; up to
+# SIMILAR_RECIPES_INDEX_SIZE recipes scoring SIMILAR_RECIPES_MIN_SCORE are
+# kept per recipe, out of SIMILAR_RECIPES_MAX_CANDIDATES scored on changes.
+# Word frequencies are cached for SIMILAR_RECIPES_IDF_SECONDS.
+SIMILAR_RECIPES_ATTR_WEIGHT = float(
+    os.environ.get('SIMILAR_RECIPES_ATTR_WEIGHT', 0.5))
+SIMILAR_RECIPES_MIN_SCORE = float(
+    os.environ.get('SIMILAR_RECIPES_MIN_SCORE', 0.05))
+SIMILAR_RECIPES_INDEX_SIZE = int(
+    os.environ.get('SIMILAR_RECIPES_INDEX_SIZE', 50))
+SIMILAR_RECIPES_MAX_CANDIDATES = int(
+    os.environ.get('SIMILAR_RECIPES_MAX_CANDIDATES', 500))
+SIMILAR_RECIPES_IDF_SECONDS = int(
+    os.environ.get('SIMILAR_RECIPES_IDF_SECONDS', 600))
+
+# Change events streamed to clients (recipe.async_views.recipe_events),
+# sent on CHANGE_EVENTS_CHANNEL with NOTIFY. Each process LISTENs on one
+# connection, to CHANGE_EVENTS_DB_HOST when set: pgbouncer's transaction
+# pooling can't LISTEN. A client whose CHANGE_EVENTS_QUEUE_SIZE events are
+# pending is asked to resync; idle streams get a comment every
+# CHANGE_EVENTS_KEEPALIVE seconds.
+CHANGE_EVENTS_CHANNEL = 'recipe_changes'
+CHANGE_EVENTS_DB_HOST = os.environ.get('CHANGE_EVENTS_DB_HOST', '')
+CHANGE_EVENTS_DB_PORT = os.environ.get('CHANGE_EVENTS_DB_PORT', '')
+CHANGE_EVENTS_QUEUE_SIZE = 100
+CHANGE_EVENTS_KEEPALIVE = 15
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -138,6 +285,17 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# collectstatic writes content-hashed copies of static files, cached as
+# immutable by nginx, and .gz copies of text assets for nginx's gzip_static.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -264,6 +422,12 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Profiling settings
+# Profile one in PROFILE_SAMPLE_RATE requests to PROFILE_DIR (0 disables).
+PROFILE_SAMPLE_RATE = int(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '/vol/web/profiles')
+PROFILE_STATS_LIMIT = int(os.environ.get('PROFILE_STATS_LIMIT', 50))
+
 # Spectacular settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'API',
@@ -272,3 +436,8 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': True,
     'COMPONENT_SPLIT_REQUEST': True,
 }
+
+# Precomputed OpenAPI schema written by `manage.py build_schema` and served
+# at /api/schema/ with an ETag.
+SCHEMA_FILE = os.environ.get('SCHEMA_FILE', '/vol/web/schema/openapi.yaml')
+SCHEMA_CACHE_SECONDS = int(os.environ.get('SCHEMA_CACHE_SECONDS', 86400))
@@ -0,0 +1,59 @@
+"""
+Warm up the app before the server forks its workers.
+
+Django loads URL patterns, views, serializer fields and translations
+lazily on the first request. Loading them in the uwsgi master instead lets
+every forked worker share them copy-on-write and serve its first request
+as fast as the others.
+"""
+import gc
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from django.utils import translation
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+
+def iter_project_serializers():
+    """Yield the model serializers defined by the project's apps."""
+    app_modules = tuple(
+        f'{config.name}.' for config in apps.get_app_configs()
+        if not config.name.startswith(('django.', 'rest_framework')))
+    pending = [serializers.ModelSerializer]
+    while pending:
+        serializer_class = pending.pop()
+        pending.extend(serializer_class.__subclasses__())
+        if serializer_class.__module__.startswith(app_modules):
+            yield serializer_class
+
+
+def warm_up():
+    """
+    Load the lazily loaded parts of the app without touching the database,
+    then freeze the loaded objects out of the garbage collector so its
+    passes don't write to the shared pages.
+    """
+    # Imports every view and compiles the URL patterns.
+    get_resolver().reverse_dict
+
+    api_settings.DEFAULT_RENDERER_CLASSES
+    api_settings.DEFAULT_PARSER_CLASSES
+    JSONRenderer().render({'warm': True})
+
+    for serializer_class in iter_project_serializers():
+        serializer_class().fields
+
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.deactivate()
+
+    # Connections must never be inherited by forked workers. Only open
+    # ones are closed: uvicorn imports the app inside its event loop, where
+    # closing is refused.
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is not None:
+            connection.close()
+    gc.freeze()
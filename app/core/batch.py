@@ -0,0 +1,125 @@
+"""
+Batching of API requests in a single HTTP round-trip
+"""
+import io
+import json
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+
+
+BATCH_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+
+# Headers of the batch request not passed on: those describing its own
+# body, and conditional and compression headers, as batched responses are
+# embedded whole and uncompressed.
+DROPPED_HEADERS = (
+    'CONTENT_TYPE',
+    'CONTENT_LENGTH',
+    'HTTP_CONTENT_ENCODING',
+    'HTTP_ACCEPT_ENCODING',
+    'HTTP_IF_NONE_MATCH',
+    'HTTP_IF_MODIFIED_SINCE',
+)
+
+
+class SubRequestSerializer(serializers.Serializer):
+    """Serializer for a request in a batch."""
+    method = serializers.ChoiceField(BATCH_METHODS, default='GET')
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        """Accept the API paths other than the batch endpoint."""
+        path = urlsplit(value).path
+        if (not path.startswith(settings.BATCH_PATH_PREFIX) or
+                path == settings.BATCH_PATH):
+            raise serializers.ValidationError(
+                f'Only {settings.BATCH_PATH_PREFIX} paths can be batched.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of requests."""
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        """Limit the batch to BATCH_MAX_REQUESTS requests."""
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'At most {settings.BATCH_MAX_REQUESTS} requests are '
+                f'accepted.')
+        return value
+
+
+def sub_request(request, method, path, body=None):
+    """
+    Return a request for `method` and `path` carrying the headers of the
+    batch `request` and the JSON `body`.
+    """
+    url = urlsplit(path)
+    content = b'' if body is None else json.dumps(body).encode()
+    environ = {
+        key: value for key, value in request.META.items()
+        if key not in DROPPED_HEADERS
+    }
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_LENGTH': str(len(content)),
+        'wsgi.input': io.BytesIO(content),
+    })
+    if body is not None:
+        environ['CONTENT_TYPE'] = 'application/json'
+    return WSGIRequest(environ)
+
+
+def dispatch(request, user, token, method, path, body=None):
+    """
+    Return the response of the view for a request in the batch, skipping
+    the middleware and authenticated as `user` with `token`.
+    """
+    sub = sub_request(request, method, path, body)
+    try:
+        match = resolve(sub.path_info)
+    except Resolver404:
+        return JsonResponse(
+            {'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    # Consumed by DRF's Request in place of re-authenticating the token.
+    sub._force_auth_user = user
+    sub._force_auth_token = token
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    response = view(sub, *match.args, **match.kwargs)
+    if response.streaming:
+        response.close()
+        return JsonResponse(
+            {'detail': 'Streaming responses can\'t be batched.'},
+            status=status.HTTP_400_BAD_REQUEST)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def encode_response(response):
+    """
+    Return the JSON of a batched response, embedding JSON bodies as they
+    are rather than decoding and encoding them again.
+    """
+    content_type = response.get('Content-Type', '')
+    if not response.content:
+        body = b'null'
+    elif content_type.startswith('application/json'):
+        body = response.content
+    else:
+        body = json.dumps(response.content.decode(
+            response.charset, errors='replace')).encode()
+    return b'{"status":%d,"body":%s}' % (response.status_code, body)
@@ -0,0 +1,118 @@
+"""
+Container boot helpers
+"""
+import hashlib
+import os
+import zlib
+from contextlib import contextmanager
+
+import psycopg2
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+STATIC_FINGERPRINT_NAME = '.static-fingerprint'
+
+# Patterns collectstatic ignores by default.
+STATIC_IGNORE_PATTERNS = ['CVS', '.*', '*~']
+
+
+def static_fingerprint():
+    """
+    Return a hash of the static source files and the storage collecting
+    them, from each file's path, size and modification time.
+    """
+    digest = hashlib.sha256()
+    digest.update(settings.STORAGES['staticfiles']['BACKEND'].encode())
+
+    entries = []
+    for finder in finders.get_finders():
+        for path, storage in finder.list(STATIC_IGNORE_PATTERNS):
+            prefix = getattr(storage, 'prefix', None) or ''
+            stat = os.stat(storage.path(path))
+            entries.append((os.path.join(prefix, path), stat.st_size,
+                            stat.st_mtime_ns))
+
+    for entry in sorted(entries):
+        digest.update(repr(entry).encode())
+    return digest.hexdigest()
+
+
+def static_fingerprint_path():
+    """Return the path of the fingerprint stored in STATIC_ROOT."""
+    return os.path.join(settings.STATIC_ROOT, STATIC_FINGERPRINT_NAME)
+
+
+def static_is_current(fingerprint):
+    """Return whether STATIC_ROOT was collected from `fingerprint`."""
+    manifest_name = getattr(staticfiles_storage, 'manifest_name', None)
+    if manifest_name and not staticfiles_storage.exists(manifest_name):
+        return False
+
+    try:
+        with open(static_fingerprint_path()) as stored:
+            return stored.read().strip() == fingerprint
+    except OSError:
+        return False
+
+
+def write_static_fingerprint(fingerprint):
+    """Record that STATIC_ROOT was collected from `fingerprint`."""
+    path = static_fingerprint_path()
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as out:
+        out.write(fingerprint)
+    os.replace(tmp_path, path)
+
+
+def pending_migrations(using='default'):
+    """Return the (migration, backwards) plan still to apply."""
+    executor = MigrationExecutor(connections[using])
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def lock_connection_params(using='default'):
+    """Return the psycopg2 connection parameters of the boot lock."""
+    params = connections[using].get_connection_params()
+    # Session locks need a session of their own, which pgbouncer's
+    # transaction pooling doesn't provide.
+    if settings.BOOT_LOCK_DB_HOST:
+        params['host'] = settings.BOOT_LOCK_DB_HOST
+    if settings.BOOT_LOCK_DB_PORT:
+        params['port'] = settings.BOOT_LOCK_DB_PORT
+    params.pop('cursor_factory', None)
+    return params
+
+
+@contextmanager
+def advisory_lock(name, using='default'):
+    """
+    Hold a PostgreSQL session advisory lock named `name`, so only one
+    container at a time runs the block. A no-op on other databases.
+
+    The lock is held on a connection of its own, to BOOT_LOCK_DB_HOST when
+    set, closed after the block: should unlocking fail, closing the session
+    still releases the lock.
+    """
+    if connections[using].vendor != 'postgresql':
+        yield
+        return
+
+    key = zlib.crc32(name.encode())
+    lock_connection = psycopg2.connect(**lock_connection_params(using))
+    lock_connection.autocommit = True
+    try:
+        with lock_connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [key])
+        yield
+    finally:
+        try:
+            with lock_connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+        except psycopg2.Error:
+            pass
+        finally:
+            lock_connection.close()
@@ -0,0 +1,18 @@
+"""
+Cache shared by every process and container.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+
+SHARED_CACHE_ALIAS = 'shared'
+
+
+def shared_cache():
+    """
+    Return the cache shared by every process (CACHE_REDIS_URL), or None
+    when not configured.
+    """
+    if SHARED_CACHE_ALIAS not in settings.CACHES:
+        return None
+    return caches[SHARED_CACHE_ALIAS]
@@ -0,0 +1,95 @@
+"""
+Content-Encoding negotiation and compression helpers
+"""
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli is optional
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/vnd.oai.openapi',
+    'application/javascript',
+    'application/xml',
+    'text/',
+)
+
+
+def supported_encodings():
+    """Return the supported encodings in order of preference."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(request):
+    """
+    Return the preferred encoding accepted by the client, or None.
+    """
+    accepted = {}
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    best = None
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+
+    return best[0] if best else None
+
+
+def compress(content, encoding, best=False):
+    """
+    Compress `content` with `encoding`.
+
+    `best` uses the highest compression level, for payloads compressed once
+    and served many times.
+    """
+    if encoding == 'br':
+        quality = 11 if best else settings.COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(content, quality=quality)
+
+    level = 9 if best else settings.COMPRESSION_GZIP_LEVEL
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def is_compressible(response):
+    """Return whether the response body is worth compressing."""
+    content_type = response.get('Content-Type', '')
+    return (
+        not response.streaming
+        and not response.has_header('Content-Encoding')
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and len(response.content) >= settings.COMPRESSION_MIN_SIZE
+    )
+
+
+class CompressedPayload:
+    """
+    Cacheable payload storing each compressed variant once computed.
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self._encoded = {}
+
+    def encoded(self, encoding):
+        """Return the content compressed with `encoding` (None for raw)."""
+        if encoding is None:
+            return self.content
+        if encoding not in self._encoded:
+            self._encoded[encoding] = compress(
+                self.content, encoding, best=True)
+        return self._encoded[encoding]
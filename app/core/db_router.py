@@ -0,0 +1,263 @@
+"""
+Database router sending safe-method reads to read replicas
+"""
+import contextvars
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.utils import OperationalError
+from django.utils.functional import LazyObject, empty
+
+from core.cache import shared_cache
+from core.middleware import AsyncCapableMiddleware
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE_NAME = 'db_pin'
+PIN_COOKIE_SALT = 'core.db_router.pin'
+PIN_CACHE_PREFIX = 'db_pin:'
+
+# Whether reads in the current request may go to a replica.
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+# The request being handled.
+_request = contextvars.ContextVar('request', default=None)
+
+# Replica aliases whose connection failed during the current request.
+_failed_replicas = contextvars.ContextVar('failed_replicas', default=None)
+
+# Replica alias -> time.monotonic() until which it is considered down.
+_down_until = {}
+
+
+def client_key(request):
+    """
+    Return a key identifying the client making the request.
+
+    Token clients are identified by their Authorization header and browser
+    clients by their session cookie. Anonymous clients can't be pinned.
+    """
+    credential = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+
+    return hashlib.sha256(credential.encode()).hexdigest()
+
+
+def authenticated_user_id(request):
+    """
+    Return the id of the request's user once authenticated, else None.
+
+    The lazy session user isn't evaluated, which would query the database
+    while routing.
+    """
+    user = vars(request).get('user')
+    if isinstance(user, LazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def pin_cache_key(user_id):
+    """Return the shared cache key pinning a user to the primary."""
+    return f'{PIN_CACHE_PREFIX}{user_id}'
+
+
+def pin_to_primary(request, response, key):
+    """
+    Route the client's reads to the primary for a short window.
+
+    The pin is kept for the user in the shared cache when configured, as
+    many API clients drop cookies, and in a signed cookie sent back by the
+    client. Either holds whichever worker or container serves the next
+    request.
+    """
+    cache = shared_cache()
+    user_id = authenticated_user_id(request)
+    if cache is not None and user_id is not None:
+        cache.set(pin_cache_key(user_id), True,
+                  settings.DB_REPLICA_PIN_SECONDS)
+
+    response.set_signed_cookie(
+        PIN_COOKIE_NAME, key, salt=PIN_COOKIE_SALT,
+        max_age=settings.DB_REPLICA_PIN_SECONDS,
+        secure=request.is_secure(), httponly=True, samesite='Lax')
+
+
+def is_pinned(request, key):
+    """Return whether the client's cookie pins it to the primary."""
+    return key is not None and request.get_signed_cookie(
+        PIN_COOKIE_NAME, default=None, salt=PIN_COOKIE_SALT,
+        max_age=settings.DB_REPLICA_PIN_SECONDS) == key
+
+
+def is_user_pinned(request):
+    """
+    Return whether the request's user wrote within the pin window, as
+    recorded in the shared cache, looked up once per request when the
+    user is known.
+    """
+    if request is None:
+        return False
+    pinned = getattr(request, '_db_pinned', None)
+    if pinned is not None:
+        return pinned
+
+    user_id = authenticated_user_id(request)
+    if user_id is None:
+        return False
+    cache = shared_cache()
+    request._db_pinned = cache is not None and bool(
+        cache.get(pin_cache_key(user_id)))
+    return request._db_pinned
+
+
+def mark_down(alias):
+    """Skip the replica `alias` for `DB_REPLICA_RETRY_SECONDS`."""
+    _down_until[alias] = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+
+def record_replica_failure(execute, sql, params, many, context):
+    """
+    Execute wrapper marking a replica down when its connection fails, so
+    the request is retried on the primary.
+    """
+    try:
+        return execute(sql, params, many, context)
+    except OperationalError:
+        conn = context['connection']
+        if not conn.is_usable():
+            mark_down(conn.alias)
+            failed = _failed_replicas.get()
+            if failed is not None:
+                failed.add(conn.alias)
+        raise
+
+
+def replica_available(alias):
+    """
+    Return whether `alias` can serve queries, connecting it if needed.
+
+    A reused connection is pinged once per request with
+    CONN_HEALTH_CHECKS. A replica that fails to connect is skipped for
+    `DB_REPLICA_RETRY_SECONDS`.
+    """
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+
+    conn = connections[alias]
+    try:
+        conn.close_if_health_check_failed()
+        conn.ensure_connection()
+    except OperationalError:
+        mark_down(alias)
+        return False
+
+    if record_replica_failure not in conn.execute_wrappers:
+        conn.execute_wrappers.append(record_replica_failure)
+    _down_until.pop(alias, None)
+    return True
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """
+    Allow replica reads for safe-method requests of clients not pinned to
+    the primary, and pin clients to the primary after they write. Safe
+    requests during which a replica failed are retried on the primary.
+
+    Users pinned in the shared cache are known once authenticated, so the
+    token lookup itself may read a replica.
+    """
+
+    def handle(self, request):
+        if not settings.DB_REPLICAS:
+            return self.get_response(request)
+
+        key, safe, tokens = self._start(request)
+        try:
+            response = self.get_response(request)
+            if self._retry():
+                response = self.get_response(request)
+        finally:
+            self._reset(tokens)
+
+        self._finish(request, response, key, safe)
+        return response
+
+    async def ahandle(self, request):
+        if not settings.DB_REPLICAS:
+            return await self.get_response(request)
+
+        # Async ORM calls run in sync threads with a copy of this context,
+        # sharing its set of failed replicas.
+        key, safe, tokens = self._start(request)
+        try:
+            response = await self.get_response(request)
+            if self._retry():
+                response = await self.get_response(request)
+        finally:
+            self._reset(tokens)
+
+        self._finish(request, response, key, safe)
+        return response
+
+    def _start(self, request):
+        """Allow replica reads for the request when safe."""
+        key = client_key(request)
+        safe = request.method in SAFE_METHODS
+        tokens = (
+            _use_replica.set(safe and not is_pinned(request, key)),
+            _failed_replicas.set(set()),
+            _request.set(request),
+        )
+        return key, safe, tokens
+
+    def _retry(self):
+        """Return whether to run the request again on the primary."""
+        if not _failed_replicas.get():
+            return False
+        _use_replica.set(False)
+        return True
+
+    def _reset(self, tokens):
+        _use_replica.reset(tokens[0])
+        _failed_replicas.reset(tokens[1])
+        _request.reset(tokens[2])
+
+    def _finish(self, request, response, key, safe):
+        """Pin the client to the primary after a write."""
+        if not safe and key is not None:
+            pin_to_primary(request, response, key)
+
+
+class ReplicaRouter:
+    """
+    Route reads to a random available replica when the current request
+    allows it, and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or is_user_pinned(_request.get()):
+            return None
+
+        replicas = list(settings.DB_REPLICAS)
+        random.shuffle(replicas)
+        for alias in replicas:
+            if replica_available(alias):
+                return alias
+
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DB_REPLICAS
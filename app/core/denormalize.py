@@ -0,0 +1,94 @@
+"""
+Tag and ingredient arrays denormalized onto recipes
+
+Each recipe stores the ids and names of its tags and ingredients, ordered
+by id, so reads need no join through the many-to-many tables. They are
+maintained by the signal handlers in `core.signals`.
+"""
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+# Relation -> (ids column, names column) on Recipe.
+DENORMALIZED_RELATIONS = {
+    'tags': ('tag_ids', 'tag_names'),
+    'ingredients': ('ingredient_ids', 'ingredient_names'),
+}
+
+
+def attr_arrays(recipe_model, relation):
+    """
+    Return {column: expression} aggregating the ids and names arrays of
+    `relation` from its many-to-many table.
+    """
+    field = recipe_model._meta.get_field(relation)
+    recipe_fk = field.m2m_field_name()
+    attr_fk = field.m2m_reverse_field_name()
+    rows = (
+        field.remote_field.through._default_manager
+        .filter(**{recipe_fk: OuterRef('pk')})
+        .order_by()
+        .values(recipe_fk)
+    )
+
+    ids_column, names_column = DENORMALIZED_RELATIONS[relation]
+    expressions = {}
+    for column, source in ((ids_column, f'{attr_fk}_id'),
+                           (names_column, f'{attr_fk}__name')):
+        output_field = recipe_model._meta.get_field(column)
+        aggregated = rows.annotate(
+            values=ArrayAgg(source, ordering=f'{attr_fk}_id')
+        ).values('values')
+        expressions[column] = Coalesce(
+            Subquery(aggregated), Value([], output_field=output_field),
+            output_field=output_field,
+        )
+    return expressions
+
+
+def refresh_recipe_attrs(recipes, relations=tuple(DENORMALIZED_RELATIONS),
+                         touch=True):
+    """
+    Recompute the arrays of `relations` for the `recipes` queryset in one
+    UPDATE, marking the recipes as updated when `touch` is set.
+    """
+    values = {}
+    for relation in relations:
+        values.update(attr_arrays(recipes.model, relation))
+    if touch:
+        values['updated_at'] = timezone.now()
+    return recipes.update(**values)
+
+
+def backfill_recipe_attrs(recipe_model, batch_size=1000):
+    """
+    Recompute the arrays of every recipe in batches of `batch_size`,
+    yielding the number refreshed by each batch.
+    """
+    last_pk = 0
+    while True:
+        pks = list(
+            recipe_model._default_manager
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return
+        yield refresh_recipe_attrs(
+            recipe_model._default_manager.filter(pk__in=pks), touch=False)
+        last_pk = pks[-1]
+
+
+def drifted_recipes(recipes):
+    """Return the `recipes` whose arrays differ from their relations."""
+    annotations = {}
+    drift = Q()
+    for relation in DENORMALIZED_RELATIONS:
+        for column, expression in attr_arrays(recipes.model,
+                                              relation).items():
+            annotations[f'expected_{column}'] = expression
+            drift |= ~Q(**{column: F(f'expected_{column}')})
+    return recipes.annotate(**annotations).filter(drift)
@@ -0,0 +1,164 @@
+"""
+Recipe, tag and ingredient change events over PostgreSQL LISTEN/NOTIFY
+"""
+import asyncio
+import json
+import logging
+import random
+from collections import defaultdict
+
+import psycopg2
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds the listener waits for notifications before checking whether
+# clients are still subscribed.
+LISTEN_IDLE_TIMEOUT = 5
+
+# Event queued for clients too slow to keep up, asking them to sync.
+RESYNC_EVENT = {'action': 'resync'}
+
+
+def notify_change(instance, action, using=DEFAULT_DB_ALIAS):
+    """
+    Notify the listeners that `instance` was `action` ('saved' or
+    'deleted'). PostgreSQL delivers the notification on commit.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+
+    payload = json.dumps({
+        'user': instance.user_id,
+        'model': instance._meta.model_name,
+        'id': instance.pk,
+        'action': action,
+    })
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)',
+                       [settings.CHANGE_EVENTS_CHANNEL, payload])
+
+
+def listen_connection_params():
+    """Return the psycopg2 connection parameters of the listener."""
+    params = connections[DEFAULT_DB_ALIAS].get_connection_params()
+    # LISTEN needs a session of its own, which pgbouncer's transaction
+    # pooling doesn't provide.
+    if settings.CHANGE_EVENTS_DB_HOST:
+        params['host'] = settings.CHANGE_EVENTS_DB_HOST
+    if settings.CHANGE_EVENTS_DB_PORT:
+        params['port'] = settings.CHANGE_EVENTS_DB_PORT
+    params.pop('cursor_factory', None)
+    return params
+
+
+class ChangeListener:
+    """
+    Single LISTEN connection of the process, fanning change events out to
+    the queues of the subscribed users.
+
+    The connection is opened with the first subscription and closed once
+    the last client is gone.
+    """
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.task = None
+
+    def subscribe(self, user_id):
+        """Return a queue receiving the change events of `user_id`."""
+        queue = asyncio.Queue(settings.CHANGE_EVENTS_QUEUE_SIZE)
+        self.subscribers[user_id].add(queue)
+
+        loop = asyncio.get_running_loop()
+        if (self.task is None or self.task.done() or
+                self.task.get_loop() is not loop):
+            self.task = loop.create_task(self.listen())
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        """Stop sending events to `queue`."""
+        queues = self.subscribers.get(user_id, set())
+        queues.discard(queue)
+        if not queues:
+            self.subscribers.pop(user_id, None)
+
+    def dispatch(self, payload):
+        """Queue the notification `payload` for its user's clients."""
+        event = json.loads(payload)
+        for queue in self.subscribers.get(event.pop('user'), ()):
+            self.send(queue, event)
+
+    def send(self, queue, event):
+        """
+        Queue `event`, replacing the backlog of a client that fell behind
+        with a request to sync.
+        """
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC_EVENT)
+
+    async def listen(self):
+        """
+        Receive notifications while clients are subscribed, reconnecting
+        with backoff when the connection fails.
+        """
+        attempt = 0
+        while self.subscribers:
+            try:
+                connection = await asyncio.to_thread(self.connect)
+            except psycopg2.Error as exc:
+                delay = min(30.0, 0.5 * 2 ** attempt)
+                logger.warning('Change listener connection failed, retrying '
+                               'in %.1f seconds: %s', delay, exc)
+                await asyncio.sleep(random.uniform(delay / 2, delay))
+                attempt += 1
+                continue
+
+            attempt = 0
+            try:
+                await self.receive(connection)
+            except psycopg2.Error as exc:
+                logger.warning('Change listener connection lost: %s', exc)
+                # Events sent while reconnecting are lost.
+                for queues in self.subscribers.values():
+                    for queue in queues:
+                        self.send(queue, RESYNC_EVENT)
+            finally:
+                connection.close()
+
+    def connect(self):
+        """Open a connection listening on the channel."""
+        connection = psycopg2.connect(**listen_connection_params())
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{settings.CHANGE_EVENTS_CHANNEL}"')
+        return connection
+
+    async def receive(self, connection):
+        """Dispatch the notifications of `connection`."""
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        loop.add_reader(connection.fileno(), readable.set)
+        try:
+            while self.subscribers:
+                try:
+                    await asyncio.wait_for(
+                        readable.wait(), LISTEN_IDLE_TIMEOUT)
+                except TimeoutError:
+                    continue
+                readable.clear()
+                connection.poll()
+                while connection.notifies:
+                    self.dispatch(connection.notifies.pop(0).payload)
+        finally:
+            loop.remove_reader(connection.fileno())
+
+
+change_listener = ChangeListener()
@@ -0,0 +1,72 @@
+"""
+Readiness checks for the load balancer
+"""
+import os
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+from core.boot import pending_migrations
+
+
+# Check name -> (time.monotonic() until which it is reused, passed).
+_results = {}
+
+
+def check_database():
+    """Return whether the default database answers a trivial query."""
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        connection.close()
+        return False
+    return True
+
+
+def check_migrations():
+    """Return whether every migration is applied."""
+    try:
+        return not pending_migrations()
+    except DatabaseError:
+        return False
+
+
+def check_media():
+    """Return whether the media volume is writable."""
+    return os.access(settings.MEDIA_ROOT, os.W_OK)
+
+
+# Checks run by /readyz. Once applied, migrations stay applied for the
+# lifetime of the process.
+READINESS_CHECKS = {
+    'database': (check_database, False),
+    'migrations': (check_migrations, True),
+    'media': (check_media, False),
+}
+
+
+def run_check(name):
+    """
+    Return the result of a readiness check, reusing it for
+    READINESS_CACHE_SECONDS (or for good once passed for sticky checks).
+    """
+    now = time.monotonic()
+    cached = _results.get(name)
+    if cached is not None and now < cached[0]:
+        return cached[1]
+
+    check, sticky = READINESS_CHECKS[name]
+    passed = check()
+    expires = (float('inf') if passed and sticky
+               else now + settings.READINESS_CACHE_SECONDS)
+    _results[name] = (expires, passed)
+    return passed
+
+
+def readiness():
+    """Return {check name: passed} for every readiness check."""
+    return {name: run_check(name) for name in READINESS_CHECKS}
@@ -0,0 +1,83 @@
+"""
+Django command to aggregate sampled request profiles
+"""
+import glob
+import json
+import os
+import pstats
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.middleware import queries_path
+
+
+class Command(BaseCommand):
+    """
+    Django command to aggregate sampled request profiles
+    """
+    help = ('Combine the profiles and queries stored in PROFILE_DIR into one '
+            'report.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=None,
+            help='Directory holding .prof files (default: PROFILE_DIR).')
+        parser.add_argument(
+            '--match', default='',
+            help='Only include profiles whose file name contains this text, '
+                 'e.g. "api-recipe-recipes".')
+        parser.add_argument(
+            '--sort', default='cumulative',
+            help='pstats sort key (cumulative, tottime, calls, ...).')
+        parser.add_argument(
+            '--limit', type=int, default=40,
+            help='Number of functions and queries to print.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to aggregate sampled request profiles
+        """
+        directory = options['dir'] or settings.PROFILE_DIR
+        files = sorted(
+            path for path in glob.glob(os.path.join(directory, '*.prof'))
+            if options['match'] in os.path.basename(path)
+        )
+        if not files:
+            raise CommandError(f'No profiles found in {directory}.')
+
+        self.stdout.write(f'Aggregating {len(files)} profiles...')
+        stats = pstats.Stats(*files, stream=self.stdout)
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
+        self.report_queries(files, options['limit'])
+
+    def report_queries(self, files, limit):
+        """Print the queries stored along `files`, slowest in total first."""
+        totals = defaultdict(lambda: {'count': 0, 'time_ms': 0.0})
+        requests = 0
+        for path in files:
+            try:
+                with open(queries_path(path)) as f:
+                    recorded = json.load(f)
+            except (OSError, ValueError):
+                continue
+            requests += 1
+            for query in recorded['queries']:
+                total = totals[query['sql']]
+                total['count'] += 1
+                total['time_ms'] += query['time_ms']
+
+        if not requests:
+            return
+
+        self.stdout.write(
+            f'\nQueries of {requests} requests: '
+            f'{sum(t["count"] for t in totals.values())} queries, '
+            f'{sum(t["time_ms"] for t in totals.values()):.3f} ms')
+        self.stdout.write(f'{"count":>7} {"total ms":>10} {"avg ms":>9}  sql')
+        ranked = sorted(totals.items(), key=lambda item: -item[1]['time_ms'])
+        for sql, total in ranked[:limit]:
+            self.stdout.write(
+                f'{total["count"]:>7} {total["time_ms"]:>10.3f} '
+                f'{total["time_ms"] / total["count"]:>9.3f}  {sql}')
@@ -0,0 +1,30 @@
+"""
+Django command to fill the tag and ingredient arrays of recipes
+"""
+from django.core.management.base import BaseCommand
+
+from core.denormalize import backfill_recipe_attrs
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Django command to fill the tag and ingredient arrays of recipes
+    """
+    help = ('Recompute the tag and ingredient arrays denormalized onto '
+            'every recipe from the many-to-many tables, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Recipes updated per statement.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to fill the tag and ingredient arrays of recipes
+        """
+        total = 0
+        for count in backfill_recipe_attrs(Recipe, options['batch_size']):
+            total += count
+            self.stdout.write(f'{total} recipes refreshed...')
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {total} recipes.'))
@@ -0,0 +1,72 @@
+"""
+Django command to benchmark per-request database connection overhead
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+
+# (label, CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+CONFIGURATIONS = [
+    ('new connection per request', 0, False),
+    ('persistent', 600, False),
+    ('persistent + health checks', 600, True),
+]
+
+
+class Command(BaseCommand):
+    """
+    Django command to benchmark per-request database connection overhead
+    """
+    help = ('Simulate request cycles issuing one query each and compare '
+            'latency with and without persistent connections.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Number of simulated requests per configuration.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to benchmark per-request database connection overhead
+        """
+        settings_dict = connection.settings_dict
+        original = (settings_dict['CONN_MAX_AGE'],
+                    settings_dict['CONN_HEALTH_CHECKS'])
+        try:
+            for label, max_age, health_checks in CONFIGURATIONS:
+                settings_dict['CONN_MAX_AGE'] = max_age
+                settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+                connection.close()
+                timings = self._run(options['requests'])
+                self._report(label, timings)
+        finally:
+            connection.close()
+            (settings_dict['CONN_MAX_AGE'],
+             settings_dict['CONN_HEALTH_CHECKS']) = original
+
+    def _run(self, requests):
+        """Time request cycles that each run a single query."""
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            # Django closes or health checks connections on these signals.
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def _report(self, label, timings):
+        """Write latency percentiles for one configuration."""
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f'{label:<30} mean {statistics.mean(timings):7.3f} ms  '
+            f'p50 {statistics.median(timings):7.3f} ms  p95 {p95:7.3f} ms'
+        )
@@ -0,0 +1,66 @@
+"""
+Django command to benchmark the per-request middleware overhead
+"""
+import time
+
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import path
+
+
+def bench_view(request):
+    """Trivial view so only the middleware stack is measured."""
+    return HttpResponse('ok')
+
+
+# URLconf used by the benchmark requests instead of ROOT_URLCONF.
+urlpatterns = [
+    path('api/bench/', bench_view),
+    path('admin/bench/', bench_view),
+]
+
+
+class Command(BaseCommand):
+    """
+    Django command to benchmark the per-request middleware overhead
+    """
+    help = ('Time requests through MIDDLEWARE to a trivial view for API and '
+            'admin paths, with and without the lean API stack.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=20000,
+            help='Number of requests per configuration.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to benchmark the per-request middleware overhead
+        """
+        configurations = [
+            ('/api/bench/ full stack', '/api/bench/', []),
+            ('/api/bench/ lean stack', '/api/bench/', None),
+            ('/admin/bench/', '/admin/bench/', None),
+        ]
+        for label, url, lean_paths in configurations:
+            overrides = {'ALLOWED_HOSTS': ['testserver']}
+            if lean_paths is not None:
+                overrides['LEAN_MIDDLEWARE_PATHS'] = lean_paths
+            with override_settings(**overrides):
+                per_request = self._run(url, options['requests'])
+            self.stdout.write(f'{label:<26} {per_request:8.2f} us/request')
+
+    def _run(self, url, requests):
+        """Return the mean time in microseconds to handle `url`."""
+        handler = BaseHandler()
+        handler.load_middleware()
+        factory = RequestFactory()
+        request_objects = [factory.get(url) for _ in range(requests)]
+        for request in request_objects:
+            request.urlconf = __name__
+
+        start = time.perf_counter()
+        for request in request_objects:
+            handler.get_response(request)
+        return (time.perf_counter() - start) / requests * 1e6
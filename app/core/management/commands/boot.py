@@ -0,0 +1,100 @@
+"""
+Django command preparing the app for serving on container start
+"""
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from core.boot import (
+    advisory_lock,
+    pending_migrations,
+    static_fingerprint,
+    static_is_current,
+    write_static_fingerprint,
+)
+from core.schema import schema_fingerprint, schema_is_current
+
+
+class Command(BaseCommand):
+    """
+    Django command preparing the app for serving on container start
+    """
+    help = ('Wait for the database, collect static files and apply '
+            'migrations when needed, and build the schema, logging the '
+            'time spent in each phase.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Always run collectstatic and migrate.')
+        parser.add_argument(
+            '--db-timeout', type=float, default=60,
+            help='Seconds to wait for the database before failing.')
+
+    def handle(self, *args, **options):
+        """
+        Django command preparing the app for serving on container start
+        """
+        self.full = options['full']
+        self.db_timeout = options['db_timeout']
+        start = time.perf_counter()
+        for name, phase in (('wait_for_db', self.wait_for_db),
+                            ('collectstatic', self.collectstatic),
+                            ('migrate', self.migrate),
+                            ('build_schema', self.build_schema)):
+            phase_start = time.perf_counter()
+            outcome = phase()
+            self.log(name, outcome, phase_start)
+
+        self.log('boot', 'done', start)
+
+    def log(self, name, outcome, start):
+        """Write how long a phase took."""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stdout.write(f'boot: {name} {outcome} in {elapsed_ms:.0f} ms')
+
+    def wait_for_db(self):
+        """Wait until the database accepts connections."""
+        call_command('wait_for_db', timeout=self.db_timeout,
+                     stdout=self.stdout)
+        return 'ready'
+
+    def collectstatic(self):
+        """Collect static files unless the sources are unchanged."""
+        fingerprint = static_fingerprint()
+        if not self.full and static_is_current(fingerprint):
+            return 'skipped'
+
+        # STATIC_ROOT is shared by the app containers.
+        with advisory_lock('boot:collectstatic'):
+            if not self.full and static_is_current(fingerprint):
+                return 'done by another container'
+            call_command('collectstatic', interactive=False, verbosity=0)
+            write_static_fingerprint(fingerprint)
+        return 'done'
+
+    def migrate(self):
+        """Apply unapplied migrations, one container at a time."""
+        if not self.full and not pending_migrations():
+            return 'skipped'
+
+        with advisory_lock('boot:migrate'):
+            if not self.full and not pending_migrations():
+                return 'done by another container'
+            call_command('migrate', interactive=False, stdout=self.stdout)
+        return 'done'
+
+    def build_schema(self):
+        """Build the OpenAPI schema unless the code is unchanged."""
+        fingerprint = schema_fingerprint()
+        if schema_is_current(settings.SCHEMA_FILE, fingerprint):
+            return 'skipped'
+
+        # SCHEMA_FILE is shared by the app containers.
+        with advisory_lock('boot:schema'):
+            if schema_is_current(settings.SCHEMA_FILE, fingerprint):
+                return 'done by another container'
+            call_command('build_schema', force=True, stdout=self.stdout)
+        return 'done'
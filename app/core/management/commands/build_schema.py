@@ -0,0 +1,33 @@
+"""
+Django command to precompute the OpenAPI schema
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.schema import schema_fingerprint, schema_is_current, write_schema
+
+
+class Command(BaseCommand):
+    """
+    Django command to precompute the OpenAPI schema
+    """
+    help = ('Write the OpenAPI schema to SCHEMA_FILE, skipping generation '
+            'when the code it depends on is unchanged.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate the schema even if it is up to date.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to precompute the OpenAPI schema
+        """
+        path = settings.SCHEMA_FILE
+        fingerprint = schema_fingerprint()
+        if not options['force'] and schema_is_current(path, fingerprint):
+            self.stdout.write(f'Schema {path} is up to date.')
+            return
+
+        write_schema(path, fingerprint)
+        self.stdout.write(self.style.SUCCESS(f'Schema written to {path}.'))
@@ -0,0 +1,40 @@
+"""
+Django command to check the tag and ingredient arrays of recipes
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.denormalize import drifted_recipes, refresh_recipe_attrs
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Django command to check the tag and ingredient arrays of recipes
+    """
+    help = ('Find recipes whose denormalized tag and ingredient arrays '
+            'differ from the many-to-many tables, failing unless --fix '
+            'refreshes them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Refresh the drifted recipes.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to check the tag and ingredient arrays of recipes
+        """
+        pks = list(drifted_recipes(Recipe.objects.all())
+                   .order_by('pk').values_list('pk', flat=True))
+        if not pks:
+            self.stdout.write(self.style.SUCCESS('No drift found.'))
+            return
+
+        shown = ', '.join(str(pk) for pk in pks[:20])
+        more = f' and {len(pks) - 20} more' if len(pks) > 20 else ''
+        message = f'{len(pks)} recipes drifted: {shown}{more}.'
+        if not options['fix']:
+            raise CommandError(message)
+
+        refresh_recipe_attrs(Recipe.objects.filter(pk__in=pks))
+        self.stdout.write(self.style.SUCCESS(f'{message} Refreshed.'))
@@ -0,0 +1,152 @@
+"""
+Django command to EXPLAIN ANALYZE the query shapes issued by the API
+"""
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import readers, rendering
+from recipe.autocomplete import autocomplete
+from recipe.cookable import cookable_recipes
+from recipe.similarity import similar_recipes
+from recipe.sync import tombstone_ids
+
+
+SEQ_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+DISK_SORT_RE = re.compile(r'Sort Method: external|Disk: \d+kB')
+EXECUTION_TIME_RE = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+def query_shapes(user):
+    """
+    Return (name, queryset) pairs for every query shape the API issues
+    on behalf of `user`, built like the views, readers and sync build them.
+    """
+    recipes = Recipe.objects.filter(user=user).order_by('-id')
+    tags = Tag.objects.filter(user=user).order_by('-name')
+    ingredients = Ingredient.objects.filter(user=user).order_by('-name')
+    since = timezone.now() - timedelta(days=1)
+    list_columns = readers.recipe_columns(readers.RECIPE_LIST_FIELDS)
+    shapes = [
+        ('recipe list', recipes.values(
+            *rendering.RECIPE_LIST_COLUMNS, *rendering.RENDER_COLUMNS)),
+        ('recipe list fields', recipes.values(*list_columns)),
+        ('recipe sync',
+         recipes.filter(updated_at__gt=since).values(*list_columns)),
+        ('recipe tombstones', tombstone_ids(user, Recipe, since)),
+        ('tag list', tags),
+        ('tag sync', tags.filter(updated_at__gt=since)),
+        ('tag tombstones', tombstone_ids(user, Tag, since)),
+        ('ingredient list', ingredients),
+        ('ingredient sync', ingredients.filter(updated_at__gt=since)),
+        ('ingredient tombstones', tombstone_ids(user, Ingredient, since)),
+    ]
+
+    recipe = recipes.first()
+    if recipe is not None:
+        shapes += [
+            ('recipe detail', recipes.filter(pk=recipe.pk).values(
+                *rendering.RECIPE_DETAIL_COLUMNS, *rendering.RENDER_COLUMNS)),
+            ('recipe detail fields', recipes.filter(pk=recipe.pk).values(
+                *readers.recipe_columns(readers.RECIPE_DETAIL_FIELDS))),
+            ('similar recipes',
+             similar_recipes(recipes, recipe.pk, 10).values(
+                 *list_columns, 'score')),
+            ('shopping list',
+             Recipe.ingredients.through.objects
+             .filter(recipe__user=user, recipe__in=[recipe.pk])
+             .values('ingredient_id', 'ingredient__name')
+             .annotate(recipe_count=Count('recipe_id'))
+             .order_by('ingredient__name', 'ingredient_id')),
+        ]
+
+    tag = tags.first()
+    if tag is not None:
+        shapes += [
+            ('tag get_or_create', tags.filter(name=tag.name).order_by()),
+            ('tag prefix', autocomplete(tags, prefix=tag.name[:3])),
+            ('tag fuzzy', autocomplete(tags, q=tag.name)),
+        ]
+
+    ingredient = ingredients.first()
+    if ingredient is not None:
+        shapes += [
+            ('ingredient get_or_create',
+             ingredients.filter(name=ingredient.name).order_by()),
+            ('ingredient prefix',
+             autocomplete(ingredients, prefix=ingredient.name[:3])),
+            ('ingredient fuzzy', autocomplete(ingredients, q=ingredient.name)),
+        ]
+        shapes += [
+            ('cookable recipes',
+             cookable_recipes(recipes, [ingredient.pk])),
+            ('cookable recipes missing 2',
+             cookable_recipes(recipes, [ingredient.pk], missing=2)),
+        ]
+
+    token = Token.objects.filter(user=user).first()
+    if token is not None:
+        shapes.append((
+            'token lookup',
+            Token.objects.select_related('user').filter(key=token.key),
+        ))
+
+    return shapes
+
+
+class Command(BaseCommand):
+    """
+    Django command to EXPLAIN ANALYZE the query shapes issued by the API
+    """
+    help = ('Run EXPLAIN (ANALYZE, BUFFERS) for each API query shape against '
+            'a user\'s data and flag sequential scans and disk sorts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'email', help='Email of the user whose data is queried.')
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print the full plan for every query shape.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to EXPLAIN ANALYZE the query shapes issued by the API
+        """
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}.')
+
+        flagged = 0
+        for name, queryset in query_shapes(user):
+            plan = queryset.explain(analyze=True, buffers=True)
+            seq_scans = sorted(set(SEQ_SCAN_RE.findall(plan)))
+            disk_sort = bool(DISK_SORT_RE.search(plan))
+            match = EXECUTION_TIME_RE.search(plan)
+            elapsed = f'{match.group(1)} ms' if match else 'n/a'
+
+            self.stdout.write(f'{name}: {elapsed}')
+            for table in seq_scans:
+                self.stdout.write(self.style.WARNING(
+                    f'  sequential scan on {table}'))
+            if disk_sort:
+                self.stdout.write(self.style.WARNING(
+                    '  sort spilled to disk'))
+            if options['verbose_plans'] or seq_scans or disk_sort:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+            flagged += bool(seq_scans or disk_sort)
+
+        if flagged:
+            self.stdout.write(self.style.WARNING(
+                f'{flagged} query shape(s) flagged. Sequential scans on '
+                'small tables are expected; run against a production-sized '
+                'dataset before adding indexes.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No query shapes flagged.'))
@@ -0,0 +1,27 @@
+"""
+Django command to delete old delta sync tombstones
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    """
+    Django command to delete old delta sync tombstones
+    """
+    help = ('Delete the tombstones of rows deleted more than '
+            'SYNC_TOMBSTONE_DAYS ago. Clients with older cursors get 410 '
+            'and sync again from scratch.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to delete old delta sync tombstones
+        """
+        horizon = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+        count, _ = Tombstone.objects.filter(deleted_at__lt=horizon).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} tombstones.'))
@@ -2,28 +2,101 @@
 Django command to wait for database to be available
 
 """
+import random
+import socket
 import time
+
 from psycopg2 import OperationalError as Psycopg2OpError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+
+
+DEFAULT_PORT = 5432
+
+# Seconds before the first retry and cap of the exponential backoff.
+INITIAL_DELAY = 0.1
+MAX_DELAY = 2.0
 
 
 class Command(BaseCommand):
     """
     Django command to wait for database to be available
     """
+    help = ('Wait until the database accepts connections, retrying with '
+            'exponential backoff, and fail after --timeout seconds.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before failing (0 waits forever).')
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database alias to wait for.')
 
     def handle(self, *args, **options):
         """
         Django command to wait for database to be available
         """
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while not db_up:
+        alias = options['database']
+        timeout = options['timeout']
+        start = time.monotonic()
+        attempt = 0
+        while True:
             try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2OpError, OperationalError):
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                self.probe(alias)
+                break
+            except (Psycopg2OpError, OperationalError) as exc:
+                elapsed = time.monotonic() - start
+                if timeout and elapsed >= timeout:
+                    raise CommandError(
+                        f'Database unavailable after {elapsed:.1f} seconds: '
+                        f'{exc}')
+                delay = self.backoff(attempt)
+                if timeout:
+                    delay = min(delay, max(timeout - elapsed, 0))
+                self.stdout.write(
+                    f'Database unavailable, waiting {delay:.2f} seconds...')
+                time.sleep(delay)
+                attempt += 1
+
         self.stdout.write(self.style.SUCCESS('Database available!'))
+
+    def backoff(self, attempt):
+        """
+        Return the delay before retry `attempt`: exponential from
+        INITIAL_DELAY up to MAX_DELAY, with jitter so restarting containers
+        don't retry in lockstep.
+        """
+        delay = min(MAX_DELAY, INITIAL_DELAY * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def probe(self, alias):
+        """
+        Raise OperationalError unless the database accepts connections.
+
+        A TCP (or Unix socket) connect fails fast while the server is down,
+        then a real connection checks PostgreSQL accepts logins.
+        """
+        connection = connections[alias]
+        if connection.vendor == 'postgresql':
+            self.socket_probe(connection.settings_dict)
+        try:
+            connection.ensure_connection()
+        finally:
+            connection.close()
+
+    def socket_probe(self, settings_dict):
+        """Raise OperationalError unless the server's socket is listening."""
+        host = settings_dict.get('HOST') or 'localhost'
+        port = int(settings_dict.get('PORT') or DEFAULT_PORT)
+        try:
+            if host.startswith('/'):
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.settimeout(1)
+                    sock.connect(f'{host}/.s.PGSQL.{port}')
+            else:
+                socket.create_connection((host, port), timeout=1).close()
+        except OSError as exc:
+            raise OperationalError(f'{host}:{port} unreachable: {exc}')
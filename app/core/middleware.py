@@ -0,0 +1,378 @@
+"""
+Middleware for the core app.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connections
+from django.http import JsonResponse
+from django.urls import resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.text import slugify
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.compression import compress, is_compressible, negotiate_encoding
+
+
+PROFILE_PARAM = '_profile'
+PROFILE_SORT_PARAM = '_profile_sort'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+
+def is_lean_path(request):
+    """Return whether the request goes to a token-authenticated API path."""
+    return request.path_info.startswith(tuple(settings.LEAN_MIDDLEWARE_PATHS))
+
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware running natively under both WSGI and ASGI.
+
+    Django adapts sync-only middleware to an async stack by running it in
+    the thread shared by all sync code, which would serialize every request
+    under ASGI. Subclasses implement `handle(request)` and the coroutine
+    `ahandle(request)`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.ahandle(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def ahandle(self, request):
+        raise NotImplementedError
+
+
+class HealthCheckMiddleware(AsyncCapableMiddleware):
+    """
+    Answer `HEALTH_CHECK_PATHS` before the rest of the middleware.
+
+    Load balancers poll them every second, addressing containers by IP, so
+    they skip host validation, sessions, profiling and the rest.
+    """
+
+    def handle(self, request):
+        if request.path_info in settings.HEALTH_CHECK_PATHS:
+            return self.respond(request)
+        return self.get_response(request)
+
+    async def ahandle(self, request):
+        if request.path_info in settings.HEALTH_CHECK_PATHS:
+            return await sync_to_async(self.respond)(request)
+        return await self.get_response(request)
+
+    def respond(self, request):
+        """Call the health check view for the request path."""
+        match = resolve(request.path_info)
+        return match.func(request, *match.args, **match.kwargs)
+
+
+class LeanPathMixin:
+    """
+    Skip the middleware for paths in `LEAN_MIDDLEWARE_PATHS`.
+
+    Mixed into the session, authentication and message middleware, which
+    the token-authenticated API doesn't use, while keeping the full stack
+    for the admin.
+    """
+
+    def __call__(self, request):
+        if is_lean_path(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class LeanSessionMiddleware(LeanPathMixin, SessionMiddleware):
+    """SessionMiddleware skipped for lean paths."""
+
+
+class LeanAuthenticationMiddleware(LeanPathMixin, AuthenticationMiddleware):
+    """AuthenticationMiddleware skipped for lean paths."""
+
+
+class LeanMessageMiddleware(LeanPathMixin, MessageMiddleware):
+    """MessageMiddleware skipped for lean paths."""
+
+
+class CompressionMiddleware(AsyncCapableMiddleware):
+    """
+    Compress responses for `COMPRESSION_PATHS` of at least
+    `COMPRESSION_MIN_SIZE` bytes with Brotli or gzip, whichever the client
+    prefers.
+
+    Responses that already carry a Content-Encoding, such as cached payloads
+    stored precompressed, are left untouched.
+    """
+
+    def handle(self, request):
+        return self.process_response(request, self.get_response(request))
+
+    async def ahandle(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        """Return `response` compressed when the client accepts it."""
+        if not request.path_info.startswith(
+                tuple(settings.COMPRESSION_PATHS)) or \
+                not is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request)
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag', '')
+        if etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        return response
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper recording every query with its duration.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'time_ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def record_queries(stack, recorder):
+    """Record the queries of every connection until `stack` is closed."""
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(recorder))
+
+
+def _request_user(request):
+    """
+    Return the user making the request, falling back to token auth.
+
+    The API views authenticate with tokens inside the view, so the session
+    user set by `AuthenticationMiddleware` is anonymous for API clients.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+
+    try:
+        result = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+
+    return result[0] if result else None
+
+
+def profile_dump_path(request):
+    """
+    Return a unique file path for storing the profile of a request.
+    """
+    name = '{stamp}-{pid}-{path}.prof'.format(
+        stamp=time.strftime('%Y%m%dT%H%M%S'),
+        pid=f'{os.getpid()}-{random.randrange(16 ** 6):06x}',
+        path=slugify(request.path.replace('/', '-')) or 'root',
+    )
+    return os.path.join(settings.PROFILE_DIR, name)
+
+
+def queries_path(profile_path):
+    """Return the path of the queries stored along a profile."""
+    return profile_path[:-len('.prof')] + '.sql.json'
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """
+    Profile requests with cProfile on demand or by sampling.
+
+    Staff users can add `?_profile=1` (or the `X-Profile: 1` header) to any
+    request to receive the sorted profile stats and executed SQL queries
+    instead of the normal body. `?_profile=store` keeps the normal body and
+    writes the profile to `PROFILE_DIR`, with the queries next to it. When
+    `PROFILE_SAMPLE_RATE` is N > 0, one in N requests is profiled to
+    `PROFILE_DIR` for later aggregation with the `aggregate_profiles`
+    command.
+
+    Under ASGI only the event loop thread is profiled, so ORM work running
+    in sync threads shows up in the recorded queries rather than the stats,
+    and requests overlapping a profiled one are served unprofiled.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self._profiling = False
+
+    def handle(self, request):
+        mode = self._requested_mode(request)
+        if mode is None:
+            mode = self._sampled_mode()
+        if mode is None:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            record_queries(stack, recorder)
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        total_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        return self._finish(request, mode, response, profiler, recorder,
+                            total_ms)
+
+    async def ahandle(self, request):
+        mode = None
+        if self._profile_flag(request):
+            # Looking up the token user queries the database.
+            mode = await sync_to_async(self._requested_mode)(request)
+        if mode is None:
+            mode = self._sampled_mode()
+        if mode is None or self._profiling:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        self._profiling = True
+        stack = ExitStack()
+        # Connections are per thread: the ORM runs in the request's sync
+        # thread.
+        await sync_to_async(record_queries)(stack, recorder)
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+            self._profiling = False
+            await sync_to_async(stack.close)()
+        total_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        return self._finish(request, mode, response, profiler, recorder,
+                            total_ms)
+
+    def _finish(self, request, mode, response, profiler, recorder, total_ms):
+        """Return the report, or the response after storing the profile."""
+        if mode == 'report':
+            return self._report(request, response, profiler, recorder,
+                                total_ms)
+
+        path = self._store(request, response, profiler, recorder, total_ms)
+        if path:
+            response['X-Profile-File'] = os.path.basename(path)
+        return response
+
+    def _profile_flag(self, request):
+        """Return the profiling flag of the request, if set."""
+        flag = request.GET.get(PROFILE_PARAM) or request.META.get(
+            PROFILE_HEADER)
+        return None if flag == '0' else flag
+
+    def _requested_mode(self, request):
+        """Return the profiling mode asked for by a staff user, if any."""
+        flag = self._profile_flag(request)
+        if not flag:
+            return None
+
+        user = _request_user(request)
+        if user is None or not user.is_staff:
+            return None
+
+        return 'store' if flag == 'store' else 'report'
+
+    def _sampled_mode(self):
+        """Return the sampling mode for one in `PROFILE_SAMPLE_RATE`."""
+        rate = settings.PROFILE_SAMPLE_RATE
+        if rate > 0 and random.randrange(rate) == 0:
+            return 'sample'
+        return None
+
+    def _report(self, request, response, profiler, recorder, total_ms):
+        """Build the profile report returned instead of the response."""
+        stream = io.StringIO()
+        sort = request.GET.get(PROFILE_SORT_PARAM, 'cumulative')
+        try:
+            stats = pstats.Stats(profiler, stream=stream).sort_stats(sort)
+        except KeyError:
+            stats = pstats.Stats(profiler, stream=stream).sort_stats(
+                'cumulative')
+        stats.print_stats(settings.PROFILE_STATS_LIMIT)
+
+        return JsonResponse({
+            'path': request.get_full_path(),
+            'method': request.method,
+            'status_code': response.status_code,
+            'total_ms': total_ms,
+            'sql_ms': round(sum(q['time_ms'] for q in recorder.queries), 3),
+            'queries': recorder.queries,
+            'stats': stream.getvalue(),
+        })
+
+    def _store(self, request, response, profiler, recorder, total_ms):
+        """
+        Dump the profile to `PROFILE_DIR`, with the recorded queries in a
+        `.sql.json` file next to it, returning the profile's path.
+        """
+        path = profile_dump_path(request)
+        try:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(path)
+            with open(queries_path(path), 'w') as f:
+                json.dump({
+                    'path': request.get_full_path(),
+                    'method': request.method,
+                    'status_code': response.status_code,
+                    'total_ms': total_ms,
+                    'sql_ms': round(
+                        sum(q['time_ms'] for q in recorder.queries), 3),
+                    'queries': recorder.queries,
+                }, f)
+        except OSError:
+            return None
+        return path
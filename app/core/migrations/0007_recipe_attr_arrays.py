@@ -0,0 +1,43 @@
+# Generated by Django 5.0.11 on 2026-10-19 11:42
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+from core.denormalize import backfill_recipe_attrs
+
+
+def backfill(apps, schema_editor):
+    """Fill the arrays of the existing recipes."""
+    for _ in backfill_recipe_attrs(apps.get_model('core', 'Recipe')):
+        pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tombstone_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_names',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_names',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), default=list, editable=False, size=None),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
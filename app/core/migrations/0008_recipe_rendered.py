@@ -0,0 +1,23 @@
+# Generated by Django 5.0.11 on 2026-10-19 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_attr_arrays'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='rendered',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rendered_for',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.11 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='similarity_key',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.11 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_name_trigram_upper_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='rendered_format',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+    ]
@@ -5,10 +5,23 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin)
 
+from core.denormalize import DENORMALIZED_RELATIONS
+
+
+DENORMALIZED_FIELDS = {
+    column
+    for columns in DENORMALIZED_RELATIONS.values()
+    for column in columns
+} | {'rendered', 'rendered_for', 'rendered_format', 'terms',
+     'similarity_key'}
+
 
 def recipe_image_file_path(instance, filename):
     """
@@ -83,10 +96,57 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Ids and names of the tags and ingredients ordered by id, maintained
+    # by `core.denormalize`.
+    tag_ids = ArrayField(
+        models.BigIntegerField(), default=list, editable=False)
+    tag_names = ArrayField(
+        models.CharField(max_length=255), default=list, editable=False)
+    ingredient_ids = ArrayField(
+        models.BigIntegerField(), default=list, editable=False)
+    ingredient_names = ArrayField(
+        models.CharField(max_length=255), default=list, editable=False)
+    # JSON of the list representation, current while `rendered_for` equals
+    # `updated_at` and `rendered_format` the hash of the code rendering it,
+    # maintained by `recipe.rendering`.
+    rendered = models.BinaryField(null=True, editable=False)
+    rendered_for = models.DateTimeField(null=True, editable=False)
+    rendered_format = models.BigIntegerField(null=True, editable=False)
+    # Distinct words of the title and description, maintained by
+    # `recipe.similarity`.
+    terms = ArrayField(
+        models.CharField(max_length=64), default=list, editable=False)
+    # Hash of the ids and words the similarity scores were computed from.
+    similarity_key = models.BigIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            # Containment and overlap queries of `recipe.cookable`.
+            GinIndex(fields=['ingredient_ids'],
+                     name='core_recipe_ingredient_ids'),
+            # Candidates of `recipe.similarity`.
+            GinIndex(fields=['tag_ids'], name='core_recipe_tag_ids'),
+            GinIndex(fields=['terms'], name='core_recipe_terms'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """
+        Save the recipe, leaving out the denormalized arrays and rendered
+        JSON on updates so a stale instance never overwrites them.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = self.get_deferred_fields() | DENORMALIZED_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
 
 class Tag(models.Model):
     """
@@ -97,6 +157,16 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            # Autocomplete of `recipe.autocomplete`, on the expression
+            # compared by case-insensitive lookups.
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                     name='core_tag_name_trgm'),
+        ]
 
     def __str__(self):
         return self.name
@@ -111,6 +181,57 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            # Autocomplete of `recipe.autocomplete`, on the expression
+            # compared by case-insensitive lookups.
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                     name='core_ingredient_name_trgm'),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class RecipeSimilarity(models.Model):
+    """
+    Similarity score of a recipe of a user to one of the recipes most
+    similar to it
+    """
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similarities')
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similar_to')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'], name='unique_recipe_similar'),
+        ]
+        indexes = [models.Index(fields=['recipe', '-score'])]
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id}: {self.score:.3f}'
+
+
+class Tombstone(models.Model):
+    """
+    Deleted recipe, tag or ingredient, reported to syncing clients
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'model', 'deleted_at'])]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
@@ -0,0 +1,110 @@
+"""
+Precomputed OpenAPI schema helpers
+"""
+import hashlib
+import os
+import tempfile
+
+import django
+import drf_spectacular
+import rest_framework
+from django.conf import settings
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiYamlRenderer
+
+from core.compression import CompressedPayload
+
+
+SCHEMA_CONTENT_TYPE = 'application/vnd.oai.openapi; charset=utf-8'
+
+# (path, mtime_ns, size) -> (payload, etag) of the schema file last read.
+_loaded = {}
+
+
+def fingerprint_path(schema_path):
+    """Return the path of the fingerprint stored next to the schema."""
+    return f'{schema_path}.fingerprint'
+
+
+def schema_fingerprint():
+    """
+    Return a hash of everything the generated schema depends on.
+
+    Covers the project's Python sources (excluding tests), the versions of
+    the libraries generating the schema and the spectacular settings.
+    """
+    digest = hashlib.sha256()
+    for version in (django.__version__, rest_framework.VERSION,
+                    drf_spectacular.__version__,
+                    repr(sorted(settings.SPECTACULAR_SETTINGS.items()))):
+        digest.update(version.encode())
+
+    for root, dirs, files in os.walk(settings.BASE_DIR):
+        dirs[:] = sorted(
+            d for d in dirs if d not in ('tests', '__pycache__'))
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, settings.BASE_DIR)
+                              .encode())
+                with open(path, 'rb') as source:
+                    digest.update(source.read())
+
+    return digest.hexdigest()
+
+
+def schema_is_current(schema_path, fingerprint):
+    """Return whether the schema file was generated from `fingerprint`."""
+    try:
+        with open(fingerprint_path(schema_path)) as stored:
+            return (os.path.exists(schema_path)
+                    and stored.read().strip() == fingerprint)
+    except OSError:
+        return False
+
+
+def write_schema(schema_path, fingerprint):
+    """Generate the schema and atomically write it with its fingerprint."""
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    content = OpenApiYamlRenderer().render(schema, renderer_context={})
+
+    directory = os.path.dirname(schema_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    for path, data in ((schema_path, content),
+                       (fingerprint_path(schema_path), fingerprint.encode())):
+        # Containers booting together may write the schema at once, each
+        # to a temporary file of its own.
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=f'.{os.path.basename(path)}.')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                out.write(data)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def load_schema():
+    """
+    Return (CompressedPayload, etag) of the precomputed schema, or None if
+    missing.
+
+    The file is re-read only when its modification time or size changes.
+    """
+    path = settings.SCHEMA_FILE
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _loaded:
+        with open(path, 'rb') as schema:
+            content = schema.read()
+        _loaded.clear()
+        _loaded[key] = (CompressedPayload(content),
+                        hashlib.sha256(content).hexdigest())
+
+    return _loaded[key]
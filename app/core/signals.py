@@ -0,0 +1,134 @@
+"""
+Signal handlers keeping the denormalized, delta sync and change event data
+current
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import Signal, receiver
+
+from core.denormalize import refresh_recipe_attrs
+from core.events import notify_change
+from core.models import Recipe, Tag, Ingredient, Tombstone
+
+
+# Sent with the `pks` of recipes whose representation changed.
+recipes_changed = Signal()
+
+
+def deleted_with_user(origin):
+    """Return whether a deletion cascades from deleting users."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, get_user_model())
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_deletion(sender, instance, origin=None, **kwargs):
+    """Record a tombstone for a deleted recipe, tag or ingredient."""
+    if deleted_with_user(origin):
+        return
+
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+    )
+
+
+def attr_relation(sender):
+    """Return the Recipe relation of a tag or ingredient model."""
+    return 'tags' if sender is Tag else 'ingredients'
+
+
+def listing_recipe_ids(relation, instance):
+    """Return the ids of the recipes listing a tag or ingredient."""
+    return list(Recipe.objects.filter(
+        **{relation: instance}).values_list('pk', flat=True))
+
+
+def refresh_recipes(recipe_ids, relation):
+    """Refresh the arrays of `relation` for the recipes, if any."""
+    if recipe_ids:
+        refresh_recipe_attrs(
+            Recipe.objects.filter(pk__in=recipe_ids), [relation])
+        recipes_changed.send(sender=Recipe, pks=list(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    """Announce the changed representation of a saved recipe."""
+    recipes_changed.send(sender=Recipe, pks=[instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_changed_recipes(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    """Refresh the arrays of recipes whose tags or ingredients changed."""
+    relation = 'tags' if sender is Recipe.tags.through else 'ingredients'
+    if reverse and action == 'pre_clear':
+        # The recipes are unknown once cleared.
+        instance._cleared_recipe_ids = listing_recipe_ids(relation, instance)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        recipe_ids = [instance.pk] if pk_set or action == 'post_clear' else []
+    elif action == 'post_clear':
+        recipe_ids = instance._cleared_recipe_ids
+    else:
+        recipe_ids = pk_set
+    refresh_recipes(recipe_ids, relation)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_renamed(sender, instance, created, **kwargs):
+    """Refresh the arrays of the recipes listing a saved tag or ingredient."""
+    if created:
+        return
+
+    relation = attr_relation(sender)
+    refresh_recipes(listing_recipe_ids(relation, instance), relation)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_listing_recipes(sender, instance, origin=None, **kwargs):
+    """Remember the recipes listing a tag or ingredient being deleted."""
+    if not deleted_with_user(origin):
+        instance._listing_recipe_ids = listing_recipe_ids(
+            attr_relation(sender), instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_deleted(sender, instance, **kwargs):
+    """Refresh the arrays of the recipes that listed a deleted attribute."""
+    refresh_recipes(getattr(instance, '_listing_recipe_ids', None),
+                    attr_relation(sender))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def notify_saved(sender, instance, using, **kwargs):
+    """Send a change event for a saved recipe, tag or ingredient."""
+    notify_change(instance, 'saved', using)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def notify_deleted(sender, instance, using, origin=None, **kwargs):
+    """Send a change event for a deleted recipe, tag or ingredient."""
+    if not deleted_with_user(origin):
+        notify_change(instance, 'deleted', using)
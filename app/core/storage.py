@@ -0,0 +1,75 @@
+"""
+Static files storage for the core app.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage,
+    StaticFilesStorage,
+)
+from django.core.files.base import ContentFile
+
+
+PRECOMPRESS_EXTENSIONS = (
+    '.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml',
+    '.eot', '.otf', '.ttf',
+)
+PRECOMPRESS_MIN_SIZE = 256
+
+
+class PrecompressMixin:
+    """
+    Write a `.gz` copy next to each collected text asset so nginx can serve
+    it with `gzip_static` instead of compressing on every request.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set(paths)
+        parent = getattr(super(), 'post_process', None)
+        if parent is not None:
+            for name, processed_name, processed in parent(
+                    paths, dry_run, **options):
+                if processed_name and not isinstance(processed, Exception):
+                    names.add(processed_name)
+                yield name, processed_name, processed
+
+        if dry_run:
+            return
+
+        for name in sorted(names):
+            if name.endswith(PRECOMPRESS_EXTENSIONS) and self.exists(name):
+                self.precompress(name)
+
+    def precompress(self, name):
+        """Write `name`.gz when it is smaller than the original."""
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < PRECOMPRESS_MIN_SIZE:
+            return
+
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            gz_name = f'{name}.gz'
+            if self.exists(gz_name):
+                self.delete(gz_name)
+            self.save(gz_name, ContentFile(compressed))
+
+
+class CompressedStaticFilesStorage(PrecompressMixin, StaticFilesStorage):
+    """Static files storage precompressing text assets."""
+
+
+class CompressedManifestStaticFilesStorage(PrecompressMixin,
+                                           ManifestStaticFilesStorage):
+    """
+    Static files storage with content-hashed names, served by nginx with
+    `Cache-Control: immutable`, and precompressed text assets.
+
+    Until collectstatic has written a manifest (in development and tests)
+    the unhashed names are used instead of failing.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
@@ -0,0 +1,141 @@
+"""
+Tests for the batch endpoint.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+BATCH_URL = reverse('api-batch')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicBatchApiTests(TestCase):
+    """Test unauthenticated batch requests."""
+
+    def test_auth_required(self):
+        """Test authentication is required for batches."""
+        res = APIClient().post(
+            BATCH_URL, {'requests': [{'path': '/api/user/me/'}]},
+            format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+    """Test authenticated batch requests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123', name='User')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def batch(self, *requests):
+        """Return the responses of a batch of `requests`."""
+        res = self.client.post(
+            BATCH_URL, {'requests': list(requests)}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.json()['responses']
+
+    def test_batch_matches_separate_requests(self):
+        """Test batched responses equal the separate responses."""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        paths = [
+            '/api/user/me/',
+            '/api/recipe/tags/',
+            f'/api/recipe/recipes/{recipe.id}/',
+            '/api/recipe/recipes/?fields=id,title',
+        ]
+
+        responses = self.batch(*[{'path': path} for path in paths])
+
+        for path, response in zip(paths, responses):
+            expected = self.client.get(path)
+            self.assertEqual(response['status'], expected.status_code)
+            self.assertEqual(response['body'], expected.json())
+
+    def test_authenticated_once(self):
+        """Test the token is looked up once for the whole batch."""
+        paths = ['/api/user/me/', '/api/recipe/tags/',
+                 '/api/recipe/ingredients/']
+
+        # Token lookup, then a query per list.
+        with self.assertNumQueries(3):
+            self.batch(*[{'path': path} for path in paths])
+
+    def test_write_and_errors(self):
+        """Test writes, validation errors and unknown paths are batched."""
+        responses = self.batch(
+            {'method': 'POST', 'path': '/api/recipe/recipes/',
+             'body': {'title': 'Soup', 'time_minutes': 10, 'price': '2.50'}},
+            {'method': 'POST', 'path': '/api/recipe/recipes/',
+             'body': {'title': 'No price'}},
+            {'path': '/api/recipe/unknown/'},
+        )
+
+        self.assertEqual(
+            [response['status'] for response in responses],
+            [status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST,
+             status.HTTP_404_NOT_FOUND])
+        self.assertTrue(Recipe.objects.filter(
+            user=self.user, title='Soup').exists())
+
+    def test_delete_has_null_body(self):
+        """Test empty responses have a null body."""
+        recipe = create_recipe(self.user)
+
+        responses = self.batch(
+            {'method': 'DELETE',
+             'path': f'/api/recipe/recipes/{recipe.id}/'})
+
+        self.assertEqual(responses, [
+            {'status': status.HTTP_204_NO_CONTENT, 'body': None}])
+
+    def test_other_users_data_hidden(self):
+        """Test batched requests are limited to the user's data."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123')
+        recipe = create_recipe(other)
+
+        responses = self.batch(
+            {'path': f'/api/recipe/recipes/{recipe.id}/'})
+
+        self.assertEqual(responses[0]['status'], status.HTTP_404_NOT_FOUND)
+
+    def test_rejects_non_api_and_nested_paths(self):
+        """Test only API paths other than the batch itself are accepted."""
+        for path in ('/admin/', BATCH_URL):
+            res = self.client.post(
+                BATCH_URL, {'requests': [{'path': path}]}, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_too_many_requests(self):
+        """Test batches are limited to BATCH_MAX_REQUESTS."""
+        res = self.client.post(
+            BATCH_URL, {'requests': [{'path': '/api/recipe/tags/'}] * 3},
+            format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -2,30 +2,266 @@
 Test the custom management commands.
 """
 
+import os
+import socket
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2OpError
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.authtoken.models import Token
 
+from core.boot import (
+    advisory_lock,
+    lock_connection_params,
+    pending_migrations,
+)
+from core.management.commands.wait_for_db import (
+    Command as WaitForDbCommand,
+)
+from core.models import Recipe, Tag, Ingredient, Tombstone
 
-@patch('core.management.commands.wait_for_db.Command.check')
+
+@patch('core.management.commands.wait_for_db.Command.probe')
 class CommandTests(SimpleTestCase):
     """Test commands."""
 
-    def test_wait_for_db_ready(self, patched_check):
+    def test_wait_for_db_ready(self, patched_probe):
         """Test waiting for database if db is ready."""
-        patched_check.return_value = True
-        call_command('wait_for_db')
+        patched_probe.return_value = None
+        call_command('wait_for_db', stdout=StringIO())
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_probe.assert_called_once_with('default')
 
     @patch('time.sleep')
-    def test_for_db_delay(self, patched_sleep, patched_check):
+    def test_for_db_delay(self, patched_sleep, patched_probe):
         """Test waiting for database when getting OperationalError."""
-        patched_check.side_effect = [
-            Psycopg2OpError] * 2 + [OperationalError] * 3 + [True]
-        call_command('wait_for_db')
+        patched_probe.side_effect = [
+            Psycopg2OpError] * 2 + [OperationalError] * 3 + [None]
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(patched_probe.call_count, 6)
+        patched_probe.assert_called_with('default')
+
+    @patch('time.sleep')
+    def test_wait_for_db_backoff(self, patched_sleep, patched_probe):
+        """Test retries start sub-second and back off exponentially."""
+        patched_probe.side_effect = [OperationalError] * 8 + [None]
+        call_command('wait_for_db', stdout=StringIO())
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertLess(delays[0], 1)
+        self.assertGreater(delays[-1], delays[0])
+        self.assertLessEqual(max(delays), 2)
+
+    @patch('time.sleep')
+    @patch('time.monotonic')
+    def test_wait_for_db_timeout(self, patched_monotonic, patched_sleep,
+                                 patched_probe):
+        """Test the command fails once the timeout has elapsed."""
+        patched_monotonic.side_effect = [0, 1, 2, 3]
+        patched_probe.side_effect = OperationalError
+
+        with self.assertRaisesMessage(CommandError, 'Database unavailable'):
+            call_command('wait_for_db', timeout=3, stdout=StringIO())
+
+        self.assertEqual(patched_probe.call_count, 3)
+
+    def test_socket_probe_refused(self, patched_probe):
+        """Test the socket probe fails fast when nothing listens."""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        with self.assertRaises(OperationalError):
+            WaitForDbCommand().socket_probe(
+                {'HOST': '127.0.0.1', 'PORT': port})
+
+
+class ExplainQueriesTests(TestCase):
+    """Test the explain_queries command."""
+
+    def test_explain_queries_reports_each_shape(self):
+        """Test every API query shape is explained for the user."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123')
+        recipe = Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price=Decimal('1.00'))
+        recipe.tags.add(Tag.objects.create(user=user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=user, name='Salt'))
+        Token.objects.create(user=user)
+        out = StringIO()
+
+        call_command('explain_queries', user.email, stdout=out)
+
+        output = out.getvalue()
+        for shape in ['recipe list', 'recipe list fields', 'recipe detail',
+                      'recipe detail fields', 'recipe sync',
+                      'recipe tombstones', 'tag list', 'tag sync',
+                      'tag tombstones', 'ingredient list', 'ingredient sync',
+                      'ingredient tombstones', 'token lookup',
+                      'tag get_or_create', 'ingredient get_or_create',
+                      'tag prefix', 'tag fuzzy', 'ingredient prefix',
+                      'ingredient fuzzy']:
+            self.assertIn(f'{shape}:', output)
+        self.assertNotIn('recipe tags:', output)
+
+    def test_explain_queries_unknown_user(self):
+        """Test an unknown email fails the command."""
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', 'nobody@example.com')
+
+
+@patch('core.management.commands.boot.call_command')
+class BootTests(TestCase):
+    """Test the boot command."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            STATIC_ROOT=self.tmp_dir.name,
+            SCHEMA_FILE=os.path.join(self.tmp_dir.name, 'openapi.yaml'),
+            STORAGES={
+                'default': {
+                    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                },
+                'staticfiles': {
+                    'BACKEND': 'django.contrib.staticfiles.storage.'
+                               'StaticFilesStorage',
+                },
+            },
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+
+    def commands(self, patched_call):
+        """Return the names of the commands called so far."""
+        return [call.args[0] for call in patched_call.call_args_list]
+
+    def test_boot_skips_unchanged_static_and_migrations(self, patched_call):
+        """Test a second boot skips collectstatic and migrate."""
+        out = StringIO()
+        call_command('boot', stdout=out)
+        first = self.commands(patched_call)
+        patched_call.reset_mock()
+
+        call_command('boot', stdout=out)
+
+        self.assertIn('collectstatic', first)
+        self.assertEqual(self.commands(patched_call),
+                         ['wait_for_db', 'build_schema'])
+        self.assertIn('boot: collectstatic skipped', out.getvalue())
+        self.assertIn('boot: migrate skipped', out.getvalue())
+
+    def test_changed_static_collected(self, patched_call):
+        """Test collectstatic runs again when a static source changes."""
+        call_command('boot', stdout=StringIO())
+        patched_call.reset_mock()
+        fingerprint = os.path.join(self.tmp_dir.name, '.static-fingerprint')
+        with open(fingerprint, 'w') as stale:
+            stale.write('stale')
+
+        call_command('boot', stdout=StringIO())
+
+        self.assertIn('collectstatic', self.commands(patched_call))
+
+    @patch('core.management.commands.boot.pending_migrations')
+    def test_migrations_applied_under_lock(self, patched_pending,
+                                           patched_call):
+        """Test pending migrations are applied once under the lock."""
+        patched_pending.side_effect = [['0001'], ['0001']]
+
+        call_command('boot', stdout=StringIO())
+
+        self.assertIn('migrate', self.commands(patched_call))
+
+    @patch('core.management.commands.boot.pending_migrations')
+    def test_migrations_applied_by_other_container(self, patched_pending,
+                                                   patched_call):
+        """Test migrations applied while waiting for the lock are skipped."""
+        patched_pending.side_effect = [['0001'], []]
+        out = StringIO()
+
+        call_command('boot', stdout=out)
+
+        self.assertNotIn('migrate', self.commands(patched_call))
+        self.assertIn('migrate done by another container', out.getvalue())
+
+    @patch('core.management.commands.boot.schema_is_current')
+    def test_schema_built_by_other_container(self, patched_current,
+                                             patched_call):
+        """Test a schema built while waiting for the lock is kept."""
+        patched_current.side_effect = [False, True]
+        out = StringIO()
+
+        call_command('boot', stdout=out)
+
+        self.assertNotIn('build_schema', self.commands(patched_call))
+        self.assertIn('build_schema done by another container',
+                      out.getvalue())
+
+    def test_no_pending_migrations(self, patched_call):
+        """Test the migrated test database has no pending migrations."""
+        self.assertEqual(pending_migrations(), [])
+
+    def test_advisory_lock_held(self, patched_call):
+        """Test the advisory lock is held only inside the block."""
+        query = "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory'"
+        with connection.cursor() as cursor:
+            with advisory_lock('test'):
+                cursor.execute(query)
+                held = cursor.fetchone()[0]
+            cursor.execute(query)
+            released = cursor.fetchone()[0]
+
+        self.assertEqual(held, 1)
+        self.assertEqual(released, 0)
+
+    def test_advisory_lock_released_on_error(self, patched_call):
+        """Test the lock's connection is closed when the block fails."""
+        query = "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory'"
+        with self.assertRaises(RuntimeError):
+            with advisory_lock('test'):
+                raise RuntimeError
+
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    @override_settings(BOOT_LOCK_DB_HOST='db', BOOT_LOCK_DB_PORT='5433')
+    def test_lock_connection_bypasses_pool(self, patched_call):
+        """Test the lock connects to BOOT_LOCK_DB_HOST when set."""
+        params = lock_connection_params()
+
+        self.assertEqual((params['host'], params['port']), ('db', '5433'))
+        self.assertEqual(params['dbname'],
+                         connection.get_connection_params()['dbname'])
+
+
+class PruneTombstonesTests(TestCase):
+    """Test pruning delta sync tombstones."""
+
+    @override_settings(SYNC_TOMBSTONE_DAYS=30)
+    def test_prune_old_tombstones(self):
+        """Test only tombstones older than SYNC_TOMBSTONE_DAYS go."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        old = Tombstone.objects.create(user=user, model='tag', object_id=1)
+        recent = Tombstone.objects.create(user=user, model='tag', object_id=2)
+        Tombstone.objects.filter(pk=old.pk).update(
+            deleted_at=old.deleted_at - timedelta(days=31))
+
+        call_command('prune_tombstones', stdout=StringIO())
 
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
+        self.assertEqual(list(Tombstone.objects.all()), [recent])
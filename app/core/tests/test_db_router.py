@@ -0,0 +1,253 @@
+"""
+Tests for the read replica database router.
+"""
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.utils import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import db_router
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+}
+
+
+def route_read(request, response=None, user=None):
+    """
+    Run `request` through the middleware and return the read alias,
+    keeping the response in `response` when given. The request is
+    authenticated as `user`, when given, as DRF views do.
+    """
+    aliases = []
+
+    def get_response(request):
+        if user is not None:
+            request.user = user
+        aliases.append(db_router.ReplicaRouter().db_for_read(Recipe))
+        return HttpResponse()
+
+    result = db_router.ReplicaRoutingMiddleware(get_response)(request)
+    if response is not None:
+        response.append(result)
+    return aliases[0]
+
+
+@override_settings(DB_REPLICAS=['replica_0'])
+@patch('core.db_router.replica_available', return_value=True)
+class ReplicaRouterTests(SimpleTestCase):
+    """Test routing decisions of the replica router."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_safe_request_reads_replica(self, patched_available):
+        """Test GET requests read from a replica."""
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Token abc')
+
+        self.assertEqual(route_read(request), 'replica_0')
+
+    def test_unsafe_request_reads_primary(self, patched_available):
+        """Test reads during a write request go to the primary."""
+        request = self.factory.post('/', HTTP_AUTHORIZATION='Token abc')
+
+        self.assertIsNone(route_read(request))
+
+    def test_reads_outside_requests_use_primary(self, patched_available):
+        """Test reads outside the request cycle go to the primary."""
+        self.assertIsNone(db_router.ReplicaRouter().db_for_read(Recipe))
+
+    def test_client_pinned_to_primary_after_write(self, patched_available):
+        """Test a client reads its own writes from the primary."""
+        responses = []
+        route_read(self.factory.post('/', HTTP_AUTHORIZATION='Token abc'),
+                   responses)
+        cookie = responses[0].cookies[db_router.PIN_COOKIE_NAME]
+        self.factory.cookies[cookie.key] = cookie.value
+
+        pinned = route_read(
+            self.factory.get('/', HTTP_AUTHORIZATION='Token abc'))
+        other = route_read(
+            self.factory.get('/', HTTP_AUTHORIZATION='Token xyz'))
+
+        self.assertIsNone(pinned)
+        self.assertEqual(other, 'replica_0')
+        self.assertEqual(cookie['max-age'], settings.DB_REPLICA_PIN_SECONDS)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_user_pinned_without_cookie(self, patched_available):
+        """Test a user is pinned on the server when cookies are dropped."""
+        user = Mock(pk=1, is_authenticated=True)
+        route_read(self.factory.post('/', HTTP_AUTHORIZATION='Token abc'),
+                   user=user)
+
+        pinned = route_read(
+            self.factory.get('/', HTTP_AUTHORIZATION='Token abc'), user=user)
+        other = route_read(
+            self.factory.get('/', HTTP_AUTHORIZATION='Token xyz'),
+            user=Mock(pk=2, is_authenticated=True))
+        anonymous = route_read(
+            self.factory.get('/', HTTP_AUTHORIZATION='Token abc'))
+
+        self.assertIsNone(pinned)
+        self.assertEqual(other, 'replica_0')
+        self.assertEqual(anonymous, 'replica_0')
+
+    def test_user_not_pinned_without_shared_cache(self, patched_available):
+        """Test only the cookie pins clients without a shared cache."""
+        user = Mock(pk=1, is_authenticated=True)
+        route_read(self.factory.post('/', HTTP_AUTHORIZATION='Token abc'),
+                   user=user)
+
+        self.assertEqual(
+            route_read(self.factory.get('/', HTTP_AUTHORIZATION='Token abc'),
+                       user=user),
+            'replica_0')
+
+    def test_tampered_pin_ignored(self, patched_available):
+        """Test only pins signed by the server are honoured."""
+        self.factory.cookies[db_router.PIN_COOKIE_NAME] = (
+            db_router.client_key(
+                self.factory.get('/', HTTP_AUTHORIZATION='Token abc')))
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Token abc')
+
+        self.assertEqual(route_read(request), 'replica_0')
+
+    def test_unavailable_replica_falls_back_to_primary(
+            self, patched_available):
+        """Test reads go to the primary when no replica is available."""
+        patched_available.return_value = False
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Token abc')
+
+        self.assertIsNone(route_read(request))
+
+    def test_failed_replica_request_retried_on_primary(
+            self, patched_available):
+        """Test a safe request failed by a replica runs on the primary."""
+        aliases = []
+
+        def get_response(request):
+            alias = db_router.ReplicaRouter().db_for_read(Recipe)
+            aliases.append(alias)
+            if alias is not None:
+                db_router._failed_replicas.get().add(alias)
+                return HttpResponse(status=500)
+            return HttpResponse()
+
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Token abc')
+        res = db_router.ReplicaRoutingMiddleware(get_response)(request)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(aliases, ['replica_0', None])
+
+
+@override_settings(DB_REPLICA_RETRY_SECONDS=30)
+class ReplicaAvailabilityTests(SimpleTestCase):
+    """Test replica health tracking."""
+
+    def tearDown(self):
+        db_router._down_until.clear()
+
+    def test_failed_replica_skipped_until_retry(self):
+        """Test a replica that fails to connect is not retried at once."""
+        conn = Mock(connection=None)
+        conn.ensure_connection.side_effect = OperationalError
+        with patch('core.db_router.connections', {'replica_0': conn}):
+            self.assertFalse(db_router.replica_available('replica_0'))
+            self.assertFalse(db_router.replica_available('replica_0'))
+
+        conn.ensure_connection.assert_called_once()
+
+    def test_dead_connection_skipped(self):
+        """Test a reused connection failing its health check is skipped."""
+        conn = Mock(connection=Mock(), execute_wrappers=[])
+        conn.close_if_health_check_failed.side_effect = (
+            lambda: setattr(conn, 'connection', None))
+        conn.ensure_connection.side_effect = OperationalError
+        with patch('core.db_router.connections', {'replica_0': conn}):
+            self.assertFalse(db_router.replica_available('replica_0'))
+
+    def test_lost_connection_recorded(self):
+        """Test queries failing on a dead replica mark it down."""
+        conn = Mock(alias='replica_0', is_usable=Mock(return_value=False))
+        execute = Mock(side_effect=OperationalError)
+        token = db_router._failed_replicas.set(set())
+        try:
+            with self.assertRaises(OperationalError):
+                db_router.record_replica_failure(
+                    execute, 'SELECT 1', None, False, {'connection': conn})
+            self.assertEqual(db_router._failed_replicas.get(), {'replica_0'})
+        finally:
+            db_router._failed_replicas.reset(token)
+
+        self.assertFalse(db_router.replica_available('replica_0'))
+
+
+@skipUnless(settings.DB_REPLICAS, 'No read replica configured.')
+@override_settings(RECIPE_TASK_WORKERS=0)
+class ReplicaIntegrationTests(TransactionTestCase):
+    """
+    Test API reads against a local stand-in replica.
+
+    Run with DB_REPLICA_HOSTS pointing at the primary. The replica is a
+    separate connection mirroring the test database, so test data must be
+    committed for it to be visible.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123')
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price=Decimal('1.00'))
+
+    def test_list_reads_from_replica(self):
+        """Test listing recipes queries the replica."""
+        replica = connections[settings.DB_REPLICAS[0]]
+        with CaptureQueriesContext(replica) as queries:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()), 1)
+        self.assertTrue(
+            any('core_recipe' in query['sql'] for query in queries))
+
+    def test_lost_replica_falls_back_to_primary(self):
+        """Test reads succeed when the replica's connection is dropped."""
+        self.client.get(RECIPES_URL)
+        replica = connections[settings.DB_REPLICAS[0]]
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)',
+                           [replica.connection.info.backend_pid])
+        # The failed attempt is logged as an error before the retry.
+        self.client.raise_request_exception = False
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()), 1)
@@ -0,0 +1,118 @@
+"""
+Tests for the tag and ingredient arrays denormalized onto recipes.
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.denormalize import drifted_recipes
+from core.models import Recipe, Tag, Ingredient
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeAttrArrayTests(TestCase):
+    """Test maintaining the denormalized arrays."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.recipe = create_recipe(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+
+    def arrays(self, recipe=None):
+        """Return the stored tag and ingredient arrays of a recipe."""
+        return Recipe.objects.values(
+            'tag_ids', 'tag_names', 'ingredient_ids', 'ingredient_names',
+        ).get(pk=(recipe or self.recipe).pk)
+
+    def test_add_remove_clear(self):
+        """Test the arrays follow the recipe's tags, ordered by id."""
+        self.recipe.tags.add(self.quick, self.vegan)
+        self.assertEqual(self.arrays()['tag_ids'],
+                         [self.vegan.id, self.quick.id])
+        self.assertEqual(self.arrays()['tag_names'], ['Vegan', 'Quick'])
+
+        self.recipe.tags.remove(self.vegan)
+        self.assertEqual(self.arrays()['tag_names'], ['Quick'])
+
+        self.recipe.tags.clear()
+        self.assertEqual(self.arrays()['tag_ids'], [])
+
+    def test_reverse_changes(self):
+        """Test changes from the tag side refresh its recipes."""
+        other = create_recipe(self.user, title='Other')
+
+        self.vegan.recipe_set.add(self.recipe, other)
+        self.assertEqual(self.arrays(other)['tag_names'], ['Vegan'])
+
+        self.vegan.recipe_set.clear()
+        self.assertEqual(self.arrays()['tag_ids'], [])
+        self.assertEqual(self.arrays(other)['tag_ids'], [])
+
+    def test_rename_and_delete(self):
+        """Test renamed and deleted attributes refresh their recipes."""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe.ingredients.add(salt)
+        self.recipe.tags.add(self.vegan)
+
+        salt.name = 'Sea salt'
+        salt.save()
+        self.assertEqual(self.arrays()['ingredient_names'], ['Sea salt'])
+
+        self.vegan.delete()
+        self.assertEqual(self.arrays()['tag_ids'], [])
+        self.assertEqual(self.arrays()['ingredient_ids'], [salt.id])
+
+    def test_stale_instance_save_keeps_arrays(self):
+        """Test saving a stale instance doesn't overwrite the arrays."""
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        self.recipe.tags.add(self.vegan)
+
+        stale.title = 'Renamed'
+        stale.save()
+
+        self.assertEqual(self.arrays()['tag_ids'], [self.vegan.id])
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).title, 'Renamed')
+
+    def test_drift_checked_and_fixed(self):
+        """Test drifted arrays are found, and fixed with --fix."""
+        self.recipe.tags.add(self.vegan)
+        Recipe.objects.filter(pk=self.recipe.pk).update(tag_names=['Stale'])
+
+        self.assertEqual(list(drifted_recipes(Recipe.objects.all())),
+                         [self.recipe])
+        with self.assertRaises(CommandError):
+            call_command('check_recipe_attrs', stdout=StringIO())
+
+        call_command('check_recipe_attrs', fix=True, stdout=StringIO())
+
+        self.assertFalse(drifted_recipes(Recipe.objects.all()).exists())
+        self.assertEqual(self.arrays()['tag_names'], ['Vegan'])
+
+    def test_backfill(self):
+        """Test the backfill command fills every recipe's arrays."""
+        others = [create_recipe(self.user, title=f'Recipe {i}')
+                  for i in range(3)]
+        for recipe in [self.recipe] + others:
+            recipe.tags.add(self.vegan)
+        Recipe.objects.update(tag_ids=[], tag_names=[])
+
+        call_command('backfill_recipe_attrs', batch_size=2, stdout=StringIO())
+
+        self.assertFalse(drifted_recipes(Recipe.objects.all()).exists())
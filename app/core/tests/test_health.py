@@ -0,0 +1,92 @@
+"""
+Tests for the liveness and readiness endpoints.
+"""
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+
+from core import health
+
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthCheckTests(TestCase):
+    """Test the health check endpoints."""
+
+    def setUp(self):
+        health._results.clear()
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_dir.name)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_dir.cleanup()
+        health._results.clear()
+
+    def test_healthz_without_database(self):
+        """Test liveness is answered without any query."""
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, b'ok')
+
+    def test_healthz_skips_host_validation(self):
+        """Test load balancers can poll by IP address."""
+        res = self.client.get(HEALTHZ_URL, HTTP_HOST='10.0.0.5')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Set-Cookie', res)
+
+    def test_readyz_ok(self):
+        """Test readiness passes with every check ok."""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['checks'], {
+            'database': 'ok', 'migrations': 'ok', 'media': 'ok'})
+
+    def test_readyz_cached(self):
+        """Test polling again within the cache period runs no query."""
+        self.client.get(READYZ_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_readyz_unwritable_media(self):
+        """Test readiness fails when the media volume isn't writable."""
+        with override_settings(MEDIA_ROOT='/nonexistent/media'):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['checks']['media'], 'failed')
+
+    @patch('core.health.pending_migrations')
+    def test_readyz_pending_migrations(self, patched_pending):
+        """Test readiness fails until migrations are applied."""
+        patched_pending.return_value = [('0001', False)]
+
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['checks']['migrations'], 'failed')
+
+    @override_settings(READINESS_CACHE_SECONDS=0)
+    def test_applied_migrations_checked_once(self):
+        """Test applied migrations aren't checked again."""
+        self.client.get(READYZ_URL)
+
+        with patch('core.health.pending_migrations') as patched_pending:
+            self.client.get(READYZ_URL)
+
+        patched_pending.assert_not_called()
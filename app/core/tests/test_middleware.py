@@ -0,0 +1,204 @@
+"""
+Tests for the core middleware.
+"""
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+import brotli
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.middleware import (
+    CompressionMiddleware,
+    LeanAuthenticationMiddleware,
+    LeanMessageMiddleware,
+    LeanSessionMiddleware,
+    queries_path,
+)
+
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """Test the profiling middleware."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_profile_flag_ignored_for_non_staff(self):
+        """Test non-staff users get the normal response."""
+        res = self.client.get(TAGS_URL, {'_profile': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), [])
+
+    def test_profile_report_for_staff(self):
+        """Test staff users get profile stats and queries."""
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.get(TAGS_URL, {'_profile': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        report = res.json()
+        self.assertEqual(report['status_code'], status.HTTP_200_OK)
+        self.assertIn('cumulative', report['stats'])
+        self.assertTrue(
+            any('core_tag' in query['sql'] for query in report['queries']))
+
+    def test_profile_header_for_staff(self):
+        """Test the profile header works like the query parameter."""
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.get(TAGS_URL, HTTP_X_PROFILE='1')
+
+        self.assertIn('queries', res.json())
+
+    async def test_profile_report_under_asgi(self):
+        """Test the profile report through the async middleware stack."""
+        self.user.is_staff = True
+        await self.user.asave()
+
+        res = await self.async_client.get(
+            TAGS_URL, {'_profile': '1'},
+            headers={'authorization': f'Token {self.token.key}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            any('core_tag' in query['sql'] for query in res.json()['queries']))
+
+    def test_sampled_profiles_written_to_disk(self):
+        """Test sampling stores profiles that can be aggregated."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_DIR=tmp_dir):
+                res = self.client.get(TAGS_URL)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.json(), [])
+            self.assertIn('X-Profile-File', res)
+            path = os.path.join(tmp_dir, res['X-Profile-File'])
+            self.assertTrue(os.path.exists(path))
+            with open(queries_path(path)) as f:
+                recorded = json.load(f)
+            self.assertEqual(recorded['path'], TAGS_URL)
+            self.assertEqual(recorded['status_code'], status.HTTP_200_OK)
+            self.assertTrue(any(
+                'core_tag' in query['sql'] and query['time_ms'] >= 0
+                for query in recorded['queries']))
+            out = StringIO()
+            call_command('aggregate_profiles', dir=tmp_dir, stdout=out)
+            self.assertIn('Aggregating 1 profiles', out.getvalue())
+            self.assertIn('Queries of 1 requests', out.getvalue())
+            self.assertIn('core_tag', out.getvalue())
+
+
+class LeanMiddlewareTests(SimpleTestCase):
+    """Test the lean middleware stack for API paths."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def run_stack(self, path):
+        """Run the lean middleware for `path` and return the request."""
+        handler = LeanMessageMiddleware(lambda request: HttpResponse())
+        handler = LeanAuthenticationMiddleware(handler)
+        handler = LeanSessionMiddleware(handler)
+        request = self.factory.get(path)
+        handler(request)
+        return request
+
+    def test_api_paths_skip_session_auth_and_messages(self):
+        """Test API requests skip the session based middleware."""
+        request = self.run_stack('/api/recipe/recipes/')
+
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertFalse(hasattr(request, 'user'))
+        self.assertFalse(hasattr(request, '_messages'))
+
+    def test_admin_paths_run_full_stack(self):
+        """Test admin requests still run the session based middleware."""
+        request = self.run_stack('/admin/')
+
+        self.assertTrue(hasattr(request, 'session'))
+        self.assertTrue(hasattr(request, 'user'))
+        self.assertTrue(hasattr(request, '_messages'))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test compressing API responses."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.body = b'{"name": "' + b'recipe ' * 100 + b'"}'
+
+    def respond(self, path, body=None, **headers):
+        """Run a JSON response for `path` through the middleware."""
+        middleware = CompressionMiddleware(lambda request: HttpResponse(
+            self.body if body is None else body,
+            content_type='application/json'))
+        return middleware(self.factory.get(path, **headers))
+
+    def test_gzip_when_accepted(self):
+        """Test gzip is used when it is the only accepted encoding."""
+        res = self.respond('/api/recipe/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), self.body)
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_brotli_preferred(self):
+        """Test Brotli is preferred when the client accepts both."""
+        res = self.respond(
+            '/api/recipe/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(res.content), self.body)
+
+    def test_small_responses_not_compressed(self):
+        """Test responses under the threshold are sent as is."""
+        res = self.respond(
+            '/api/recipe/', body=b'[]', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_non_api_paths_not_compressed(self):
+        """Test only API paths are compressed."""
+        res = self.respond('/admin/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    async def test_async_stack(self):
+        """Test the middleware runs natively in an async stack."""
+        async def view(request):
+            return HttpResponse(self.body, content_type='application/json')
+
+        middleware = CompressionMiddleware(view)
+        res = await middleware(
+            self.factory.get('/api/recipe/', HTTP_ACCEPT_ENCODING='gzip'))
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(gzip.decompress(res.content), self.body)
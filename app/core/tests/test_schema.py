@@ -0,0 +1,96 @@
+"""
+Tests for the precomputed OpenAPI schema.
+"""
+import gzip
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaTests(SimpleTestCase):
+    """Test building and serving the precomputed schema."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.schema_file = os.path.join(self.tmp_dir.name, 'openapi.yaml')
+        self.settings_override = override_settings(
+            SCHEMA_FILE=self.schema_file)
+        self.settings_override.enable()
+        self.client = APIClient()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+
+    def test_build_schema_skips_when_current(self):
+        """Test the schema is only regenerated when code changes."""
+        out = StringIO()
+        call_command('build_schema', stdout=out)
+        call_command('build_schema', stdout=out)
+
+        self.assertTrue(os.path.exists(self.schema_file))
+        self.assertIn('up to date', out.getvalue())
+
+    def test_schema_written_through_own_temp_files(self):
+        """Test a temporary file of another writer is left alone."""
+        other = f'{self.schema_file}.tmp'
+        with open(other, 'w') as tmp:
+            tmp.write('partial')
+
+        call_command('build_schema', stdout=StringIO())
+
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), [
+            'openapi.yaml', 'openapi.yaml.fingerprint', 'openapi.yaml.tmp'])
+        with open(other) as tmp:
+            self.assertEqual(tmp.read(), 'partial')
+
+    def test_serves_cached_schema_with_etag(self):
+        """Test the precomputed schema is served with cache headers."""
+        call_command('build_schema', stdout=StringIO())
+        with open(self.schema_file, 'rb') as schema:
+            content = schema.read()
+
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, content)
+        self.assertIn('ETag', res)
+        self.assertIn('max-age', res['Cache-Control'])
+
+    def test_matching_etag_not_modified(self):
+        """Test a matching If-None-Match returns 304."""
+        call_command('build_schema', stdout=StringIO())
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cached_schema_served_precompressed(self):
+        """Test the schema is served compressed with a per-encoding ETag."""
+        call_command('build_schema', stdout=StringIO())
+        plain = self.client.get(SCHEMA_URL)
+
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertNotEqual(res['ETag'], plain['ETag'])
+
+    def test_missing_schema_file_generated_per_request(self):
+        """Test the schema is generated when no file was built."""
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
+        self.assertIn(b'openapi', res.content)
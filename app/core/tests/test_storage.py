@@ -0,0 +1,79 @@
+"""
+Tests for the static files storage.
+"""
+import gzip
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import (
+    CompressedManifestStaticFilesStorage,
+    CompressedStaticFilesStorage,
+)
+
+
+class CompressedStaticFilesStorageTests(SimpleTestCase):
+    """Test precompressing collected static files."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = CompressedStaticFilesStorage(
+            location=self.tmp_dir.name, base_url='/static/')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def post_process(self, *names):
+        """Run post processing for `names` as collectstatic does."""
+        paths = {name: (self.storage, name) for name in names}
+        return list(self.storage.post_process(paths))
+
+    def test_text_assets_precompressed(self):
+        """Test a .gz copy is written for text assets."""
+        css = b'body { color: red; }\n' * 50
+        self.storage.save('app.css', ContentFile(css))
+
+        self.post_process('app.css')
+
+        with self.storage.open('app.css.gz') as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), css)
+
+    def test_binary_and_small_assets_skipped(self):
+        """Test images and tiny files are not precompressed."""
+        self.storage.save('logo.png', ContentFile(b'\x89PNG' * 200))
+        self.storage.save('tiny.js', ContentFile(b'var a = 1;'))
+
+        self.post_process('logo.png', 'tiny.js')
+
+        self.assertFalse(self.storage.exists('logo.png.gz'))
+        self.assertFalse(self.storage.exists('tiny.js.gz'))
+
+
+class CompressedManifestStaticFilesStorageTests(SimpleTestCase):
+    """Test hashed and precompressed static files."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = CompressedManifestStaticFilesStorage(
+            location=self.tmp_dir.name, base_url='/static/')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_unhashed_url_without_manifest(self):
+        """Test URLs fall back to unhashed names before collectstatic."""
+        self.assertEqual(self.storage.url('app.css'), '/static/app.css')
+
+    def test_hashed_copies_precompressed(self):
+        """Test post processing hashes names and precompresses the copies."""
+        self.storage.save(
+            'app.css', ContentFile(b'body { color: red; }\n' * 50))
+
+        list(self.storage.post_process({'app.css': (self.storage, 'app.css')}))
+
+        hashed_name = self.storage.stored_name('app.css')
+        self.assertRegex(hashed_name, r'^app\.[0-9a-f]{12}\.css$')
+        self.assertEqual(
+            self.storage.url('app.css'), f'/static/{hashed_name}')
+        self.assertTrue(self.storage.exists(f'{hashed_name}.gz'))
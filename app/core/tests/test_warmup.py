@@ -0,0 +1,29 @@
+"""
+Tests for warming up the app before forking workers.
+"""
+import gc
+
+from django.db import connections
+from django.test import SimpleTestCase
+
+from app.warmup import iter_project_serializers, warm_up
+from recipe.serializers import RecipeDetailSerializer
+
+
+class WarmUpTests(SimpleTestCase):
+    """Test the pre-fork warm-up."""
+
+    def tearDown(self):
+        gc.unfreeze()
+
+    def test_warm_up_without_database(self):
+        """Test warming up leaves no database connection to inherit."""
+        warm_up()
+
+        self.assertGreater(gc.get_freeze_count(), 0)
+        for conn in connections.all():
+            self.assertIsNone(conn.connection)
+
+    def test_project_serializers_found(self):
+        """Test the project's serializers are warmed up."""
+        self.assertIn(RecipeDetailSerializer, list(iter_project_serializers()))
@@ -0,0 +1,113 @@
+"""
+Views for the core app.
+"""
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import parse_etags, patch_vary_headers
+from django.views.decorators.cache import never_cache
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+from drf_spectacular.utils import extend_schema, inline_serializer
+from rest_framework import serializers
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from core.batch import BatchSerializer, dispatch, encode_response
+from core.compression import negotiate_encoding
+from core.health import readiness
+from core.schema import SCHEMA_CONTENT_TYPE, load_schema
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """
+    Serve the OpenAPI schema precomputed by the `build_schema` command.
+
+    The schema is compressed once per encoding and kept in memory. Falls
+    back to generating the schema per request when the file is missing or a
+    different format or language is asked for.
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        cached = load_schema()
+        if cached is None or request.GET.get('format') or \
+                request.GET.get('lang'):
+            return super().get(request, *args, **kwargs)
+
+        payload, etag = cached
+        encoding = negotiate_encoding(request)
+        quoted_etag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+        if quoted_etag in parse_etags(
+                request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                payload.encoded(encoding), content_type=SCHEMA_CONTENT_TYPE)
+            if encoding:
+                response['Content-Encoding'] = encoding
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['ETag'] = quoted_etag
+        response['Cache-Control'] = (
+            f'public, max-age={settings.SCHEMA_CACHE_SECONDS}')
+        return response
+
+
+@never_cache
+def healthz(request):
+    """Liveness: the process serves requests. Touches nothing else."""
+    return HttpResponse('ok', content_type='text/plain')
+
+
+@never_cache
+def readyz(request):
+    """
+    Readiness: the database answers, every migration is applied and the
+    media volume is writable. Results are cached, see `core.health`.
+    """
+    checks = readiness()
+    ready = all(checks.values())
+    return JsonResponse(
+        {
+            'status': 'ok' if ready else 'unavailable',
+            'checks': {name: 'ok' if passed else 'failed'
+                       for name, passed in checks.items()},
+        },
+        status=200 if ready else 503,
+    )
+
+
+class BatchView(APIView):
+    """
+    Run several API requests in one round-trip.
+
+    Each request is dispatched to its view in turn, authenticated with the
+    batch's token and skipping the middleware, and the responses are
+    returned in order. Requests run independently: one failing doesn't
+    undo the others.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=BatchSerializer,
+        responses=inline_serializer('BatchResponse', {
+            'responses': inline_serializer('SubResponse', {
+                'status': serializers.IntegerField(),
+                'body': serializers.JSONField(allow_null=True),
+            }, many=True),
+        }),
+    )
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        encoded = [
+            encode_response(dispatch(
+                request._request, request.user, request.auth, **sub))
+            for sub in serializer.validated_data['requests']
+        ]
+        return HttpResponse(
+            b'{"responses":[%s]}' % b','.join(encoded),
+            content_type='application/json',
+        )
@@ -0,0 +1,221 @@
+"""
+Async views for the hot recipe API reads and the change event stream,
+served under ASGI.
+
+GET requests for JSON are answered with the async ORM from the same
+representations as the DRF views, which handle every other method and
+the browsable API.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+
+from core.authentication import AsyncTokenAuthentication
+from core.events import change_listener
+from core.models import Recipe, Tag, Ingredient
+from recipe import readers, rendering, serializers, views
+
+
+# Parameters answered by the DRF views only.
+DRF_PARAMETERS = frozenset(['since', 'prefix', 'q'])
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    """
+    Return `data` rendered like a DRF JSON response, or as it is when
+    already rendered to bytes.
+    """
+    if not isinstance(data, bytes):
+        data = JSONRenderer().render(data)
+    response = HttpResponse(
+        data,
+        status=status_code,
+        content_type='application/json',
+        headers=headers,
+    )
+    response['Vary'] = 'Accept'
+    return response
+
+
+def wants_json(request):
+    """Return whether the request isn't for the browsable API."""
+    return ('format' not in request.GET and
+            'text/html' not in request.META.get('HTTP_ACCEPT', ''))
+
+
+def render_exception(exc, request, auth):
+    """Return the response of DRF's `exception_handler` for `exc`."""
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound(*exc.args)
+
+    headers = None
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        headers = {'WWW-Authenticate': auth.authenticate_header(request)}
+
+    data = exc.detail
+    if not isinstance(data, (list, dict)):
+        data = {'detail': data}
+    return render(data, exc.status_code, headers)
+
+
+def async_read(fallback):
+    """
+    Decorate an async read view, passing other requests to `fallback`.
+
+    The read view is called with the authenticated user; authentication,
+    validation and not found errors are rendered as DRF would.
+    """
+    def decorator(read):
+        async def view(request, *args, **kwargs):
+            # Delta sync (`?since=`) and autocomplete (`?prefix=`, `?q=`)
+            # are left to the DRF views.
+            if (request.method != 'GET' or not wants_json(request) or
+                    not DRF_PARAMETERS.isdisjoint(request.GET)):
+                return await sync_to_async(fallback)(request, *args, **kwargs)
+
+            auth = AsyncTokenAuthentication()
+            try:
+                # Requests of a batch are authenticated by the batch.
+                user = getattr(request, '_force_auth_user', None) or \
+                    await auth.aauthenticate(request)
+                if user is None:
+                    raise exceptions.NotAuthenticated()
+                # As DRF does, for the replica router.
+                request.user = user
+                data = await read(request, user, *args, **kwargs)
+            except (Http404, exceptions.APIException) as exc:
+                return render_exception(exc, request, auth)
+
+            return render(data)
+
+        return csrf_exempt(view)
+    return decorator
+
+
+def compact_included(request):
+    """Return the `included` dict in compact mode, otherwise None."""
+    return {} if views.is_compact(request.GET) else None
+
+
+@async_read(views.RecipeViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def recipe_list(request, user):
+    """List recipes for the user, as `RecipeViewSet.list`."""
+    fields = views.select_fields(
+        request.GET, serializers.RecipeSerializer.Meta.fields)
+    included = compact_included(request)
+    queryset = Recipe.objects.filter(user=user).order_by('-id')
+    if fields is None and included is None:
+        return await rendering.aread_list_content(queryset)
+    data = await readers.aread_recipes(
+        queryset, fields or readers.RECIPE_LIST_FIELDS, included)
+
+    if included is None:
+        return data
+    return {
+        'results': data,
+        'included': serializers.sorted_included(included),
+    }
+
+
+@async_read(views.RecipeViewSet.as_view({
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}))
+async def recipe_detail(request, user, pk):
+    """Retrieve a recipe of the user, as `RecipeViewSet.retrieve`."""
+    fields = views.select_fields(
+        request.GET, serializers.RecipeDetailSerializer.Meta.fields)
+    included = compact_included(request)
+    queryset = Recipe.objects.filter(user=user, pk=pk)
+    if fields is None and included is None:
+        data = await rendering.aread_detail_content(queryset, request)
+    else:
+        data = await readers.aread_recipes(
+            queryset, fields or readers.RECIPE_DETAIL_FIELDS, included,
+            request)
+    if not data:
+        raise Http404('No Recipe matches the given query.')
+
+    if included is None:
+        return data if fields is None else data[0]
+    return {
+        'result': data[0],
+        'included': serializers.sorted_included(included),
+    }
+
+
+async def read_attrs(request, user, model, serializer_class):
+    """List the user's tags or ingredients, as `BaseRecipeAttrViewSet`."""
+    fields = views.select_fields(
+        request.GET, serializer_class.Meta.fields)
+    queryset = model.objects.filter(user=user).order_by('-name')
+    return await readers.aread_attrs(
+        queryset, fields or serializer_class.Meta.fields)
+
+
+@async_read(views.TagViewSet.as_view({'get': 'list'}))
+async def tag_list(request, user):
+    """List tags for the user."""
+    return await read_attrs(request, user, Tag, serializers.TagSerializer)
+
+
+@async_read(views.IngredientViewSet.as_view({'get': 'list'}))
+async def ingredient_list(request, user):
+    """List ingredients for the user."""
+    return await read_attrs(
+        request, user, Ingredient, serializers.IngredientSerializer)
+
+
+async def event_stream(user_id):
+    """
+    Yield the Server-Sent Events of the user's changes, with a comment
+    every CHANGE_EVENTS_KEEPALIVE seconds so proxies keep idle streams.
+    """
+    queue = change_listener.subscribe(user_id)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), settings.CHANGE_EVENTS_KEEPALIVE)
+            except TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            name = event.get('model', event['action'])
+            yield f'event: {name}\ndata: {json.dumps(event)}\n\n'
+    finally:
+        change_listener.unsubscribe(user_id, queue)
+
+
+@require_GET
+async def recipe_events(request):
+    """
+    Stream the user's recipe, tag and ingredient changes as Server-Sent
+    Events named after the model, with data `{"model", "id", "action"}`
+    where action is `saved` or `deleted`. A `resync` event asks the client
+    to catch up with `?since=` after events were dropped.
+    """
+    auth = AsyncTokenAuthentication()
+    try:
+        user = await auth.aauthenticate(request)
+        if user is None:
+            raise exceptions.NotAuthenticated()
+    except exceptions.APIException as exc:
+        return render_exception(exc, request, auth)
+
+    response = StreamingHttpResponse(
+        event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stream through nginx without buffering.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,127 @@
+"""
+Autocomplete of the tag and ingredient lists.
+
+`?prefix=` returns the names starting with the prefix and `?q=` the names
+containing or resembling the query, best match first, at most
+AUTOCOMPLETE_LIMIT of them. Both are answered with the `pg_trgm` GIN
+indexes on the uppercased names, which Django's case-insensitive lookups
+compare.
+
+With a `shared` cache configured (CACHE_REDIS_URL), results for prefixes
+of up to AUTOCOMPLETE_CACHE_PREFIX_LENGTH characters, those typed most,
+are cached per user for AUTOCOMPLETE_CACHE_SECONDS and dropped when the
+user's tags or ingredients change. A per-process cache couldn't be
+invalidated by changes served by other processes, so results aren't
+cached without one.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Q
+from django.db.models.functions import Lower, Upper
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+
+from core.cache import shared_cache
+from recipe.serializers import AutocompleteQuerySerializer
+
+
+CACHE_PREFIX = 'autocomplete:'
+
+AUTOCOMPLETE_PARAMETERS = [
+    OpenApiParameter(
+        'prefix', OpenApiTypes.STR,
+        description='Return the names starting with the prefix, '
+                    'alphabetically.',
+    ),
+    OpenApiParameter(
+        'q', OpenApiTypes.STR,
+        description='Return the names containing or resembling the query, '
+                    'best match first.',
+    ),
+]
+
+
+def autocomplete(queryset, prefix=None, q=None):
+    """
+    Return the rows of `queryset` whose name starts with `prefix`, or
+    contains or resembles `q`, limited to AUTOCOMPLETE_LIMIT.
+    """
+    if q:
+        # `icontains` compares UPPER(name), so both arms use the index.
+        queryset = queryset.alias(upper_name=Upper('name')).filter(
+            Q(name__icontains=q) | Q(upper_name__trigram_similar=q),
+        ).annotate(
+            similarity=TrigramSimilarity('name', q),
+        ).order_by('-similarity', Lower('name'), 'id')
+    if prefix:
+        queryset = queryset.filter(name__istartswith=prefix)
+        if not q:
+            queryset = queryset.order_by(Lower('name'), 'id')
+    return queryset[:settings.AUTOCOMPLETE_LIMIT]
+
+
+def cache_version(cache, model, user_id):
+    """Return the version of the user's cached results for `model`."""
+    key = f'{CACHE_PREFIX}{model._meta.label_lower}:{user_id}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(model, user_id):
+    """Drop the user's cached results for `model`."""
+    cache = shared_cache()
+    if cache is not None:
+        cache.set(f'{CACHE_PREFIX}{model._meta.label_lower}:{user_id}',
+                  time.time_ns(), None)
+
+
+def cache_key(cache, model, user_id, prefix, fields=None):
+    """Return the cache key of the results for a prefix."""
+    digest = hashlib.sha256(
+        f'{",".join(fields or [])}:{prefix.lower()}'.encode()).hexdigest()
+    version = cache_version(cache, model, user_id)
+    return (f'{CACHE_PREFIX}{model._meta.label_lower}:{user_id}:'
+            f'{version}:{digest}')
+
+
+class AutocompleteMixin:
+    """
+    Limit `list` to the rows matching `?prefix=` or `?q=`, caching the
+    results of short prefixes.
+    """
+
+    def get_autocomplete(self):
+        """
+        Return the `prefix` and `q` parameters, None when empty, raising
+        ValidationError for values the database can't compare.
+        """
+        params = AutocompleteQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return (params.validated_data.get('prefix') or None,
+                params.validated_data.get('q') or None)
+
+    def filter_autocomplete(self, queryset):
+        """Return the rows of `queryset` matching the parameters."""
+        prefix, q = self.get_autocomplete()
+        if prefix is None and q is None:
+            return queryset
+        return autocomplete(queryset, prefix, q)
+
+    def autocomplete_cache_key(self, fields=None):
+        """
+        Return the cache key of the response, or None when it isn't
+        cached: only short prefixes are, in the shared cache.
+        """
+        prefix, q = self.get_autocomplete()
+        cache = shared_cache()
+        if (cache is None or prefix is None or q is not None or
+                len(prefix) > settings.AUTOCOMPLETE_CACHE_PREFIX_LENGTH):
+            return None
+        return cache_key(cache, self.queryset.model, self.request.user.pk,
+                         prefix, fields)
@@ -0,0 +1,66 @@
+"""
+Recipes that can be cooked from a set of ingredients
+
+Answered from the `ingredient_ids` array denormalized onto recipes and its
+GIN index: `&&` (overlap) and `<@` (contained by) find the candidates
+without joining the ingredients table, and the ingredients missing from
+the set are counted within each row.
+"""
+from django.db.models import (
+    BigIntegerField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Func,
+    IntegerField,
+)
+from django.db.models.functions import Cast
+
+from recipe import readers
+from recipe.expressions import CountElements
+
+
+def cookable_recipes(queryset, ingredient_ids, missing=0):
+    """
+    Return the recipes of `queryset` using some of `ingredient_ids` and
+    lacking at most `missing` ingredients, best covered first, annotated
+    with the number of `missing_count` ingredients and the `coverage`
+    ratio of the ingredients at hand.
+    """
+    if missing:
+        queryset = queryset.filter(ingredient_ids__overlap=ingredient_ids)
+    else:
+        queryset = queryset.filter(
+            ingredient_ids__contained_by=ingredient_ids,
+            ingredient_ids__len__gt=0,
+        )
+    total = Func(F('ingredient_ids'), function='cardinality',
+                 output_field=IntegerField())
+    return queryset.annotate(
+        missing_count=CountElements(
+            'ingredient_ids', ingredient_ids, BigIntegerField(),
+            present=False),
+        coverage=ExpressionWrapper(
+            1.0 - Cast('missing_count', FloatField()) / total,
+            output_field=FloatField()),
+    ).filter(missing_count__lte=missing).order_by(
+        '-coverage', 'missing_count', '-id')
+
+
+def read_cookable(queryset, ingredient_ids, missing=0):
+    """
+    Return the `RecipeSerializer` representation of the cookable recipes
+    with their `coverage` and the `missing_ingredients` as [{id, name}].
+    """
+    at_hand = set(ingredient_ids)
+    rows = list(cookable_recipes(queryset, ingredient_ids, missing).values(
+        *readers.recipe_columns(readers.RECIPE_LIST_FIELDS), 'coverage'))
+    data = []
+    for row, recipe in zip(rows, readers.build_recipe_list(rows)):
+        recipe['coverage'] = round(row['coverage'], 4)
+        recipe['missing_ingredients'] = [
+            ingredient for ingredient in recipe['ingredients']
+            if ingredient['id'] not in at_hand
+        ]
+        data.append(recipe)
+    return data
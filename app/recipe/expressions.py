@@ -0,0 +1,33 @@
+"""
+Query expressions over the arrays denormalized onto recipes
+"""
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import Func, IntegerField, Value
+from django.db.models.functions import Cast
+
+
+class CountElements(Func):
+    """
+    Count the elements of an array expression that are in `values`, or
+    that aren't with `present=False`. `base_field` is the field of the
+    array's elements.
+    """
+    output_field = IntegerField()
+
+    def __init__(self, expression, values, base_field, present=True):
+        self.present = present
+        super().__init__(expression, Cast(
+            Value(list(values)), ArrayField(base_field)))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        array, array_params = compiler.compile(self.source_expressions[0])
+        values, values_params = compiler.compile(self.source_expressions[1])
+        if self.present:
+            condition = f'element = ANY({values})'
+        else:
+            condition = f'element <> ALL({values})'
+        return (
+            f'(SELECT count(*) FROM unnest({array}) AS element '
+            f'WHERE {condition})',
+            (*array_params, *values_params),
+        )
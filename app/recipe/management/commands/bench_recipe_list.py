@@ -0,0 +1,104 @@
+"""
+Django command to benchmark recipe list serialization
+"""
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.denormalize import refresh_recipe_attrs
+from core.models import Recipe, Tag, Ingredient
+from recipe.readers import read_recipe_list
+from recipe.rendering import read_list_content, render_recipes
+from recipe.serializers import RecipeSerializer
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data."""
+
+
+class Command(BaseCommand):
+    """
+    Django command to benchmark recipe list serialization
+    """
+    help = ('Compare RecipeSerializer with the read-only fast path on a '
+            'generated library. The data is rolled back afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=2000,
+            help='Number of recipes to generate.')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of timed runs per implementation.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to benchmark recipe list serialization
+        """
+        try:
+            with transaction.atomic():
+                queryset = self._create_library(options['recipes'])
+                self._compare(queryset, options['recipes'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _create_library(self, count):
+        """Create a user with `count` recipes, each with tags/ingredients."""
+        user = get_user_model().objects.create_user(
+            email='bench-recipe-list@example.com', password='bench123')
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}') for i in range(20))
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'Ingredient {i}') for i in range(50))
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=i % 90,
+                   price=Decimal('4.50'), link='http://example.com')
+            for i in range(count))
+
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tags[(i + j) % 20])
+            for i, recipe in enumerate(recipes) for j in range(3))
+        Recipe.ingredients.through.objects.bulk_create(
+            Recipe.ingredients.through(
+                recipe=recipe, ingredient=ingredients[(i + j) % 50])
+            for i, recipe in enumerate(recipes) for j in range(6))
+        # Bulk inserts into the through tables send no m2m_changed.
+        refresh_recipe_attrs(Recipe.objects.filter(user=user))
+        render_recipes([recipe.pk for recipe in recipes])
+
+        return Recipe.objects.filter(user=user).order_by('-id')
+
+    def _compare(self, queryset, count, repeat):
+        """Time both implementations and check their output matches."""
+        renderer = JSONRenderer()
+        implementations = [
+            ('RecipeSerializer',
+             lambda: RecipeSerializer(
+                 queryset.prefetch_related('tags', 'ingredients'),
+                 many=True).data),
+            ('read_recipe_list', lambda: read_recipe_list(queryset)),
+            ('read_list_content', lambda: read_list_content(queryset)),
+        ]
+
+        outputs = {}
+        for label, build in implementations:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                output = build()
+                if not isinstance(output, bytes):
+                    output = renderer.render(output)
+                outputs[label] = output
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(
+                f'{label:<19} {best * 1000:9.1f} ms  '
+                f'{count / best:10.0f} recipes/s')
+
+        if len(set(outputs.values())) != 1:
+            self.stdout.write(self.style.ERROR('Outputs differ!'))
@@ -0,0 +1,55 @@
+"""
+Django command to recompute the similarity scores of recipes
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe
+from recipe.similarity import forget_frequencies, index_recipes, tokenize
+
+
+class Command(BaseCommand):
+    """
+    Django command to recompute the similarity scores of recipes
+    """
+    help = ('Store the words of every recipe, then score each recipe '
+            'against the recipes similar to it, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Recipes indexed per batch.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to recompute the similarity scores of recipes
+        """
+        # Words first, so every recipe is found by the words it shares.
+        for pks in self._batches(options['batch_size']):
+            with transaction.atomic():
+                for row in Recipe.objects.filter(pk__in=pks).values(
+                        'id', 'title', 'description'):
+                    Recipe.objects.filter(pk=row['id']).update(
+                        terms=tokenize(row['title'], row['description']))
+        forget_frequencies(
+            Recipe.objects.values_list('user_id', flat=True).distinct())
+
+        total = 0
+        for pks in self._batches(options['batch_size']):
+            index_recipes(pks, force=True)
+            total += len(pks)
+            self.stdout.write(f'{total} recipes indexed...')
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} recipes.'))
+
+    def _batches(self, batch_size):
+        """Yield the recipe pks in batches of `batch_size`."""
+        last_pk = 0
+        while True:
+            pks = list(
+                Recipe.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                return
+            yield pks
+            last_pk = pks[-1]
@@ -0,0 +1,45 @@
+"""
+Django command to render the JSON of recipes
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.rendering import render_recipes, stale_recipes
+
+
+class Command(BaseCommand):
+    """
+    Django command to render the JSON of recipes
+    """
+    help = ('Render the JSON of the recipes whose pre-rendered JSON is '
+            'stale or missing, or of every recipe with --all, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Recipes rendered per transaction.')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Render every recipe, current JSON included.')
+
+    def handle(self, *args, **options):
+        """
+        Django command to render the JSON of recipes
+        """
+        recipes = Recipe.objects.all()
+        if not options['all']:
+            recipes = stale_recipes(recipes)
+        total = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                recipes.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not pks:
+                break
+            total += render_recipes(pks)
+            last_pk = pks[-1]
+            self.stdout.write(f'{total} recipes rendered...')
+        self.stdout.write(self.style.SUCCESS(f'Rendered {total} recipes.'))
@@ -0,0 +1,114 @@
+"""
+Read-only fast paths for the recipe API.
+
+Builds the same representations as the serializers from `.values()` rows
+of the recipe table alone, reading tags and ingredients from the arrays
+denormalized onto recipes and skipping `Serializer.to_representation`.
+"""
+from rest_framework import serializers
+
+from core.denormalize import DENORMALIZED_RELATIONS
+from core.models import Recipe
+
+
+RECIPE_LIST_COLUMNS = ['id', 'title', 'time_minutes', 'price', 'link']
+RECIPE_LIST_FIELDS = RECIPE_LIST_COLUMNS + ['tags', 'ingredients']
+RECIPE_DETAIL_COLUMNS = RECIPE_LIST_COLUMNS + ['description', 'image']
+RECIPE_DETAIL_FIELDS = RECIPE_LIST_FIELDS + ['description', 'image']
+
+_price_field = Recipe._meta.get_field('price')
+PRICE_FIELD = serializers.DecimalField(
+    max_digits=_price_field.max_digits,
+    decimal_places=_price_field.decimal_places,
+)
+IMAGE_STORAGE = Recipe._meta.get_field('image').storage
+
+
+def recipe_columns(fields):
+    """Return the recipe columns to query for `fields`, starting with id."""
+    columns = ['id']
+    for name in fields:
+        if name in DENORMALIZED_RELATIONS:
+            columns.extend(DENORMALIZED_RELATIONS[name])
+        elif name in RECIPE_DETAIL_COLUMNS and name != 'id':
+            columns.append(name)
+    return columns
+
+
+def image_url(name, request=None):
+    """Return the `ImageField` representation of a stored image name."""
+    if not name:
+        return None
+    url = IMAGE_STORAGE.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def attr_getter(name, included=None):
+    """
+    Return a function giving the `name` ('tags' or 'ingredients') field of
+    a recipe row from its denormalized arrays: [{id, name}], or [id]
+    collecting {id: name} into `included[name]` when given.
+    """
+    ids_column, names_column = DENORMALIZED_RELATIONS[name]
+    if included is None:
+        return lambda row: [
+            {'id': attr_id, 'name': attr_name}
+            for attr_id, attr_name in zip(row[ids_column], row[names_column])
+        ]
+
+    names = included.setdefault(name, {})
+
+    def get(row):
+        names.update(zip(row[ids_column], row[names_column]))
+        return row[ids_column]
+    return get
+
+
+def build_recipe_list(rows, fields=None, included=None, request=None):
+    """
+    Build the `RecipeSerializer` representation of recipe rows, limited to
+    `fields` (in serializer order) when given. `RECIPE_DETAIL_FIELDS` gives
+    the `RecipeDetailSerializer` representation, with image URLs made
+    absolute for `request`.
+
+    With an `included` dict, tags and ingredients are represented by their
+    ids as in `RecipeAttrListSerializer`.
+    """
+    fields = fields or RECIPE_LIST_FIELDS
+    to_price = PRICE_FIELD.to_representation
+    getters = []
+    for name in fields:
+        if name in DENORMALIZED_RELATIONS:
+            getters.append((name, attr_getter(name, included)))
+        elif name == 'price':
+            getters.append((name, lambda row: to_price(row['price'])))
+        elif name == 'image':
+            getters.append((name, lambda row: image_url(row['image'],
+                                                        request)))
+        else:
+            getters.append((name, lambda row, name=name: row[name]))
+
+    return [{name: get(row) for name, get in getters} for row in rows]
+
+
+def read_recipe_list(queryset, fields=None, included=None, request=None):
+    """
+    Return the `RecipeSerializer(many=True)` data for `queryset` using plain
+    dicts, querying only the columns of `fields` from the recipe table.
+    """
+    fields = fields or RECIPE_LIST_FIELDS
+    rows = queryset.values(*recipe_columns(fields))
+    return build_recipe_list(rows, fields, included, request)
+
+
+async def aread_recipes(queryset, fields=RECIPE_LIST_FIELDS, included=None,
+                        request=None):
+    """Async `read_recipe_list` using the async ORM."""
+    rows = [row async for row in queryset.values(*recipe_columns(fields))]
+    return build_recipe_list(rows, fields, included, request)
+
+
+async def aread_attrs(queryset, fields):
+    """Return the tag or ingredient serializer data for `queryset`."""
+    return [{name: row[name] for name in fields}
+            async for row in queryset.values(*fields)]
@@ -0,0 +1,140 @@
+"""
+Pre-rendered JSON of recipes
+
+Each recipe stores the JSON of its `RecipeSerializer` representation in
+`rendered`, current while `rendered_for` equals `updated_at`. Every change
+to a recipe, its tags or its ingredients moves `updated_at` and sends
+`core.signals.recipes_changed`, upon which the JSON is rendered again in a
+background thread once the transaction commits (see `recipe.tasks`).
+
+The JSON is stored with `rendered_format`, a hash of the code producing the
+representation, so a deploy changing it makes every stored JSON stale.
+
+Reads copy current JSON into the response as it is, and render the rows
+whose JSON is stale or missing as they go.
+"""
+import hashlib
+import inspect
+import sys
+
+from django.db import transaction
+from django.db.models import F, Q
+from rest_framework.renderers import JSONRenderer
+
+from core import denormalize
+from core.models import Recipe
+from recipe import readers, serializers
+
+
+RENDER_COLUMNS = ['rendered', 'rendered_for', 'rendered_format',
+                  'updated_at']
+RECIPE_LIST_COLUMNS = readers.recipe_columns(readers.RECIPE_LIST_FIELDS)
+RECIPE_DETAIL_COLUMNS = readers.recipe_columns(readers.RECIPE_DETAIL_FIELDS)
+
+_renderer = JSONRenderer()
+
+
+def representation_format():
+    """
+    Return the hash of the sources producing the list representation: the
+    denormalized arrays, the readers, the serializers and this module.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for module in (denormalize, readers, serializers, sys.modules[__name__]):
+        digest.update(inspect.getsource(module).encode())
+    return int.from_bytes(digest.digest(), 'big', signed=True)
+
+
+RENDER_FORMAT = representation_format()
+
+
+def render_row(row):
+    """Return the JSON of the list representation of a recipe row."""
+    return _renderer.render(readers.build_recipe_list([row])[0])
+
+
+def current_json(row):
+    """Return the stored JSON of a recipe row, or None when stale."""
+    if (row['rendered'] is None or
+            row['rendered_for'] != row['updated_at'] or
+            row['rendered_format'] != RENDER_FORMAT):
+        return None
+    return bytes(row['rendered'])
+
+
+def list_content(rows):
+    """
+    Return the JSON of the `RecipeSerializer(many=True)` representation of
+    recipe rows with `RECIPE_LIST_COLUMNS` and `RENDER_COLUMNS`.
+    """
+    return b'[' + b','.join(
+        current_json(row) or render_row(row) for row in rows) + b']'
+
+
+def detail_content(row, request=None):
+    """
+    Return the JSON of the `RecipeDetailSerializer` representation of a
+    recipe row with `RECIPE_DETAIL_COLUMNS` and `RENDER_COLUMNS`: the list
+    JSON followed by the detail fields.
+    """
+    content = current_json(row) or render_row(row)
+    image = readers.image_url(row['image'], request)
+    return b'%s,"description":%s,"image":%s}' % (
+        content[:-1],
+        _renderer.render(row['description']),
+        _renderer.render(image) if image is not None else b'null',
+    )
+
+
+def read_list_content(queryset):
+    """Return the JSON list of the recipes of `queryset`."""
+    return list_content(
+        queryset.values(*RECIPE_LIST_COLUMNS, *RENDER_COLUMNS))
+
+
+def read_detail_content(queryset, request=None):
+    """Return the detail JSON of the recipe of `queryset`, or None."""
+    row = queryset.values(*RECIPE_DETAIL_COLUMNS, *RENDER_COLUMNS).first()
+    return None if row is None else detail_content(row, request)
+
+
+async def aread_list_content(queryset):
+    """Async `read_list_content` using the async ORM."""
+    return list_content([
+        row async for row in
+        queryset.values(*RECIPE_LIST_COLUMNS, *RENDER_COLUMNS)
+    ])
+
+
+async def aread_detail_content(queryset, request=None):
+    """Async `read_detail_content` using the async ORM."""
+    row = await queryset.values(
+        *RECIPE_DETAIL_COLUMNS, *RENDER_COLUMNS).afirst()
+    return None if row is None else detail_content(row, request)
+
+
+def render_recipes(pks):
+    """
+    Store the JSON of the recipes with `pks`, unless they changed while
+    rendering. Return the number stored.
+    """
+    rows = Recipe.objects.filter(pk__in=pks).values(
+        *RECIPE_LIST_COLUMNS, 'updated_at')
+    stored = 0
+    with transaction.atomic():
+        for row in rows:
+            stored += Recipe.objects.filter(
+                pk=row['id'], updated_at=row['updated_at'],
+            ).update(rendered=render_row(row), rendered_for=row['updated_at'],
+                     rendered_format=RENDER_FORMAT)
+    return stored
+
+
+def stale_recipes(recipes):
+    """
+    Return the `recipes` whose JSON is stale or missing, or rendered by
+    other code.
+    """
+    return recipes.exclude(
+        Q(rendered__isnull=False) & Q(rendered_for=F('updated_at')) &
+        Q(rendered_format=RENDER_FORMAT))
@@ -1,11 +1,26 @@
 """
 Serializers for recipe API.
 """
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 from core.models import Recipe, Tag, Ingredient
 
 
-class TagSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    Serializer mixin limiting the output to the `fields` keyword argument.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TagSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for tag objects."""
 
     class Meta:
@@ -14,7 +29,8 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(DynamicFieldsMixin,
+                           serializers.ModelSerializer):
     """Serializer for ingredients."""
 
     class Meta:
@@ -23,10 +39,42 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeAttrListSerializer(serializers.ListSerializer):
+    """
+    List serializer for a recipe's tags or ingredients, ordered by id.
+
+    When the serializer context holds an `included` dict, only the ids are
+    returned and the names are collected into
+    `included[field_name][id]`, deduplicated across the whole response.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, 'all') else data
+        items = sorted(iterable, key=lambda item: item.pk)
+
+        included = self.context.get('included')
+        if included is None:
+            return [self.child.to_representation(item) for item in items]
+
+        names = included.setdefault(self.field_name, {})
+        for item in items:
+            names[item.pk] = item.name
+        return [item.pk for item in items]
+
+
+def sorted_included(included):
+    """Return the `included` dict with each relation sorted by id."""
+    return {
+        name: dict(sorted(values.items()))
+        for name, values in included.items()
+    }
+
+
+class RecipeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
-    tags = TagSerializer(many=True, required=False)
-    ingredients = IngredientSerializer(many=True, required=False)
+    tags = RecipeAttrListSerializer(child=TagSerializer(), required=False)
+    ingredients = RecipeAttrListSerializer(
+        child=IngredientSerializer(), required=False)
 
     class Meta:
         model = Recipe
@@ -34,50 +82,60 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'price', 'link', 'tags', 'ingredients']
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _get_or_create_tags(self, tags):
         """Handle get or create tags as needed."""
         auth_user = self.context['request'].user
 
+        tag_objs = []
         for tag in tags:
             tag_obj, created = Tag.objects.get_or_create(
                 user=auth_user,
                 **tag
             )
-            recipe.tags.add(tag_obj)
+            tag_objs.append(tag_obj)
+        return tag_objs
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
+    def _get_or_create_ingredients(self, ingredients):
         """Handle get or create ingredients as needed."""
         auth_user = self.context['request'].user
 
+        ingredient_objs = []
         for ingredient in ingredients:
             ingredient_obj, created = Ingredient.objects.get_or_create(
                 user=auth_user,
                 **ingredient
             )
-            recipe.ingredients.add(ingredient_obj)
+            ingredient_objs.append(ingredient_obj)
+        return ingredient_objs
 
+    @transaction.atomic
     def create(self, validated_data):
-        """Create a new recipe."""
+        """
+        Create a new recipe. Written in one transaction, so the tasks on
+        changed recipes are scheduled once, on commit.
+        """
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        # Added at once, so the denormalized arrays are refreshed once.
+        recipe.tags.add(*self._get_or_create_tags(tags))
+        recipe.ingredients.add(
+            *self._get_or_create_ingredients(ingredients))
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Update a recipe."""
+        """Update a recipe, in one transaction like `create`."""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_tags(tags))
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            instance.ingredients.set(
+                self._get_or_create_ingredients(ingredients))
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -104,3 +162,67 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'image': {'required': True}
         }
+
+
+class IdListField(serializers.CharField):
+    """
+    Field for a comma separated list of ids, as a sorted list. Ids must fit
+    the bigint ids of the database.
+    """
+    default_error_messages = {
+        'invalid': 'Expected comma separated ids.',
+        'empty': 'At least one id is required.',
+        'out_of_range': 'Ids must be between {min_id} and {max_id}.',
+    }
+    min_id = 1
+    max_id = 2 ** 63 - 1
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        try:
+            ids = {int(item) for item in value.split(',') if item.strip()}
+        except ValueError:
+            self.fail('invalid')
+        if not ids:
+            self.fail('empty')
+        if min(ids) < self.min_id or max(ids) > self.max_id:
+            self.fail('out_of_range', min_id=self.min_id, max_id=self.max_id)
+        return sorted(ids)
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of the cookable recipes query."""
+    ingredients = IdListField(
+        help_text='Comma separated list of ingredient ids at hand.')
+    missing = serializers.IntegerField(
+        min_value=0, default=0,
+        help_text='Number of ingredients a recipe may lack.')
+
+
+class ShoppingListQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of the shopping list."""
+    recipes = IdListField(
+        help_text='Comma separated list of recipe ids to shop for.')
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Serializer for the autocomplete parameters of the attribute lists."""
+    prefix = serializers.CharField(
+        required=False, allow_blank=True, max_length=255)
+    q = serializers.CharField(
+        required=False, allow_blank=True, max_length=255)
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    """Serializer for an ingredient of the shopping list."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipe_count = serializers.IntegerField(
+        help_text='Number of the recipes using the ingredient.')
+
+
+class SimilarQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of the similar recipes query."""
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.SIMILAR_RECIPES_INDEX_SIZE,
+        default=10, help_text='Number of similar recipes to return.')
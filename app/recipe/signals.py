@@ -0,0 +1,33 @@
+"""
+Signal handlers scheduling the background work on changed recipes, and
+dropping cached autocomplete results
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient
+from core.signals import recipes_changed
+from recipe import autocomplete, tasks
+from recipe.rendering import render_recipes
+from recipe.similarity import index_recipes
+
+
+@receiver(recipes_changed)
+def render_changed(sender, pks, **kwargs):
+    """Render the JSON of changed recipes after the transaction."""
+    tasks.schedule(render_recipes, pks)
+
+
+@receiver(recipes_changed)
+def index_changed(sender, pks, **kwargs):
+    """Score changed recipes against similar ones after the transaction."""
+    tasks.schedule(index_recipes, pks)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_autocomplete(sender, instance, **kwargs):
+    """Drop the user's cached autocomplete results for the model."""
+    autocomplete.invalidate(sender, instance.user_id)
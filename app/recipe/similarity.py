@@ -0,0 +1,336 @@
+"""
+Similar recipes
+
+Recipes are compared by the Jaccard overlap of their tags and ingredients
+and the cosine similarity of the TF-IDF vectors of their title and
+description words, weighted by SIMILAR_RECIPES_ATTR_WEIGHT. Vectors are
+sparse: dicts of word -> weight, with IDF from the user's library.
+
+Each recipe's list in `RecipeSimilarity` holds the
+SIMILAR_RECIPES_INDEX_SIZE most similar recipes scoring at least
+SIMILAR_RECIPES_MIN_SCORE. A recipe whose ids or words changed is scored
+against the recipes listing it and the SIMILAR_RECIPES_MAX_CANDIDATES
+recipes sharing the most ingredients and words with it, found with the GIN
+indexes of the arrays on `Recipe`. Its list is replaced, and its score
+updated in the lists of the recipes scored, trimmed back to size. Indexing
+never compares every pair and reading is a lookup of the stored scores.
+
+Word frequencies are cached for SIMILAR_RECIPES_IDF_SECONDS and updated
+as recipes are indexed. Scores between unchanged recipes keep the IDF of
+when they were computed; `python manage.py index_similar_recipes`
+recomputes them all.
+"""
+import hashlib
+import heapq
+import math
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import (
+    BigIntegerField,
+    CharField,
+    Count,
+    F,
+    Min,
+    Q,
+    Window,
+)
+from django.db.models.functions import RowNumber
+
+from core.models import Recipe, RecipeSimilarity
+from recipe.expressions import CountElements
+
+
+IDF_CACHE_PREFIX = 'recipe-idf:'
+WORD_RE = re.compile(r'\w+')
+MAX_TERMS = 200
+STOP_WORDS = frozenset('''
+    a an and are as at be but by for from in into is it of on or so the
+    then this to with without your you
+'''.split())
+
+
+def tokenize(*texts):
+    """Return the sorted distinct words of `texts`, stop words left out."""
+    terms = set()
+    for text in texts:
+        for word in WORD_RE.findall(text.lower()):
+            if len(word) > 1 and not word.isdigit() and word not in STOP_WORDS:
+                terms.add(word[:64])
+    return sorted(terms)[:MAX_TERMS]
+
+
+def attr_set(row):
+    """Return the tags and ingredients of a recipe row as one set."""
+    return ({('tag', pk) for pk in row['tag_ids']} |
+            {('ingredient', pk) for pk in row['ingredient_ids']})
+
+
+def jaccard(first, second):
+    """Return the Jaccard index of two sets."""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def tfidf_vector(terms, idf):
+    """Return the unit TF-IDF vector of distinct `terms`."""
+    vector = {term: idf[term] for term in terms if term in idf}
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {term: weight / norm for term, weight in vector.items()}
+
+
+def cosine(first, second):
+    """Return the cosine similarity of two unit sparse vectors."""
+    if len(second) < len(first):
+        first, second = second, first
+    return sum(weight * second.get(term, 0.0)
+               for term, weight in first.items())
+
+
+def similarity(first, second):
+    """
+    Return the similarity of two recipes given as (attribute set, TF-IDF
+    vector) pairs.
+    """
+    attr_weight = settings.SIMILAR_RECIPES_ATTR_WEIGHT
+    return (attr_weight * jaccard(first[0], second[0]) +
+            (1 - attr_weight) * cosine(first[1], second[1]))
+
+
+def document_frequencies(user_id):
+    """
+    Return the number of recipes of the user using each word, cached for
+    SIMILAR_RECIPES_IDF_SECONDS.
+    """
+    key = f'{IDF_CACHE_PREFIX}{user_id}'
+    frequencies = cache.get(key)
+    if frequencies is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT term, count(*) FROM {Recipe._meta.db_table}, '
+                f'unnest(terms) AS term WHERE user_id = %s GROUP BY term',
+                [user_id],
+            )
+            frequencies = dict(cursor.fetchall())
+        cache.set(key, frequencies, settings.SIMILAR_RECIPES_IDF_SECONDS)
+    return frequencies
+
+
+def update_frequencies(user_id, old_terms, new_terms):
+    """Update the cached word frequencies of the user, if any."""
+    key = f'{IDF_CACHE_PREFIX}{user_id}'
+    frequencies = cache.get(key)
+    if frequencies is None:
+        return
+    old_terms, new_terms = set(old_terms), set(new_terms)
+    for term in old_terms - new_terms:
+        frequencies[term] = max(frequencies.get(term, 0) - 1, 0)
+    for term in new_terms - old_terms:
+        frequencies[term] = frequencies.get(term, 0) + 1
+    cache.set(key, frequencies, settings.SIMILAR_RECIPES_IDF_SECONDS)
+
+
+def forget_frequencies(user_ids):
+    """Drop the cached word frequencies of the users."""
+    cache.delete_many([f'{IDF_CACHE_PREFIX}{pk}' for pk in user_ids])
+
+
+def inverse_document_frequencies(user_id, terms):
+    """
+    Return the smoothed IDF of `terms` among the recipes of the user, as
+    `log((1 + n) / (1 + df)) + 1`.
+    """
+    count = Recipe.objects.filter(user_id=user_id).count()
+    frequencies = document_frequencies(user_id)
+    return {
+        term: math.log((1 + count) / (1 + frequencies.get(term, 0))) + 1
+        for term in terms
+    }
+
+
+def candidates(row, terms):
+    """
+    Return the SIMILAR_RECIPES_MAX_CANDIDATES recipes sharing the most
+    ingredients and words with `row`. Tags are left out: broad tags are
+    shared by much of a library, and a shared tag alone scores little.
+    """
+    shared = Q()
+    if row['ingredient_ids']:
+        shared |= Q(ingredient_ids__overlap=row['ingredient_ids'])
+    if terms:
+        shared |= Q(terms__overlap=terms)
+    if not shared:
+        return []
+    return list(
+        Recipe.objects.filter(shared, user_id=row['user_id'])
+        .exclude(pk=row['id'])
+        .annotate(shared=(
+            CountElements('ingredient_ids', row['ingredient_ids'],
+                          BigIntegerField()) +
+            CountElements('terms', terms, CharField(max_length=64))
+        ))
+        .order_by('-shared', '-id')
+        .values('id', 'terms', 'tag_ids', 'ingredient_ids')
+        [:settings.SIMILAR_RECIPES_MAX_CANDIDATES]
+    )
+
+
+def similarity_key(row, terms):
+    """Return the hash of the ids and words a recipe row is scored from."""
+    digest = hashlib.blake2b(repr((
+        sorted(row['tag_ids']), sorted(row['ingredient_ids']), terms,
+    )).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def listing_recipes(row, exclude):
+    """Return the recipes listing `row` as similar, but for `exclude`."""
+    return list(
+        Recipe.objects.filter(similarities__similar_id=row['id'])
+        .exclude(pk__in=exclude)
+        .values('id', 'terms', 'tag_ids', 'ingredient_ids')
+    )
+
+
+def update_listings(pk, scores):
+    """
+    Update the score of recipe `pk` in the lists of the recipes it was
+    scored against, given as {recipe pk: score}: dropped below
+    SIMILAR_RECIPES_MIN_SCORE, added to the lists it ranks in, which are
+    trimmed back to SIMILAR_RECIPES_INDEX_SIZE.
+    """
+    size = settings.SIMILAR_RECIPES_INDEX_SIZE
+    min_score = settings.SIMILAR_RECIPES_MIN_SCORE
+    lists = {
+        row['recipe_id']: row
+        for row in RecipeSimilarity.objects.filter(recipe_id__in=list(scores))
+        .values('recipe_id')
+        .annotate(count=Count('id'), lowest=Min('score'),
+                  listed=Count('id', filter=Q(similar_id=pk)))
+    }
+    listed = [other for other, row in lists.items() if row['listed']]
+    RecipeSimilarity.objects.filter(
+        similar_id=pk,
+        recipe_id__in=[other for other in listed if scores[other] < min_score],
+    ).delete()
+
+    full = set()
+    added = []
+    for other, score in scores.items():
+        row = lists.get(other)
+        if score < min_score or (row and row['listed']):
+            continue
+        if row and row['count'] >= size:
+            if score <= row['lowest']:
+                continue
+            full.add(other)
+        added.append(other)
+    kept = [other for other in listed if scores[other] >= min_score]
+    # Sorted, so concurrent indexing locks rows in the same order.
+    RecipeSimilarity.objects.bulk_create(
+        [RecipeSimilarity(recipe_id=other, similar_id=pk,
+                          score=scores[other])
+         for other in sorted(kept + added)],
+        update_conflicts=True,
+        unique_fields=['recipe', 'similar'],
+        update_fields=['score'],
+    )
+
+    if full:
+        ranked = RecipeSimilarity.objects.filter(recipe_id__in=full).annotate(
+            rank=Window(RowNumber(), partition_by=F('recipe_id'),
+                        order_by=[F('score').desc(), F('similar_id').desc()]),
+        ).filter(rank__gt=size).values('pk')
+        RecipeSimilarity.objects.filter(pk__in=ranked).delete()
+
+
+def index_recipe(row, force=False):
+    """
+    Store the words of a recipe row and its scores with the recipes most
+    similar to it, unless its ids and words are unchanged since it was
+    last indexed and not `force`. Return the number of similar recipes
+    stored, None when skipped.
+    """
+    terms = tokenize(row['title'], row['description'])
+    key = similarity_key(row, terms)
+    if key == row['similarity_key'] and not force:
+        return None
+    Recipe.objects.filter(pk=row['id']).update(
+        terms=terms, similarity_key=key)
+    if terms != row['terms']:
+        update_frequencies(row['user_id'], row['terms'], terms)
+    others = candidates(row, terms)
+    others += listing_recipes(row, [other['id'] for other in others])
+
+    idf = inverse_document_frequencies(row['user_id'], set(terms).union(
+        *(other['terms'] for other in others)))
+    features = (attr_set(row), tfidf_vector(terms, idf))
+    scores = {
+        other['id']: similarity(features, (
+            attr_set(other), tfidf_vector(other['terms'], idf)))
+        for other in others
+    }
+    top = heapq.nlargest(
+        settings.SIMILAR_RECIPES_INDEX_SIZE,
+        ((score, pk) for pk, score in scores.items()
+         if score >= settings.SIMILAR_RECIPES_MIN_SCORE))
+
+    RecipeSimilarity.objects.filter(recipe_id=row['id']).delete()
+    RecipeSimilarity.objects.bulk_create(
+        RecipeSimilarity(recipe_id=row['id'], similar_id=pk, score=score)
+        for score, pk in top)
+    update_listings(row['id'], scores)
+    return len(top)
+
+
+def lock_user_lists(user_id):
+    """
+    Lock the similar recipe lists of the user's recipes until the current
+    transaction ends.
+
+    Indexing a recipe replaces its list and writes to the lists of the
+    recipes it is scored against, so concurrent runs for the same or
+    neighbouring recipes would conflict or deadlock. They run one after
+    the other instead.
+    """
+    digest = hashlib.blake2b(f'recipe.similarity:{user_id}'.encode(),
+                             digest_size=8).digest()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)',
+                       [int.from_bytes(digest, 'big', signed=True)])
+
+
+def index_recipes(pks, force=False):
+    """
+    Index the recipes with `pks` that still exist, one at a time under
+    the lock of their user's lists. Each recipe is read once the lock is
+    held, so a run following another for the same recipe skips it when
+    unchanged.
+    """
+    owners = Recipe.objects.filter(pk__in=pks).order_by('pk').values_list(
+        'pk', 'user_id')
+    for pk, user_id in owners:
+        with transaction.atomic():
+            lock_user_lists(user_id)
+            row = Recipe.objects.filter(pk=pk).values(
+                'id', 'user_id', 'title', 'description', 'terms', 'tag_ids',
+                'ingredient_ids', 'similarity_key').first()
+            if row is not None:
+                index_recipe(row, force)
+
+
+def similar_recipes(queryset, pk, limit):
+    """
+    Return the `limit` recipes of `queryset` most similar to the recipe
+    `pk`, annotated with their `score`.
+    """
+    return (
+        queryset.filter(similar_to__recipe_id=pk)
+        .annotate(score=F('similar_to__score'))
+        .order_by('-score', '-id')[:limit]
+    )
@@ -0,0 +1,117 @@
+"""
+Delta sync of the recipe, tag and ingredient lists.
+
+`?since=<cursor>` returns the rows changed after the cursor was issued,
+the ids deleted since under `deleted`, and the next `cursor`. Cursors are
+microseconds since the epoch; `since=0` returns every row.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.models import Tombstone
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+SYNC_PARAMETERS = [
+    OpenApiParameter(
+        'since', OpenApiTypes.STR,
+        description='Cursor returned by the previous sync (`0` for a full '
+                    'sync). Returns the rows changed since under '
+                    '`results`, deleted ids under `deleted` and the next '
+                    '`cursor`.',
+    ),
+]
+
+
+class CursorExpired(APIException):
+    """The tombstones since the cursor were pruned."""
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Cursor expired, sync again with since=0.'
+    default_code = 'cursor_expired'
+
+
+def encode_cursor(moment):
+    """Return the cursor for changes after `moment`."""
+    return str((moment - EPOCH) // timedelta(microseconds=1))
+
+
+def decode_cursor(value):
+    """Return the moment of cursor `value`, raising ValidationError."""
+    try:
+        microseconds = int(value)
+        if microseconds < 0:
+            raise ValueError(value)
+        return EPOCH + timedelta(microseconds=microseconds)
+    except (ValueError, OverflowError):
+        raise ValidationError({'since': 'Invalid cursor.'})
+
+
+def tombstone_horizon():
+    """Return the moment before which tombstones are pruned."""
+    return timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+
+
+def tombstone_ids(user, model, since):
+    """Return the query of the user's `model` ids deleted after `since`."""
+    return Tombstone.objects.filter(
+        user=user, model=model._meta.model_name, deleted_at__gt=since,
+    ).order_by('object_id').values_list('object_id', flat=True).distinct()
+
+
+def deleted_ids(user, model, since):
+    """Return the ids of the user's `model` rows deleted after `since`."""
+    if since == EPOCH:
+        return []
+    return list(tombstone_ids(user, model, since))
+
+
+class DeltaSyncMixin:
+    """
+    Limit `list` to the rows changed since `?since=`, adding the deleted
+    ids and the next cursor to the response.
+    """
+    sync_since = None
+
+    def start_sync(self):
+        """
+        Parse `?since=` before reading, keeping the moment the next cursor
+        starts from. Changes within SYNC_CURSOR_OVERLAP seconds are sent
+        again, so rows saved by transactions committing late aren't missed.
+        """
+        value = self.request.query_params.get('since')
+        if value is None:
+            return
+        since = decode_cursor(value)
+        if since != EPOCH and since < tombstone_horizon():
+            raise CursorExpired()
+
+        self.sync_since = since
+        self.sync_cursor = timezone.now() - timedelta(
+            seconds=settings.SYNC_CURSOR_OVERLAP)
+
+    def filter_changed(self, queryset):
+        """Return the rows of `queryset` changed since the cursor."""
+        if self.sync_since is None:
+            return queryset
+        return queryset.filter(updated_at__gt=self.sync_since)
+
+    def sync_data(self, data):
+        """Return the list `data` with the deleted ids and next cursor."""
+        if self.sync_since is None:
+            return data
+
+        if not isinstance(data, dict):
+            data = {'results': data}
+        return {
+            **data,
+            'deleted': deleted_ids(
+                self.request.user, self.queryset.model, self.sync_since),
+            'cursor': encode_cursor(self.sync_cursor),
+        }
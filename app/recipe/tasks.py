@@ -0,0 +1,70 @@
+"""
+Background work on changed recipes
+
+Tasks are functions of a list of recipe pks, run once the current
+transaction commits by a thread pool started lazily in each process, so
+forking servers don't share it. The pks scheduled for a task within a
+transaction are collected and passed in a single call.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_pending = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def run_task(task, pks):
+    """Run a task in a background thread."""
+    close_old_connections()
+    try:
+        task(pks)
+    except Exception:
+        logger.exception('%s of recipes %s failed', task.__name__, pks)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    """Return the thread pool, started in the current process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.RECIPE_TASK_WORKERS,
+                thread_name_prefix='recipe-task')
+        return _executor
+
+
+def flush():
+    """Run the tasks scheduled by the committed transaction."""
+    pending = getattr(_pending, 'tasks', None)
+    if not pending:
+        return
+    _pending.tasks = {}
+    for task, pks in pending.items():
+        if settings.RECIPE_TASK_WORKERS:
+            get_executor().submit(run_task, task, sorted(pks))
+        else:
+            task(sorted(pks))
+
+
+def schedule(task, pks):
+    """
+    Call `task` with the recipe `pks` once the current transaction commits,
+    once for all the changes of the transaction.
+
+    Recipes left pending by a rolled back transaction are passed with the
+    next one, which tasks must handle.
+    """
+    if not hasattr(_pending, 'tasks'):
+        _pending.tasks = {}
+    _pending.tasks.setdefault(task, set()).update(pks)
+    transaction.on_commit(flush)
@@ -0,0 +1,153 @@
+"""
+Tests for the async recipe read views.
+"""
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import urls as recipe_urls
+
+
+urlpatterns = [
+    path('api/recipe/', include(
+        (recipe_urls.async_urlpatterns + recipe_urls.urlpatterns, 'recipe'))),
+]
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+        'link': 'http://example.com/recipe.pdf',
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncReadViewTests(TestCase):
+    """Test the async views match the DRF views."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123')
+        self.token = Token.objects.create(user=self.user)
+        self.headers = {'authorization': f'Token {self.token.key}'}
+
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        for index in range(3):
+            recipe = create_recipe(self.user, title=f'Recipe {index}')
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+        self.recipe = recipe
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123')
+        self.other_recipe = create_recipe(other)
+
+    def drf_get(self, url, params=None):
+        """Return the response of the DRF view for `url`."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with override_settings(ROOT_URLCONF='app.urls'):
+            return client.get(url, params)
+
+    async def assert_same_as_drf(self, url, params=None):
+        """Assert the async view responds like the DRF view."""
+        expected = await sync_to_async(self.drf_get)(url, params)
+
+        res = await self.async_client.get(url, params, headers=self.headers)
+
+        self.assertEqual(res.status_code, expected.status_code)
+        self.assertEqual(res['Content-Type'], expected['Content-Type'])
+        self.assertEqual(res.content, expected.content)
+        return res
+
+    async def test_recipe_list(self):
+        """Test listing recipes matches the DRF view."""
+        res = await self.assert_same_as_drf(reverse('recipe:recipe-list'))
+
+        self.assertEqual(len(res.json()), 3)
+        # Only DRF views set the Allow header.
+        self.assertNotIn('Allow', res)
+
+    async def test_recipe_list_sparse_compact(self):
+        """Test sparse fieldsets and compact mode match the DRF view."""
+        await self.assert_same_as_drf(
+            reverse('recipe:recipe-list'),
+            {'fields': 'title,tags', 'compact': '1'})
+
+    async def test_recipe_detail(self):
+        """Test retrieving a recipe with an image matches the DRF view."""
+        await Recipe.objects.filter(pk=self.recipe.pk).aupdate(
+            image='uploads/recipe/sample.jpg')
+        url = reverse('recipe:recipe-detail', args=[self.recipe.pk])
+
+        res = await self.assert_same_as_drf(url)
+
+        self.assertTrue(res.json()['image'].startswith('http://testserver/'))
+
+    async def test_recipe_detail_compact(self):
+        """Test compact detail matches the DRF view."""
+        url = reverse('recipe:recipe-detail', args=[self.recipe.pk])
+
+        await self.assert_same_as_drf(url, {'compact': 'true'})
+
+    async def test_other_user_recipe_not_found(self):
+        """Test another user's recipe is not found."""
+        url = reverse('recipe:recipe-detail', args=[self.other_recipe.pk])
+
+        res = await self.assert_same_as_drf(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_unknown_field_rejected(self):
+        """Test unknown sparse fields return the DRF validation error."""
+        res = await self.assert_same_as_drf(
+            reverse('recipe:recipe-list'), {'fields': 'title,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_tag_and_ingredient_lists(self):
+        """Test listing tags and ingredients matches the DRF views."""
+        await self.assert_same_as_drf(reverse('recipe:tag-list'))
+        await self.assert_same_as_drf(
+            reverse('recipe:ingredient-list'), {'omit': 'id'})
+
+    async def test_auth_required(self):
+        """Test requests without a valid token are rejected."""
+        url = reverse('recipe:recipe-list')
+
+        missing = await self.async_client.get(url)
+        invalid = await self.async_client.get(
+            url, headers={'authorization': 'Token invalid'})
+
+        for res in (missing, invalid):
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    async def test_writes_use_drf_view(self):
+        """Test non-GET requests are handled by the DRF view."""
+        payload = {'title': 'New', 'time_minutes': 5, 'price': '1.00'}
+
+        res = await self.async_client.post(
+            reverse('recipe:recipe-list'), payload, headers=self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            await Recipe.objects.filter(user=self.user, title='New')
+            .aexists())
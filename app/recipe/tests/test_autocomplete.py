@@ -0,0 +1,105 @@
+"""
+Tests for the tag and ingredient autocomplete.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+}
+
+
+@override_settings(AUTOCOMPLETE_LIMIT=3)
+class AutocompleteApiTests(TestCase):
+    """Test autocompleting tag and ingredient names."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name in ('Tomato', 'tofu', 'Tomatillo', 'Tom yum paste',
+                     'Potato', 'Basil'):
+            Ingredient.objects.create(user=self.user, name=name)
+
+    def names(self, url=INGREDIENTS_URL, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_prefix(self):
+        """Test names starting with the prefix, limited and sorted."""
+        self.assertEqual(self.names(prefix='to'),
+                         ['tofu', 'Tom yum paste', 'Tomatillo'])
+        self.assertEqual(self.names(prefix='TOMATO'), ['Tomato'])
+
+    def test_fuzzy(self):
+        """Test names containing or resembling the query, best first."""
+        self.assertEqual(self.names(q='tomato')[:2],
+                         ['Tomato', 'Tomatillo'])
+        self.assertEqual(self.names(q='tomatoe')[0], 'Tomato')
+        self.assertEqual(self.names(q='asil'), ['Basil'])
+
+    def test_limited_to_user(self):
+        """Test other users' names aren't suggested."""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        Tag.objects.create(user=other, name='Vegan')
+        Tag.objects.create(user=self.user, name='Vegetarian')
+
+        self.assertEqual(self.names(TAGS_URL, prefix='veg'), ['Vegetarian'])
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_short_prefix_cached(self):
+        """Test short prefixes are answered from the cache until changed."""
+        self.names(prefix='ba')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(prefix='BA'), ['Basil'])
+
+        Ingredient.objects.create(user=self.user, name='Bay leaf')
+        self.assertEqual(self.names(prefix='ba'), ['Basil', 'Bay leaf'])
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_sparse_fieldsets_cached_apart(self):
+        """Test cached results are kept per field selection."""
+        self.names(prefix='ba')
+
+        res = self.client.get(INGREDIENTS_URL, {'prefix': 'ba',
+                                                'fields': 'id'})
+
+        self.assertEqual(list(res.data[0]), ['id'])
+
+    def test_not_cached_without_shared_cache(self):
+        """Test results aren't cached in the per-process cache."""
+        self.names(prefix='ba')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(prefix='ba'), ['Basil'])
+
+    def test_invalid_parameters(self):
+        """Test NUL characters and overlong values are rejected."""
+        for params in ({'q': 'to\x00'}, {'prefix': '\x00'},
+                       {'prefix': 'a' * 256}):
+            res = self.client.get(INGREDIENTS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.json())
+
+    def test_without_parameters_unchanged(self):
+        """Test lists without autocomplete parameters aren't limited."""
+        self.assertEqual(len(self.names()), 6)
@@ -0,0 +1,113 @@
+"""
+Tests for the cookable recipes query.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+COOKABLE_URL = reverse('recipe:recipe-cookable')
+
+
+def create_recipe(user, ingredients, **params):
+    """Create and return a sample recipe using `ingredients`."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    recipe = Recipe.objects.create(user=user, **defaults)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+class CookableApiTests(TestCase):
+    """Test listing the recipes cookable from a set of ingredients."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.egg, self.flour, self.milk, self.salt = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Egg', 'Flour', 'Milk', 'Salt')
+        ]
+        self.omelette = create_recipe(
+            self.user, [self.egg, self.salt], title='Omelette')
+        self.pancakes = create_recipe(
+            self.user, [self.egg, self.flour, self.milk], title='Pancakes')
+        self.bread = create_recipe(
+            self.user, [self.flour, self.salt], title='Bread')
+
+    def cookable(self, ingredients, **params):
+        """Return the titles of the cookable recipes."""
+        res = self.client.get(COOKABLE_URL, {
+            'ingredients': ','.join(str(i.id) for i in ingredients),
+            **params,
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_fully_covered(self):
+        """Test only recipes made entirely from the set are returned."""
+        data = self.cookable([self.egg, self.salt, self.milk])
+
+        self.assertEqual([r['title'] for r in data], ['Omelette'])
+        self.assertEqual(data[0]['coverage'], 1.0)
+        self.assertEqual(data[0]['missing_ingredients'], [])
+
+    def test_missing_ranked_by_coverage(self):
+        """Test recipes lacking up to `missing` are ranked by coverage."""
+        data = self.cookable([self.egg, self.milk], missing=1)
+
+        self.assertEqual([r['title'] for r in data],
+                         ['Pancakes', 'Omelette'])
+        self.assertEqual(data[0]['coverage'], 0.6667)
+        self.assertEqual(data[0]['missing_ingredients'],
+                         [{'id': self.flour.id, 'name': 'Flour'}])
+        self.assertEqual(data[1]['coverage'], 0.5)
+
+    def test_limited_to_user(self):
+        """Test other users' recipes aren't returned."""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        create_recipe(other, [self.egg], title='Other egg')
+
+        data = self.cookable([self.egg], missing=1)
+
+        self.assertEqual([r['title'] for r in data], ['Omelette'])
+
+    def test_single_query(self):
+        """Test the recipes are found in one query."""
+        with self.assertNumQueries(1):
+            self.client.get(COOKABLE_URL, {
+                'ingredients': f'{self.egg.id},{self.salt.id}'})
+
+    def test_invalid_parameters(self):
+        """Test ingredients are required and `missing` non-negative."""
+        for params in ({}, {'ingredients': 'egg'},
+                       {'ingredients': '1', 'missing': '-1'}):
+            res = self.client.get(COOKABLE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_out_of_range_ids_rejected(self):
+        """Test ids beyond the database's bigint range are rejected."""
+        for ids in ('99999999999999999999', f'{2 ** 63}', '0', '-5',
+                    f'{self.egg.id},-1'):
+            res = self.client.get(COOKABLE_URL, {'ingredients': ids})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('ingredients', res.json())
+
+        res = self.client.get(COOKABLE_URL, {'ingredients': f'{2 ** 63 - 1}'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,185 @@
+"""
+Tests for the change event stream.
+"""
+import asyncio
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.events import RESYNC_EVENT, ChangeListener, change_listener
+from core.models import Recipe, Tag
+from recipe.async_views import recipe_events
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ChangeListenerTests(SimpleTestCase):
+    """Test fanning events out to subscribers."""
+
+    def setUp(self):
+        self.listener = ChangeListener()
+
+    def subscribe(self, user_id):
+        """Subscribe without starting the listening task."""
+        queue = asyncio.Queue(2)
+        self.listener.subscribers[user_id].add(queue)
+        return queue
+
+    def payload(self, user_id, pk):
+        return json.dumps({
+            'user': user_id, 'model': 'recipe', 'id': pk, 'action': 'saved'})
+
+    async def test_dispatch_to_user(self):
+        """Test events reach only the clients of their user."""
+        first, second = self.subscribe(1), self.subscribe(1)
+        other = self.subscribe(2)
+
+        self.listener.dispatch(self.payload(1, 10))
+
+        expected = {'model': 'recipe', 'id': 10, 'action': 'saved'}
+        self.assertEqual(first.get_nowait(), expected)
+        self.assertEqual(second.get_nowait(), expected)
+        self.assertTrue(other.empty())
+
+    async def test_slow_client_resyncs(self):
+        """Test a full queue is replaced with a resync event."""
+        queue = self.subscribe(1)
+
+        for pk in range(3):
+            self.listener.dispatch(self.payload(1, pk))
+
+        self.assertEqual(queue.get_nowait(), RESYNC_EVENT)
+        self.assertTrue(queue.empty())
+
+    async def test_unsubscribe(self):
+        """Test users without clients are forgotten."""
+        queue = self.subscribe(1)
+
+        self.listener.unsubscribe(1, queue)
+
+        self.assertEqual(dict(self.listener.subscribers), {})
+
+
+class NotifyTests(TestCase):
+    """Test changes are notified."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+
+    def notifications(self, queries):
+        """Return the payloads notified in `queries`."""
+        return [json.loads(query['sql'].split(", '", 1)[1][:-2])
+                for query in queries if 'pg_notify' in query['sql']]
+
+    def test_save_and_delete_notified(self):
+        """Test saving and deleting a tag notifies both."""
+        with CaptureQueriesContext(connection) as queries:
+            tag = Tag.objects.create(user=self.user, name='Vegan')
+            tag_id = tag.id
+            tag.delete()
+
+        self.assertEqual(self.notifications(queries), [
+            {'user': self.user.id, 'model': 'tag', 'id': tag_id,
+             'action': 'saved'},
+            {'user': self.user.id, 'model': 'tag', 'id': tag_id,
+             'action': 'deleted'},
+        ])
+
+    def test_user_deletion_not_notified(self):
+        """Test rows deleted along with their user aren't notified."""
+        create_recipe(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.delete()
+
+        self.assertEqual(self.notifications(queries), [])
+
+
+@override_settings(CHANGE_EVENTS_KEEPALIVE=0.2, RECIPE_TASK_WORKERS=0)
+class EventStreamTests(TransactionTestCase):
+    """Test streaming change events over LISTEN/NOTIFY."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.factory = AsyncRequestFactory()
+
+    async def open_stream(self):
+        """Return the streamed chunks of an authenticated client."""
+        request = self.factory.get(
+            '/api/recipe/events/',
+            headers={'authorization': f'Token {self.token.key}'})
+        response = await recipe_events(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.streaming_content
+
+    async def next_chunk(self, stream):
+        chunk = await asyncio.wait_for(anext(stream), 10)
+        return chunk.decode()
+
+    @sync_to_async
+    def listening(self):
+        """Return whether the listener's LISTEN ran."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_stat_activity WHERE query LIKE 'LISTEN %%'")
+            return cursor.fetchone() is not None
+
+    async def test_unauthenticated(self):
+        """Test the stream requires authentication."""
+        response = await recipe_events(
+            self.factory.get('/api/recipe/events/'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_committed_change_streamed(self):
+        """Test a committed change reaches the user's stream."""
+        stream = await self.open_stream()
+        self.assertEqual(await self.next_chunk(stream), 'retry: 5000\n\n')
+        while not await self.listening():
+            self.assertEqual(await self.next_chunk(stream), ': keepalive\n\n')
+
+        recipe = await sync_to_async(create_recipe)(self.user)
+
+        chunk = await self.next_chunk(stream)
+        while chunk == ': keepalive\n\n':
+            chunk = await self.next_chunk(stream)
+        self.assertEqual(chunk, (
+            'event: recipe\n'
+            f'data: {{"model": "recipe", "id": {recipe.id}, '
+            '"action": "saved"}\n\n'
+        ))
+
+        # Django cancels the response when the client disconnects.
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(dict(change_listener.subscribers), {})
@@ -12,10 +12,12 @@ from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipe.readers import read_recipe_list
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
@@ -84,7 +86,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.json(), serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is limited to authenticated user."""
@@ -97,7 +99,106 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.json(), serializer.data)
+
+    def test_recipe_list_fast_path_matches_serializer(self):
+        """Test the list fast path renders the same JSON as the serializer."""
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ['Vegan', 'Dessert', 'Quick']]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ['Salt', 'Flour']]
+        recipe1 = create_recipe(user=self.user, price=Decimal('5'))
+        recipe1.tags.add(tags[2], tags[0])
+        recipe1.ingredients.add(*ingredients)
+        recipe2 = create_recipe(user=self.user, title='Ünïcode "title"')
+        recipe2.tags.add(tags[1])
+        create_recipe(user=self.user, link='')
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        renderer = JSONRenderer()
+        expected = renderer.render(RecipeSerializer(recipes, many=True).data)
+
+        self.assertEqual(renderer.render(read_recipe_list(recipes)), expected)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.content, expected)
+
+    def test_recipe_list_sparse_fieldset(self):
+        """Test ?fields= limits the list and skips related queries."""
+        recipe = create_recipe(user=self.user, title='Soup')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': recipe.id, 'title': 'Soup'}])
+
+    def test_recipe_list_omit_fields(self):
+        """Test ?omit= leaves fields out of the list."""
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'omit': 'tags,ingredients,link'})
+
+        self.assertEqual(
+            list(res.data[0]), ['id', 'title', 'time_minutes', 'price'])
+
+    def test_recipe_detail_sparse_fieldset(self):
+        """Test ?fields= limits the detail and the loaded columns."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(recipe.id), {'fields': 'description,tags'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['description'], recipe.description)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegan')
+        self.assertEqual(set(res.data), {'description', 'tags'})
+
+    def test_unknown_sparse_field_error(self):
+        """Test asking for an unknown field returns an error."""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_list_compact(self):
+        """Test compact mode returns ids with deduplicated names."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe1 = create_recipe(user=self.user)
+        recipe1.tags.add(vegan)
+        recipe1.ingredients.add(salt)
+        recipe2 = create_recipe(user=self.user)
+        recipe2.tags.add(vegan)
+
+        res = self.client.get(RECIPES_URL, {'compact': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['tags'] for recipe in res.data['results']],
+            [[vegan.id], [vegan.id]],
+        )
+        self.assertEqual(res.data['included'], {
+            'tags': {vegan.id: 'Vegan'},
+            'ingredients': {salt.id: 'Salt'},
+        })
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeSerializer(
+            recipes, many=True, context={'included': {}})
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_recipe_detail_compact(self):
+        """Test compact mode for a recipe detail."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+
+        res = self.client.get(detail_url(recipe.id), {'compact': '1'})
+
+        self.assertEqual(res.data['result']['tags'], [tag.id])
+        self.assertEqual(res.data['included']['tags'], {tag.id: 'Vegan'})
 
     def test_get_recipe_detail(self):
         """Test viewing a recipe detail."""
@@ -107,7 +208,7 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.get(url)
 
         serializer = RecipeDetailSerializer(recipe)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.json(), serializer.data)
 
     def test_create_recipe(self):
         """Test creating a recipe."""
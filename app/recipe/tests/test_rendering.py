@@ -0,0 +1,175 @@
+"""
+Tests for the pre-rendered recipe JSON.
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe import readers
+from recipe.rendering import RENDER_FORMAT, stale_recipes
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+        'description': 'Sample "quoted" description – with ünicode',
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RECIPE_TASK_WORKERS=0)
+class RenderedRecipeTests(TestCase):
+    """Test rendering recipes and serving their JSON."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = create_recipe(self.user)
+            self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+            self.recipe.tags.add(self.vegan)
+
+    def live_content(self, fields=readers.RECIPE_LIST_FIELDS):
+        """Return the JSON of the recipes built without stored JSON."""
+        queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+        return JSONRenderer().render(
+            readers.read_recipe_list(queryset, fields))
+
+    def test_rendered_after_commit(self):
+        """Test changed recipes are rendered once committed."""
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+
+        self.assertEqual(recipe.rendered_for, recipe.updated_at)
+        self.assertEqual(bytes(recipe.rendered), self.live_content()[1:-1])
+        self.assertFalse(stale_recipes(Recipe.objects.all()).exists())
+
+    def test_list_from_rendered_and_stale(self):
+        """Test lists join current JSON and render stale rows."""
+        create_recipe(self.user, title='Not rendered yet')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res.content, self.live_content())
+
+    def test_detail_matches_live(self):
+        """Test the detail JSON matches the serializer representation."""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        live = self.client.get(
+            detail_url(self.recipe.id),
+            {'fields': ','.join(readers.RECIPE_DETAIL_FIELDS)})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, live.content)
+
+    def test_stale_json_not_served(self):
+        """Test JSON rendered for an older version is ignored."""
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            rendered=b'{"stale":true}')
+        # Saved without committing, so not rendered again.
+        self.recipe.title = 'Changed'
+        self.recipe.save()
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.content, self.live_content())
+        self.assertNotIn(b'stale', res.content)
+
+    def test_json_of_other_format_not_served(self):
+        """Test JSON rendered by other code is ignored and re-rendered."""
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            rendered=b'{"stale":true}', rendered_format=RENDER_FORMAT + 1)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.content, self.live_content())
+        self.assertTrue(stale_recipes(Recipe.objects.all()).exists())
+        call_command('render_recipes', stdout=StringIO())
+        self.assertFalse(stale_recipes(Recipe.objects.all()).exists())
+
+    def test_rename_renders_recipes(self):
+        """Test renaming a tag renders its recipes again."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vegan.name = 'Plant based'
+            self.vegan.save()
+
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.rendered_for, recipe.updated_at)
+        self.assertIn(b'"Plant based"', bytes(recipe.rendered))
+
+    def test_uncommitted_changes_not_rendered(self):
+        """Test nothing is rendered before the transaction commits."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.recipe.title = 'Changed'
+            self.recipe.save()
+
+        self.assertTrue(stale_recipes(Recipe.objects.all()).exists())
+        # Flushed once for the whole transaction.
+        callbacks[0]()
+        for callback in callbacks[1:]:
+            with self.assertNumQueries(0):
+                callback()
+        self.assertFalse(stale_recipes(Recipe.objects.all()).exists())
+
+    def test_partial_responses_unaffected(self):
+        """Test sparse fieldsets aren't served from the stored JSON."""
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            rendered=b'{"stale":true}')
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.json(), [
+            {'id': self.recipe.id, 'title': self.recipe.title}])
+
+    def test_render_command(self):
+        """Test the command renders every stale or missing recipe."""
+        others = [create_recipe(self.user, title=f'Recipe {i}')
+                  for i in range(3)]
+        Recipe.objects.filter(pk=self.recipe.pk).update(rendered=None)
+
+        call_command('render_recipes', batch_size=2, stdout=StringIO())
+
+        self.assertFalse(stale_recipes(Recipe.objects.all()).exists())
+        for recipe in Recipe.objects.filter(pk__in=[o.pk for o in others]):
+            self.assertEqual(recipe.rendered_for, recipe.updated_at)
+
+    def test_render_command_all(self):
+        """Test --all renders recipes whose JSON is current too."""
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            rendered=b'{"stale":true}')
+
+        call_command('render_recipes', stdout=StringIO())
+        self.assertEqual(
+            bytes(Recipe.objects.get(pk=self.recipe.pk).rendered),
+            b'{"stale":true}')
+        call_command('render_recipes', all=True, stdout=StringIO())
+
+        self.assertEqual(self.client.get(RECIPES_URL).content,
+                         self.live_content())
+        self.assertNotIn(
+            b'stale', bytes(Recipe.objects.get(pk=self.recipe.pk).rendered))
@@ -0,0 +1,97 @@
+"""
+Tests for the shopping list API.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+SHOPPING_LIST_URL = reverse('recipe:recipe-shopping-list')
+
+
+def create_recipe(user, ingredients, **params):
+    """Create and return a sample recipe using `ingredients`."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    recipe = Recipe.objects.create(user=user, **defaults)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+class PublicShoppingListApiTests(TestCase):
+    """Test unauthenticated shopping list requests."""
+
+    def test_auth_required(self):
+        """Test authentication is required for shopping lists."""
+        res = APIClient().get(SHOPPING_LIST_URL, {'recipes': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateShoppingListApiTests(TestCase):
+    """Test building shopping lists."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.egg, self.flour, self.milk = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Egg', 'Flour', 'Milk')
+        ]
+        self.pancakes = create_recipe(
+            self.user, [self.egg, self.flour, self.milk])
+        self.bread = create_recipe(self.user, [self.flour])
+        self.omelette = create_recipe(self.user, [self.egg])
+
+    def shopping_list(self, *recipes):
+        res = self.client.get(SHOPPING_LIST_URL, {
+            'recipes': ','.join(str(recipe.id) for recipe in recipes)})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_ingredients_counted_once(self):
+        """Test each ingredient is listed once with its recipe count."""
+        data = self.shopping_list(self.pancakes, self.bread)
+
+        self.assertEqual(data, [
+            {'id': self.egg.id, 'name': 'Egg', 'recipe_count': 1},
+            {'id': self.flour.id, 'name': 'Flour', 'recipe_count': 2},
+            {'id': self.milk.id, 'name': 'Milk', 'recipe_count': 1},
+        ])
+
+    def test_single_query(self):
+        """Test the list is built in one query, whatever the recipes."""
+        with self.assertNumQueries(1):
+            self.shopping_list(self.pancakes, self.bread, self.omelette)
+
+    def test_other_users_recipes_ignored(self):
+        """Test other users' recipes add nothing."""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        salt = Ingredient.objects.create(user=other, name='Salt')
+        recipe = create_recipe(other, [salt])
+
+        data = self.shopping_list(self.omelette, recipe)
+
+        self.assertEqual(data, [
+            {'id': self.egg.id, 'name': 'Egg', 'recipe_count': 1}])
+
+    def test_recipes_required(self):
+        """Test recipe ids are required."""
+        for params in ({}, {'recipes': ''}, {'recipes': 'soup'}):
+            res = self.client.get(SHOPPING_LIST_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,284 @@
+"""
+Tests for the similar recipes index.
+"""
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeSimilarity, Tag, Ingredient
+from recipe import tasks
+from recipe.similarity import (
+    cosine,
+    index_recipes,
+    jaccard,
+    tfidf_vector,
+    tokenize,
+)
+
+
+def similar_url(recipe_id):
+    """Create and return a similar recipes URL."""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def wait_for_tasks():
+    """Wait for the background tasks, the pool restarting when needed."""
+    with tasks._executor_lock:
+        executor, tasks._executor = tasks._executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ScoringTests(SimpleTestCase):
+    """Test the similarity measures."""
+
+    def test_tokenize(self):
+        """Test words are lowercased, deduplicated and filtered."""
+        self.assertEqual(
+            tokenize('Tomato Soup with 2 tomatoes', 'A tomato soup!'),
+            ['soup', 'tomato', 'tomatoes'])
+
+    def test_jaccard(self):
+        self.assertEqual(jaccard({1, 2}, {2, 3}), 1 / 3)
+        self.assertEqual(jaccard(set(), {1}), 0.0)
+
+    def test_cosine_of_tfidf_vectors(self):
+        """Test rarer shared words weigh more."""
+        idf = {'soup': 1.0, 'saffron': 3.0, 'rice': 1.0}
+        saffron = tfidf_vector(['saffron', 'rice'], idf)
+
+        self.assertAlmostEqual(cosine(saffron, saffron), 1.0)
+        self.assertGreater(
+            cosine(saffron, tfidf_vector(['saffron', 'soup'], idf)),
+            cosine(saffron, tfidf_vector(['rice', 'soup'], idf)))
+
+
+@override_settings(RECIPE_TASK_WORKERS=0)
+class SimilarRecipesApiTests(TestCase):
+    """Test indexing and listing similar recipes."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tomato = Ingredient.objects.create(user=self.user, name='Tomato')
+        self.basil = Ingredient.objects.create(user=self.user, name='Basil')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup = create_recipe(
+                self.user, title='Tomato soup',
+                description='Slow roasted tomato soup')
+            self.soup.ingredients.add(self.tomato, self.basil)
+            self.pasta = create_recipe(
+                self.user, title='Tomato pasta',
+                description='Quick pasta with fresh basil')
+            self.pasta.ingredients.add(self.tomato, self.basil)
+            self.salad = create_recipe(
+                self.user, title='Roasted tomato salad')
+            self.salad.ingredients.add(self.tomato)
+            self.cake = create_recipe(self.user, title='Chocolate cake')
+
+    def similar(self, recipe, **params):
+        res = self.client.get(similar_url(recipe.id), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_ranked_by_score(self):
+        """Test similar recipes are ranked, unrelated ones left out."""
+        data = self.similar(self.soup)
+
+        self.assertEqual([r['title'] for r in data],
+                         ['Tomato pasta', 'Roasted tomato salad'])
+        self.assertGreater(data[0]['score'], data[1]['score'])
+        self.assertEqual(self.similar(self.cake), [])
+
+    def test_scores_symmetric(self):
+        """Test both recipes of a pair list it with the same score."""
+        self.assertEqual(
+            RecipeSimilarity.objects.get(
+                recipe=self.soup, similar=self.salad).score,
+            RecipeSimilarity.objects.get(
+                recipe=self.salad, similar=self.soup).score)
+
+    def test_updated_on_change(self):
+        """Test changing a recipe updates its scores."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cake.title = 'Chocolate and tomato soup'
+            self.cake.save()
+            tag = Tag.objects.create(user=self.user, name='Dessert')
+            self.cake.tags.add(tag)
+
+        self.assertIn('Chocolate and tomato soup',
+                      [r['title'] for r in self.similar(self.soup)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pasta.ingredients.clear()
+            self.pasta.title = 'Mushroom risotto'
+            self.pasta.description = ''
+            self.pasta.save()
+
+        self.assertNotIn('Mushroom risotto',
+                         [r['title'] for r in self.similar(self.soup)])
+
+    def test_lists_kept_whatever_the_order(self):
+        """Test indexing a recipe keeps it in lists it doesn't list back."""
+        with self.settings(SIMILAR_RECIPES_INDEX_SIZE=1):
+            index_recipes([self.salad.pk], force=True)
+            index_recipes([self.pasta.pk], force=True)
+            index_recipes([self.soup.pk], force=True)
+
+        self.assertEqual([r['title'] for r in self.similar(self.soup)],
+                         ['Tomato pasta'])
+        self.assertEqual([r['title'] for r in self.similar(self.salad)],
+                         ['Tomato soup'])
+
+    def test_lists_trimmed(self):
+        """Test adding a recipe to full lists trims them back to size."""
+        with self.settings(SIMILAR_RECIPES_INDEX_SIZE=1):
+            index_recipes([self.soup.pk, self.pasta.pk, self.salad.pk],
+                          force=True)
+            with self.captureOnCommitCallbacks(execute=True):
+                stew = create_recipe(
+                    self.user, title='Tomato soup',
+                    description='Slow roasted tomato soup')
+                stew.ingredients.add(self.tomato, self.basil)
+
+        self.assertEqual([r['id'] for r in self.similar(self.soup)],
+                         [stew.id])
+        self.assertFalse(RecipeSimilarity.objects.values('recipe').annotate(
+            count=Count('id')).filter(count__gt=1).exists())
+
+    def test_unchanged_recipes_not_rescored(self):
+        """Test changes leaving the ids and words alone skip scoring."""
+        with patch('recipe.similarity.candidates') as patched:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.soup.price = Decimal('9.99')
+                self.soup.save()
+                self.tomato.name = 'Roma tomato'
+                self.tomato.save()
+
+        patched.assert_not_called()
+
+    def test_limit(self):
+        """Test `?limit=` caps the number of similar recipes."""
+        data = self.similar(self.soup, limit=1)
+
+        self.assertEqual([r['title'] for r in data], ['Tomato pasta'])
+
+    def test_single_lookup(self):
+        """Test reading similar recipes is a lookup of stored scores."""
+        with self.assertNumQueries(2):
+            self.similar(self.soup)
+
+    def test_other_users_recipe_not_found(self):
+        """Test other users' recipes aren't found."""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        recipe = create_recipe(other)
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_index_command(self):
+        """Test the command rebuilds the scores from scratch."""
+        expected = set(RecipeSimilarity.objects.values_list(
+            'recipe', 'similar'))
+        RecipeSimilarity.objects.all().delete()
+        Recipe.objects.update(terms=[])
+
+        call_command('index_similar_recipes', batch_size=2,
+                     stdout=StringIO())
+
+        self.assertEqual(set(RecipeSimilarity.objects.values_list(
+            'recipe', 'similar')), expected)
+
+
+@override_settings(RECIPE_TASK_WORKERS=2)
+class BackgroundIndexingTests(TransactionTestCase):
+    """Test indexing recipes in the background thread pool."""
+
+    def setUp(self):
+        # Workers close their connections after each task, so the test
+        # database can be dropped.
+        patcher = patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(wait_for_tasks)
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, title, **params):
+        """Create a recipe through the API."""
+        res = self.client.post(RECIPES_URL, {
+            'title': title, 'time_minutes': 10, 'price': '2.50',
+            'ingredients': [{'name': 'Tomato'}, {'name': 'Basil'}],
+            **params,
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def test_api_write_schedules_tasks_once(self):
+        """Test a recipe created with its attributes is indexed once."""
+        with patch('recipe.tasks.run_task', wraps=tasks.run_task) as patched:
+            with self.assertNoLogs('recipe.tasks', level='ERROR'):
+                self.create('Tomato soup', tags=[{'name': 'Vegan'}])
+                wait_for_tasks()
+
+        self.assertEqual(
+            sorted(call.args[0].__name__ for call in patched.call_args_list),
+            ['index_recipes', 'render_recipes'])
+
+    def test_overlapping_runs(self):
+        """Test concurrent runs indexing the same recipes don't conflict."""
+        pks = [self.create(title) for title in (
+            'Tomato soup', 'Tomato pasta', 'Roasted tomato salad')]
+        wait_for_tasks()
+        index_recipes(pks, force=True)
+        expected = list(RecipeSimilarity.objects.order_by(
+            'recipe_id', 'similar_id').values('recipe_id', 'similar_id'))
+
+        with self.assertNoLogs('recipe.tasks', level='ERROR'):
+            for _ in range(10):
+                for pk in pks:
+                    tasks.get_executor().submit(
+                        tasks.run_task,
+                        lambda pks: index_recipes(pks, force=True), [pk])
+            wait_for_tasks()
+
+        self.assertEqual(len(expected), 6)
+        self.assertEqual(
+            list(RecipeSimilarity.objects.order_by(
+                'recipe_id', 'similar_id').values('recipe_id', 'similar_id')),
+            expected)
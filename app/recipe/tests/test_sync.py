@@ -0,0 +1,175 @@
+"""
+Tests for delta sync of the recipe API lists.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, Tombstone
+from recipe.sync import encode_cursor
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(SYNC_CURSOR_OVERLAP=0)
+class DeltaSyncTests(TestCase):
+    """Test syncing the lists with `?since=`."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, url, since='0', **params):
+        """Return the sync response data since cursor `since`."""
+        res = self.client.get(url, {'since': since, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_full_sync(self):
+        """Test since=0 returns every row and a cursor."""
+        recipe = create_recipe(self.user)
+
+        data = self.sync(RECIPES_URL)
+
+        self.assertEqual([r['id'] for r in data['results']], [recipe.id])
+        self.assertEqual(data['deleted'], [])
+        self.assertTrue(data['cursor'].isdigit())
+
+    def test_changed_since_cursor(self):
+        """Test only the rows changed since the cursor are returned."""
+        unchanged = create_recipe(self.user, title='Unchanged')
+        changed = create_recipe(self.user, title='Changed')
+        cursor = self.sync(RECIPES_URL)['cursor']
+
+        changed.title = 'Changed again'
+        changed.save()
+        added = create_recipe(self.user, title='Added')
+
+        data = self.sync(RECIPES_URL, cursor)
+
+        ids = {recipe['id'] for recipe in data['results']}
+        self.assertEqual(ids, {changed.id, added.id})
+        self.assertNotIn(unchanged.id, ids)
+
+    def test_deleted_since_cursor(self):
+        """Test deleted ids are returned as tombstones."""
+        recipe = create_recipe(self.user)
+        cursor = self.sync(RECIPES_URL)['cursor']
+        recipe_id = recipe.id
+
+        res = self.client.delete(
+            reverse('recipe:recipe-detail', args=[recipe_id]))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        data = self.sync(RECIPES_URL, cursor)
+
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['deleted'], [recipe_id])
+
+    def test_other_users_deletions_hidden(self):
+        """Test tombstones are limited to the user's rows."""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        cursor = self.sync(TAGS_URL)['cursor']
+        Tag.objects.create(user=other, name='Other').delete()
+
+        data = self.sync(TAGS_URL, cursor)
+
+        self.assertEqual(data['deleted'], [])
+
+    def test_renamed_tag_updates_recipes(self):
+        """Test renaming a tag syncs it and the recipes listing it."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(tag)
+        create_recipe(self.user, title='Untagged')
+        cursor = self.sync(RECIPES_URL)['cursor']
+
+        tag.name = 'Plant based'
+        tag.save()
+
+        recipes = self.sync(RECIPES_URL, cursor)['results']
+        tags = self.sync(TAGS_URL, cursor)['results']
+        self.assertEqual([r['id'] for r in recipes], [recipe.id])
+        self.assertEqual(recipes[0]['tags'][0]['name'], 'Plant based')
+        self.assertEqual(tags, [{'id': tag.id, 'name': 'Plant based'}])
+
+    def test_deleted_ingredient_updates_recipes(self):
+        """Test deleting an ingredient syncs the recipes listing it."""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = create_recipe(self.user)
+        recipe.ingredients.add(ingredient)
+        cursor = self.sync(RECIPES_URL)['cursor']
+        ingredient_id = ingredient.id
+
+        ingredient.delete()
+
+        recipes = self.sync(RECIPES_URL, cursor)['results']
+        ingredients = self.sync(INGREDIENTS_URL, cursor)
+        self.assertEqual([r['id'] for r in recipes], [recipe.id])
+        self.assertEqual(recipes[0]['ingredients'], [])
+        self.assertEqual(ingredients['deleted'], [ingredient_id])
+
+    def test_compact_sync(self):
+        """Test compact mode keeps `included` alongside the sync keys."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        create_recipe(self.user).tags.add(tag)
+
+        data = self.sync(RECIPES_URL, compact='1')
+
+        self.assertEqual(data['included']['tags'], {tag.id: 'Vegan'})
+        self.assertIn('cursor', data)
+
+    def test_without_since_unchanged(self):
+        """Test lists without `since` keep their representation."""
+        create_recipe(self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIsInstance(res.json(), list)
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor is rejected."""
+        res = self.client.get(RECIPES_URL, {'since': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_cursor(self):
+        """Test a cursor older than the kept tombstones is gone."""
+        cursor = encode_cursor(timezone.now() - timedelta(days=31))
+
+        res = self.client.get(TAGS_URL, {'since': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        """Test a deleted user's rows are deleted without tombstones."""
+        create_recipe(self.user)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        self.user.delete()
+
+        self.assertFalse(Tombstone.objects.exists())
@@ -1,9 +1,10 @@
 """
 Url mappings for recipe app
 """
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from recipe import views
+from recipe import async_views, views
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
@@ -11,6 +12,16 @@ router.register('recipes', views.RecipeViewSet)
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
 
+# Async views answering GET requests for the hot reads, and the change
+# event stream, under ASGI.
+async_urlpatterns = [
+    path('events/', async_views.recipe_events, name='events'),
+    path('recipes/', async_views.recipe_list),
+    path('recipes/<int:pk>/', async_views.recipe_detail),
+    path('tags/', async_views.tag_list),
+    path('ingredients/', async_views.ingredient_list),
+]
+
 # The app name for namespacing the URLs
 app_name = 'recipe'
 
@@ -18,3 +29,6 @@ app_name = 'recipe'
 urlpatterns = [
     path('', include(router.urls)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -1,18 +1,119 @@
 """
 Views for the recipe API.
 """
+from django.conf import settings
+from django.db.models import Count
+from django.http import Http404, HttpResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    extend_schema,
+    extend_schema_view,
+)
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 
+from core.cache import shared_cache
 from core.models import Recipe, Tag, Ingredient
-from recipe import serializers
+from recipe import cookable, readers, rendering, serializers, similarity
+from recipe.autocomplete import (
+    AUTOCOMPLETE_PARAMETERS,
+    AutocompleteMixin,
+)
+from recipe.sync import SYNC_PARAMETERS, DeltaSyncMixin
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        'fields', OpenApiTypes.STR,
+        description='Comma separated list of fields to return.',
+    ),
+    OpenApiParameter(
+        'omit', OpenApiTypes.STR,
+        description='Comma separated list of fields to leave out.',
+    ),
+]
+
+
+RECIPE_READ_PARAMETERS = SPARSE_FIELDSET_PARAMETERS + [
+    OpenApiParameter(
+        'compact', OpenApiTypes.BOOL,
+        description='Return tag and ingredient ids, with their names in a '
+                    'single `included` object.',
+    ),
+]
+
+
+def select_fields(params, available):
+    """
+    Return the `available` field names selected with `?fields=` and
+    `?omit=` in `params`, or None when the response isn't limited.
+    """
+    fields = [name for name in params.get('fields', '').split(',') if name]
+    omit = [name for name in params.get('omit', '').split(',') if name]
+    if not fields and not omit:
+        return None
+
+    unknown = sorted(set(fields + omit) - set(available))
+    if unknown:
+        raise ValidationError(
+            {'fields': f'Unknown fields: {", ".join(unknown)}.'})
+
+    return [name for name in available
+            if (not fields or name in fields) and name not in omit]
+
+
+def is_compact(params):
+    """Return whether `?compact=` asks for tag and ingredient ids."""
+    return params.get('compact') in ('1', 'true')
+
+
+class SparseFieldsetMixin:
+    """
+    Limit `list` and `retrieve` responses to the fields selected with
+    `?fields=` and `?omit=`, and the queried columns with them.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_requested_fields(self):
+        """
+        Return the selected serializer field names in serializer order, or
+        None when the response isn't limited.
+        """
+        if self.action not in self.sparse_actions:
+            return None
+
+        return select_fields(self.request.query_params,
+                             self.get_serializer_class().Meta.fields)
+
+    def apply_field_selection(self, queryset):
+        """Load only the selected columns."""
+        fields = self.get_requested_fields()
+        if fields is None:
+            return queryset
+
+        concrete = {
+            field.name for field in queryset.model._meta.concrete_fields}
+        return queryset.only(*[name for name in fields if name in concrete])
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=RECIPE_READ_PARAMETERS + SYNC_PARAMETERS),
+    retrieve=extend_schema(parameters=RECIPE_READ_PARAMETERS),
+)
+class RecipeViewSet(DeltaSyncMixin, SparseFieldsetMixin,
+                    viewsets.ModelViewSet):
     """
     View for managing recipe APIs.
 
@@ -30,7 +131,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
         Returns:
             QuerySet: A queryset of recipes filtered by the authenticated user.
         """
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user).order_by('-id')
+        # `list` and `retrieve` read only the columns they need, tags and
+        # ingredients included, with `readers`.
+        return self.filter_changed(queryset)
 
     def get_serializer_class(self):
         """
@@ -46,6 +150,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def is_compact(self):
+        """
+        Return whether tags and ingredients are represented by their ids.
+        """
+        return (self.action in self.sparse_actions and
+                is_compact(self.request.query_params))
+
+    def use_rendered(self):
+        """
+        Return whether the response is the recipes' pre-rendered JSON, see
+        `recipe.rendering`: full JSON representations outside delta sync.
+        """
+        return (self.get_requested_fields() is None and
+                not self.is_compact() and
+                self.sync_since is None and
+                self.request.accepted_renderer.format == 'json')
+
+    def list(self, request, *args, **kwargs):
+        """
+        List recipes for the authenticated user.
+
+        Builds the `RecipeSerializer` representation from `.values()` rows
+        instead of serializing each recipe field by field. In compact mode
+        the recipes are returned under `results` with tag and ingredient
+        names under `included`. With `?since=` only the recipes changed
+        since are returned, see `recipe.sync`. Full JSON responses are
+        joined from the recipes' pre-rendered JSON.
+
+        Returns:
+            Response: The response object.
+        """
+        self.start_sync()
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.use_rendered():
+            return HttpResponse(rendering.read_list_content(queryset),
+                                content_type='application/json')
+
+        included = {} if self.is_compact() else None
+        data = readers.read_recipe_list(
+            queryset, self.get_requested_fields(), included)
+
+        if included is not None:
+            data = {
+                'results': data,
+                'included': serializers.sorted_included(included),
+            }
+        return Response(self.sync_data(data))
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retrieve a recipe, with tag and ingredient names under `included`
+        in compact mode.
+
+        Builds the `RecipeDetailSerializer` representation from the recipe
+        row, like `list`.
+
+        Returns:
+            Response: The response object.
+        """
+        included = {} if self.is_compact() else None
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+            if self.use_rendered():
+                data = rendering.read_detail_content(queryset, request)
+            else:
+                data = readers.read_recipe_list(
+                    queryset,
+                    self.get_requested_fields() or
+                    readers.RECIPE_DETAIL_FIELDS,
+                    included, request)
+        except (TypeError, ValueError):
+            data = None
+        if not data:
+            raise Http404('No Recipe matches the given query.')
+
+        if isinstance(data, bytes):
+            return HttpResponse(data, content_type='application/json')
+
+        if included is None:
+            return Response(data[0])
+        return Response({
+            'result': data[0],
+            'included': serializers.sorted_included(included),
+        })
+
     def perform_create(self, serializer):
         """
         Create a new recipe.
@@ -56,6 +246,102 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         serializer.save(user=self.request.user)
 
+    @extend_schema(parameters=[serializers.CookableQuerySerializer])
+    @action(methods=['GET'], detail=False)
+    def cookable(self, request):
+        """
+        List the recipes that can be cooked with the ingredients given by
+        id in `?ingredients=`, lacking at most `?missing=` of theirs, best
+        covered first. Each recipe carries its `coverage` (the ratio of its
+        ingredients at hand) and its `missing_ingredients`.
+
+        Args:
+            request (Request): The request object.
+
+        Returns:
+            Response: The response object.
+        """
+        params = serializers.CookableQuerySerializer(
+            data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(cookable.read_cookable(
+            self.get_queryset(),
+            params.validated_data['ingredients'],
+            params.validated_data['missing'],
+        ))
+
+    @extend_schema(
+        parameters=[serializers.ShoppingListQuerySerializer],
+        responses=serializers.ShoppingListItemSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=False, url_path='shopping-list')
+    def shopping_list(self, request):
+        """
+        List the ingredients of the recipes given by id in `?recipes=`, once
+        each and by name, with the number of the recipes using them.
+
+        Grouped in one query over the recipe ingredients table; ids of
+        other users' recipes are ignored.
+
+        Args:
+            request (Request): The request object.
+
+        Returns:
+            Response: The response object.
+        """
+        params = serializers.ShoppingListQuerySerializer(
+            data=request.query_params)
+        params.is_valid(raise_exception=True)
+        items = (
+            Recipe.ingredients.through.objects
+            .filter(recipe__user=request.user,
+                    recipe__in=params.validated_data['recipes'])
+            .values('ingredient_id', 'ingredient__name')
+            .annotate(recipe_count=Count('recipe_id'))
+            .order_by('ingredient__name', 'ingredient_id')
+        )
+        return Response([
+            {'id': item['ingredient_id'],
+             'name': item['ingredient__name'],
+             'recipe_count': item['recipe_count']}
+            for item in items
+        ])
+
+    @extend_schema(parameters=[serializers.SimilarQuerySerializer])
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """
+        List the `?limit=` recipes most similar to a recipe, by shared tags
+        and ingredients and by the words of their title and description,
+        each with its `score`. See `recipe.similarity`.
+
+        Args:
+            request (Request): The request object.
+            pk (int): The primary key of the recipe.
+
+        Returns:
+            Response: The response object.
+        """
+        params = serializers.SimilarQuerySerializer(
+            data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = self.get_queryset()
+        try:
+            exists = queryset.filter(pk=pk).exists()
+        except (TypeError, ValueError):
+            exists = False
+        if not exists:
+            raise Http404('No Recipe matches the given query.')
+
+        rows = list(similarity.similar_recipes(
+            queryset, pk, params.validated_data['limit']
+        ).values(*readers.recipe_columns(readers.RECIPE_LIST_FIELDS),
+                 'score'))
+        data = readers.build_recipe_list(rows)
+        for row, recipe in zip(rows, data):
+            recipe['score'] = round(row['score'], 4)
+        return Response(data)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """
@@ -78,7 +364,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+@extend_schema_view(
+    list=extend_schema(
+        parameters=SPARSE_FIELDSET_PARAMETERS + SYNC_PARAMETERS +
+        AUTOCOMPLETE_PARAMETERS),
+)
+class BaseRecipeAttrViewSet(AutocompleteMixin,
+                            DeltaSyncMixin,
+                            SparseFieldsetMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet
@@ -93,7 +387,34 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         """
         Retrieve attributes for the authenticated user.
         """
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(
+            user=self.request.user).order_by('-name')
+        if self.action != 'list':
+            return self.apply_field_selection(queryset)
+
+        queryset = self.apply_field_selection(self.filter_changed(queryset))
+        return self.filter_autocomplete(queryset)
+
+    def list(self, request, *args, **kwargs):
+        """
+        List attributes, only those changed since `?since=` or matching
+        `?prefix=` or `?q=` when given. See `recipe.autocomplete`.
+        """
+        self.start_sync()
+        key = None
+        if self.sync_since is None:
+            key = self.autocomplete_cache_key(self.get_requested_fields())
+        if key is not None:
+            data = shared_cache().get(key)
+            if data is not None:
+                return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        response.data = self.sync_data(response.data)
+        if key is not None:
+            shared_cache().set(key, list(response.data),
+                               settings.AUTOCOMPLETE_CACHE_SECONDS)
+        return response
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
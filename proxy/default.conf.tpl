@@ -1,13 +1,44 @@
+# The app is reached over the protocol in APP_PROTOCOL: uwsgi (default) for
+# uwsgi, http for uvicorn. run.sh renders the matching snippets into
+# /etc/nginx/upstream.
+
+# Optional micro-cache for anonymous, cacheable endpoints.
+# MICROCACHE=microcache enables it, MICROCACHE=off (default) disables it.
+include /etc/nginx/upstream/cache_path.conf;
+
 server {
     listen ${LISTEN_PORT};
 
     location /static {
         alias /vol/static;
+        # Serve the .gz copies written by collectstatic.
+        gzip_static on;
+        gzip_vary   on;
+    }
+
+    # Content-hashed static files written by collectstatic never change.
+    location ~* "^/static/.+\.[0-9a-f]{12}\.\w+$" {
+        root        /vol;
+        gzip_static on;
+        gzip_vary   on;
+        access_log  off;
+        add_header  Cache-Control "public, max-age=31536000, immutable";
+    }
+
+    # Polled every second by the load balancers.
+    location ~ ^/(healthz|readyz)$ {
+        include                 /etc/nginx/upstream/pass.conf;
+        access_log              off;
+    }
+
+    location ~ ^/api/(schema|docs)/$ {
+        include                 /etc/nginx/upstream/pass.conf;
+        include                 /etc/nginx/upstream/cache.conf;
+        add_header              X-Micro-Cache $upstream_cache_status;
     }
 
     location / {
-        uwsgi_pass              ${APP_HOST}:${APP_PORT};
-        include                 /etc/nginx/uwsgi_params;
+        include                 /etc/nginx/upstream/pass.conf;
         client_max_body_size    10M;
     }
-}
\ No newline at end of file
+}
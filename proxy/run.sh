@@ -2,5 +2,14 @@
 
 set -e
 
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
-nginx -g 'daemon off;'
\ No newline at end of file
+# Only substitute our variables, leaving nginx's $variables alone.
+VARIABLES='${LISTEN_PORT} ${APP_HOST} ${APP_PORT} ${MICROCACHE} ${MICROCACHE_TTL}'
+
+for template in /etc/nginx/upstream-${APP_PROTOCOL}/*; do
+    name=$(basename "$template" .tpl)
+    envsubst "$VARIABLES" < "$template" > "/etc/nginx/upstream/$name"
+done
+
+envsubst "$VARIABLES" \
+    < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+nginx -g 'daemon off;'
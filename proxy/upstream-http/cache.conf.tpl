@@ -0,0 +1,9 @@
+proxy_cache             ${MICROCACHE};
+proxy_cache_key         "$request_method$host$request_uri$http_accept_encoding";
+proxy_cache_valid       200 ${MICROCACHE_TTL};
+proxy_cache_lock        on;
+proxy_cache_use_stale   updating error timeout;
+proxy_ignore_headers    Cache-Control Expires;
+# Only anonymous requests are cached.
+proxy_cache_bypass      $http_authorization $cookie_sessionid;
+proxy_no_cache          $http_authorization $cookie_sessionid;
@@ -0,0 +1,9 @@
+uwsgi_cache             ${MICROCACHE};
+uwsgi_cache_key         "$request_method$host$request_uri$http_accept_encoding";
+uwsgi_cache_valid       200 ${MICROCACHE_TTL};
+uwsgi_cache_lock        on;
+uwsgi_cache_use_stale   updating error timeout;
+uwsgi_ignore_headers    Cache-Control Expires;
+# Only anonymous requests are cached.
+uwsgi_cache_bypass      $http_authorization $cookie_sessionid;
+uwsgi_no_cache          $http_authorization $cookie_sessionid;
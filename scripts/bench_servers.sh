@@ -0,0 +1,56 @@
+#!/bin/sh
+#
+# Compare the uwsgi (WSGI) and uvicorn (ASGI) deployments under load.
+#
+# Run from the app directory with the database environment set:
+#
+#   TOKEN=<api token> ../scripts/bench_servers.sh [path] [concurrency...]
+#
+# Both servers listen on port ${BENCH_PORT:-9100} with the same number of
+# workers, one after the other, and are sent one request per connection as
+# nginx does: uwsgi over the uwsgi protocol, uvicorn over HTTP.
+
+set -e
+
+BENCH_PATH="${1:-/api/recipe/recipes/}"
+[ $# -gt 0 ] && shift
+LEVELS="${*:-10 100 500}"
+PORT="${BENCH_PORT:-9100}"
+WORKERS="${BENCH_WORKERS:-4}"
+DURATION="${BENCH_DURATION:-10}"
+LOADTEST="$(dirname "$0")/loadtest.py"
+
+wait_for_port() {
+    for _ in $(seq 50); do
+        python -c "import socket; socket.create_connection(('127.0.0.1', $PORT))" \
+            2>/dev/null && return 0
+        sleep 0.2
+    done
+    echo "server did not start" >&2
+    return 1
+}
+
+bench() {
+    pid=$1
+    scheme=$2
+    wait_for_port
+    for level in $LEVELS; do
+        python "$LOADTEST" "$scheme://127.0.0.1:$PORT$BENCH_PATH" \
+            -c "$level" -d "$DURATION" --pid "$pid" --close \
+            -H "Authorization: Token $TOKEN"
+        echo
+    done
+    kill -INT "$pid"
+    wait "$pid" 2>/dev/null || true
+}
+
+echo "== uwsgi, $WORKERS workers"
+uwsgi --socket ":$PORT" --workers "$WORKERS" --master --enable-threads \
+    --module app.wsgi --disable-logging --die-on-term >/dev/null 2>&1 &
+bench $! uwsgi
+
+echo "== uvicorn, $WORKERS workers"
+ASYNC_READ_VIEWS=1 DB_CONN_MAX_AGE=0 uvicorn app.asgi:application \
+    --port "$PORT" --workers "$WORKERS" --lifespan off --no-access-log \
+    --log-level warning &
+bench $! http
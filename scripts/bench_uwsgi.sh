@@ -0,0 +1,56 @@
+#!/bin/sh
+#
+# Measure uwsgi throughput and memory per worker for several
+# workers x threads configurations.
+#
+# Run from the app directory with the database environment set:
+#
+#   TOKEN=<api token> ../scripts/bench_uwsgi.sh [config...]
+#
+# Each config is WORKERSxTHREADS, optionally suffixed with :lazy to load the
+# app in every worker (--lazy-apps) instead of once in the master, e.g.
+#
+#   ../scripts/bench_uwsgi.sh 2x1 4x1 4x2 4x2:lazy
+
+set -e
+
+CONFIGS="${*:-2x1 4x1 4x2 4x2:lazy}"
+BENCH_PATH="${BENCH_PATH:-/api/recipe/recipes/}"
+PORT="${BENCH_PORT:-9100}"
+CONCURRENCY="${BENCH_CONCURRENCY:-32}"
+DURATION="${BENCH_DURATION:-10}"
+LOADTEST="$(dirname "$0")/loadtest.py"
+
+wait_for_port() {
+    for _ in $(seq 50); do
+        python -c "import socket; socket.create_connection(('127.0.0.1', $PORT))" \
+            2>/dev/null && return 0
+        sleep 0.2
+    done
+    echo "server did not start" >&2
+    return 1
+}
+
+for config in $CONFIGS; do
+    size="${config%%:*}"
+    workers="${size%x*}"
+    threads="${size#*x}"
+    lazy=""
+    [ "$config" != "$size" ] && lazy="--lazy-apps"
+
+    echo "== $workers workers x $threads threads ${lazy:+(lazy apps)}"
+    uwsgi --socket ":$PORT" --master --need-app --module app.wsgi \
+        --workers "$workers" --threads "$threads" --enable-threads \
+        --thunder-lock $lazy --disable-logging --die-on-term \
+        >/dev/null 2>&1 &
+    pid=$!
+    wait_for_port
+
+    python "$LOADTEST" "uwsgi://127.0.0.1:$PORT$BENCH_PATH" \
+        -c "$CONCURRENCY" -d "$DURATION" --pid "$pid" --per-process \
+        -H "Authorization: Token $TOKEN"
+    echo
+
+    kill -INT "$pid"
+    wait "$pid" 2>/dev/null || true
+done
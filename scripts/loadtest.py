@@ -0,0 +1,257 @@
+"""
+HTTP load generator comparing the uwsgi and ASGI deployments.
+
+Keeps `--concurrency` keep-alive connections (or, with `--close`, new
+connections as nginx opens to its upstream) busy for `--duration` seconds
+and reports throughput, latency percentiles and the memory (PSS, so pages
+shared by forked workers count once) of the server processes given with
+`--pid` and their children, after a short warm-up and under load, per open
+connection.
+
+`uwsgi://host:port/path` URLs speak the uwsgi protocol to a `--socket`
+uwsgi server, exactly as nginx does.
+
+Only uses the standard library so it runs anywhere the app does:
+
+    python scripts/loadtest.py uwsgi://localhost:9000/api/recipe/recipes/ \\
+        -c 100 -d 10 -H "Authorization: Token <key>" --pid <master pid>
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import struct
+import time
+from urllib.parse import urlsplit
+
+
+def process_tree(pid):
+    """Return `pid` and the pids of all its descendants."""
+    pids = [pid]
+    for current in pids:
+        try:
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def process_memory(pid):
+    """Return {'Rss': KiB, 'Pss': KiB} of one process."""
+    memory = {'Rss': 0, 'Pss': 0}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in memory:
+                    memory[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return memory
+
+
+def memory_kib(pids):
+    """Return the summed PSS of `pids` and their children."""
+    return sum(
+        process_memory(pid)['Pss']
+        for pid in {child for pid in pids for child in process_tree(pid)})
+
+
+async def read_response(reader):
+    """
+    Read one HTTP/1.1 response, returning its status code and whether the
+    server keeps the connection open. uwsgi responses end at EOF.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+
+    length = None
+    chunked = False
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+        elif name == 'connection' and 'close' in value.lower():
+            keep_alive = False
+
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                return status, keep_alive
+    if length is None:
+        await reader.read()
+        return status, False
+
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+def uwsgi_request(parts, headers):
+    """Return a uwsgi protocol GET request packet."""
+    variables = {
+        'REQUEST_METHOD': 'GET',
+        'REQUEST_URI': parts.path + (f'?{parts.query}' if parts.query else ''),
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'SERVER_NAME': parts.hostname,
+        'SERVER_PORT': str(parts.port),
+        'HTTP_HOST': parts.netloc,
+    }
+    for header in headers:
+        name, _, value = header.partition(':')
+        variables['HTTP_' + name.strip().upper().replace('-', '_')] = (
+            value.strip())
+
+    body = b''.join(
+        struct.pack('<H', len(item)) + item
+        for key, value in variables.items()
+        for item in (key.encode(), value.encode()))
+    return struct.pack('<BHB', 0, len(body), 0) + body
+
+
+def http_request(parts, headers):
+    """Return an HTTP/1.1 GET request."""
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    return (
+        f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+        + ''.join(f'{header}\r\n' for header in headers)
+        + '\r\n'
+    ).encode()
+
+
+async def worker(url, headers, deadline, latencies, errors, close=False):
+    """
+    Send requests until `deadline`, over one keep-alive connection unless
+    `close` is set or the protocol is uwsgi (one request per connection).
+    """
+    parts = urlsplit(url)
+    if parts.scheme == 'uwsgi':
+        request = uwsgi_request(parts, headers)
+        close = True
+    else:
+        request = http_request(parts, headers)
+
+    reader = writer = None
+    while time.monotonic() < deadline:
+        reused = writer is not None
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    parts.hostname, parts.port or 80)
+            start = time.perf_counter()
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+            if close or not keep_alive:
+                writer.close()
+                reader = writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError,
+                ValueError, IndexError) as exc:
+            # Servers may close idle keep-alive connections.
+            if not (reused and isinstance(exc, ConnectionError)):
+                errors.append(type(exc).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+
+    if writer is not None:
+        writer.close()
+
+
+async def run(args):
+    """Run the load test and print the results."""
+    # Let every worker load the app before measuring the baseline.
+    warmup = time.monotonic() + args.warmup
+    await asyncio.gather(*[
+        worker(args.url, args.header, warmup, [], [], args.close)
+        for _ in range(min(args.concurrency, 8))
+    ])
+    idle_kib = memory_kib(args.pid) if args.pid else None
+
+    latencies, errors = [], []
+    deadline = time.monotonic() + args.duration
+    workers = [
+        asyncio.create_task(
+            worker(args.url, args.header, deadline, latencies, errors,
+                   args.close))
+        for _ in range(args.concurrency)
+    ]
+
+    peak_kib = idle_kib
+    while not all(task.done() for task in workers):
+        await asyncio.sleep(0.5)
+        if args.pid:
+            peak_kib = max(peak_kib, memory_kib(args.pid))
+    await asyncio.gather(*workers)
+
+    print(f'concurrency  {args.concurrency}')
+    print(f'requests     {len(latencies)} ({len(errors)} errors)')
+    print(f'throughput   {len(latencies) / args.duration:.1f} req/s')
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100)
+        print('latency ms   p50 {:.1f}  p95 {:.1f}  p99 {:.1f}'.format(
+            cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000))
+    if args.pid:
+        per_connection = (peak_kib - idle_kib) / args.concurrency
+        print(f'pss KiB      warm {idle_kib}  peak {peak_kib}  '
+              f'per connection {per_connection:.1f}')
+    if errors:
+        print(f'errors       {sorted(set(map(str, errors)))}')
+    if args.per_process:
+        for pid in sorted({child for pid in args.pid
+                           for child in process_tree(pid)}):
+            memory = process_memory(pid)
+            print(f'process      {pid}  rss {memory["Rss"]} KiB  '
+                  f'pss {memory["Pss"]} KiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('url')
+    parser.add_argument('-c', '--concurrency', type=int, default=50)
+    parser.add_argument('-d', '--duration', type=float, default=10)
+    parser.add_argument(
+        '-w', '--warmup', type=float, default=2,
+        help='Seconds of light load before measuring.')
+    parser.add_argument(
+        '-H', '--header', action='append', default=[],
+        help='Extra request header, e.g. "Authorization: Token <key>".')
+    parser.add_argument(
+        '--close', action='store_true',
+        help='Open a new connection for every request.')
+    parser.add_argument(
+        '--pid', type=int, action='append', default=[],
+        help='Server process whose memory (with children) is measured.')
+    parser.add_argument(
+        '--per-process', action='store_true',
+        help='Print the memory of each server process after the run.')
+    args = parser.parse_args()
+
+    if args.close:
+        args.header.append('Connection: close')
+    if not args.url.startswith(('http://', 'uwsgi://')):
+        parser.error('Only http:// and uwsgi:// URLs are supported.')
+    if args.pid and not os.path.isdir('/proc'):
+        parser.error('--pid needs /proc.')
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,59 @@
 
 set -e
 
-python manage.py wait_for_db
-python manage.py collectstatic --noinput
-python manage.py migrate
+# Skips collectstatic and migrate when there is nothing to do and applies
+# migrations one container at a time. BOOT_MODE=full always runs both.
+# Fails the start when the database isn't up within DB_WAIT_TIMEOUT seconds.
+BOOT_ARGS="--db-timeout ${DB_WAIT_TIMEOUT:-60}"
+if [ "${BOOT_MODE:-fast}" = "full" ]; then
+    BOOT_ARGS="$BOOT_ARGS --full"
+fi
+python manage.py boot $BOOT_ARGS
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# CPUs available to the container: its cgroup CPU quota when limited.
+cpu_count() {
+    if [ -r /sys/fs/cgroup/cpu.max ]; then
+        read -r quota period < /sys/fs/cgroup/cpu.max
+        if [ "$quota" != "max" ]; then
+            echo $(( (quota + period - 1) / period ))
+            return
+        fi
+    fi
+    nproc
+}
+
+CPUS=$(cpu_count)
+
+# SERVER_MODE=wsgi (default) serves with uwsgi over the uwsgi protocol,
+# SERVER_MODE=asgi with uvicorn over HTTP and async views for the hot reads.
+# The proxy's APP_PROTOCOL must match: uwsgi or http.
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    export ASYNC_READ_VIEWS="${ASYNC_READ_VIEWS:-1}"
+    # Each async request runs its sync code in a new thread, so persistent
+    # connections would never be reused. Pool them with pgbouncer instead
+    # (DB_POOL_MODE=pgbouncer).
+    export DB_CONN_MAX_AGE=0
+    exec uvicorn app.asgi:application \
+        --host 0.0.0.0 --port 9000 \
+        --workers "${ASGI_WORKERS:-$CPUS}" \
+        --lifespan off --no-access-log \
+        --proxy-headers --forwarded-allow-ips '*'
+fi
+
+# Workers and threads default to 2 per CPU and 2 per worker; every thread
+# keeps its own database connection. The app is loaded and warmed up in the
+# master (no --lazy-apps) so the forked workers share it copy-on-write.
+# Workers are recycled after UWSGI_MAX_REQUESTS requests or when their RSS
+# exceeds UWSGI_RELOAD_ON_RSS megabytes.
+UWSGI_WORKERS="${UWSGI_WORKERS:-$((CPUS * 2))}"
+UWSGI_THREADS="${UWSGI_THREADS:-2}"
+UWSGI_MAX_REQUESTS="${UWSGI_MAX_REQUESTS:-5000}"
+UWSGI_RELOAD_ON_RSS="${UWSGI_RELOAD_ON_RSS:-256}"
+
+exec uwsgi --socket :9000 --master --need-app --module app.wsgi \
+    --workers "$UWSGI_WORKERS" --threads "$UWSGI_THREADS" \
+    --enable-threads --thunder-lock \
+    --max-requests "$UWSGI_MAX_REQUESTS" \
+    --reload-on-rss "$UWSGI_RELOAD_ON_RSS" \
+    --worker-reload-mercy 30 \
+    --die-on-term